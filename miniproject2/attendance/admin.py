@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from attendance.models import Attendance
+from attendance.models import Attendance, AttendanceTotal
 
 # Register your models here.
-admin.site.register(Attendance)
\ No newline at end of file
+admin.site.register(Attendance)
+admin.site.register(AttendanceTotal)
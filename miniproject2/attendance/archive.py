@@ -0,0 +1,127 @@
+"""
+Bitmap archive of attendance for closed terms.
+
+A term of attendance for one student in one course becomes a single
+``ArchivedAttendance`` row holding two bitmaps of a few bytes each, instead
+of one ``Attendance`` row per day.
+"""
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import transaction
+
+from attendance.models import ArchivedAttendance, Attendance
+from attendance.rates import apply_deltas, tally
+
+BATCH_SIZE = 1000
+
+
+def _set(bitmap, index, value=True):
+    if value:
+        bitmap[index // 8] |= 1 << (index % 8)
+    else:
+        bitmap[index // 8] &= ~(1 << (index % 8))
+
+
+def _get(bitmap, index):
+    return bool(bitmap[index // 8] & (1 << (index % 8)))
+
+
+def encode(student_id, course_id, term, statuses):
+    """
+    An ``ArchivedAttendance`` for ``statuses`` (date -> status) in ``term``.
+    """
+    size = (term.days + 7) // 8
+    recorded, present = bytearray(size), bytearray(size)
+    for day, status in statuses.items():
+        index = (day - term.start_date).days
+        _set(recorded, index)
+        _set(present, index, status == 'present')
+    present_count = sum(status == 'present' for status in statuses.values())
+    return ArchivedAttendance(
+        student_id=student_id, course_id=course_id, term=term,
+        recorded=bytes(recorded), present=bytes(present),
+        present_count=present_count, absent_count=len(statuses) - present_count,
+    )
+
+
+def decode(archived, term):
+    """
+    The archived statuses as a ``date -> status`` dict.
+    """
+    recorded, present = bytes(archived.recorded), bytes(archived.present)
+    return {
+        term.start_date + timedelta(days=index): 'present' if _get(present, index) else 'absent'
+        for index in range(term.days) if _get(recorded, index)
+    }
+
+
+def status_on(archived, term, day):
+    """
+    The archived status on ``day``, or ``None`` if nothing was recorded.
+    """
+    index = (day - term.start_date).days
+    if not _get(bytes(archived.recorded), index):
+        return None
+    return 'present' if _get(bytes(archived.present), index) else 'absent'
+
+
+def _upsert(batch):
+    ArchivedAttendance.objects.bulk_create(
+        batch, update_conflicts=True, unique_fields=['student', 'course', 'term'],
+        update_fields=['recorded', 'present', 'present_count', 'absent_count'],
+    )
+    return len(batch)
+
+
+def archive_term(term):
+    """
+    Move the attendance of ``term`` into the archive, merging with what an
+    earlier run archived. Returns ``(archived rows, deleted records)``.
+    """
+    live = Attendance.objects.filter(date__range=(term.start_date, term.end_date))
+    records = (
+        live.order_by('student_id', 'course_id', 'date')
+        .values_list('student_id', 'course_id', 'date', 'status').iterator(chunk_size=BATCH_SIZE)
+    )
+
+    archived, batch, deltas = 0, [], {}
+    with transaction.atomic():
+        existing = {
+            (row.student_id, row.course_id): row for row in ArchivedAttendance.objects.filter(term=term)
+        }
+        for (student_id, course_id), rows in groupby(records, key=lambda record: record[:2]):
+            statuses = decode(existing[student_id, course_id], term) if (student_id, course_id) in existing else {}
+            for _, _, day, status in rows:
+                if day in statuses:
+                    # The live record replaces an archived one the totals already count.
+                    tally(deltas, student_id, course_id, statuses[day], -1)
+                statuses[day] = status
+            batch.append(encode(student_id, course_id, term, statuses))
+            if len(batch) >= BATCH_SIZE:
+                archived += _upsert(batch)
+                batch = []
+        if batch:
+            archived += _upsert(batch)
+        # A plain DELETE: the rows' counts already live on in the archive, so
+        # the per-row delete signals (and total deltas) must not fire.
+        deleted = live._raw_delete(live.db)
+        apply_deltas(deltas)
+    return archived, deleted
+
+
+def archived_records(archived, term, day):
+    """
+    Unsaved ``Attendance`` instances for ``day`` from the ``archived`` rows of
+    ``term``, carrying the relations the rows loaded; archived records have
+    no id.
+    """
+    for row in archived:
+        status = status_on(row, term, day)
+        if status is not None:
+            record = Attendance(student_id=row.student_id, course_id=row.course_id, date=day, status=status)
+            for name in ('student', 'course'):
+                if ArchivedAttendance._meta.get_field(name).is_cached(row):
+                    setattr(record, name, getattr(row, name))
+            yield record
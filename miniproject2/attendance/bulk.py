@@ -0,0 +1,92 @@
+"""
+Set-based attendance writes.
+"""
+
+from django.db import connections, router, transaction
+
+from attendance.models import STATUS_CHOICES, Attendance
+from attendance.rates import apply_deltas, tally
+from attendance.signals import attendance_bulk_changed
+
+BATCH_SIZE = 500
+
+# A changed record held the other status, so the upsert's new status is enough to count it out.
+OTHER_STATUS = {STATUS_CHOICES[0][0]: STATUS_CHOICES[1][0], STATUS_CHOICES[1][0]: STATUS_CHOICES[0][0]}
+
+
+def _upsert(connection, course_id, day, statuses):
+    """
+    One ``INSERT ... ON CONFLICT DO UPDATE`` per batch of ``statuses``,
+    skipping records that already hold their status. Yields
+    ``(id, student id, status, created)`` for the records written; on
+    PostgreSQL ``xmax = 0`` tells inserted rows from updated ones, elsewhere
+    the day's records are read first.
+    """
+    postgres = connection.vendor == 'postgresql'
+    existing = set()
+    if not postgres:
+        existing = set(Attendance.objects.filter(
+            course_id=course_id, date=day, student_id__in=list(statuses),
+        ).values_list('student_id', flat=True))
+
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    items = list(statuses.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start:start + BATCH_SIZE]
+        params = []
+        for student_id, status in batch:
+            params += [student_id, course_id, day, status]
+        sql = (
+            f"INSERT INTO {table} (student_id, course_id, date, status) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(batch))} "
+            f"ON CONFLICT (student_id, course_id, date) DO UPDATE SET status = EXCLUDED.status "
+            f"WHERE {table}.status <> EXCLUDED.status "
+            f"RETURNING id, student_id, status{', xmax = 0' if postgres else ''}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for row in cursor.fetchall():
+                yield row if postgres else (*row, row[1] not in existing)
+
+
+def record_attendance(course_id, day, statuses):
+    """
+    Record ``statuses`` (student id -> status) for ``course_id`` on ``day``
+    and add the change to the attendance totals, in one transaction: the
+    upsert and one total update per distinct change. Records already holding
+    their status are not written. Returns student id -> record id of the
+    records written.
+    """
+    connection = connections[router.db_for_write(Attendance)]
+    deltas, ids = {}, {}
+    with transaction.atomic(using=connection.alias):
+        for record_id, student_id, status, created in _upsert(connection, course_id, day, statuses):
+            ids[student_id] = record_id
+            if not created:
+                tally(deltas, student_id, course_id, OTHER_STATUS[status], -1)
+            tally(deltas, student_id, course_id, status)
+        apply_deltas(deltas)
+    attendance_bulk_changed.send(sender=Attendance, course_id=course_id, student_ids=statuses.keys())
+    return ids
+
+
+def mark_attendance(student_id, course_id, day, status):
+    """
+    Create or overwrite one attendance record.
+    """
+    ids = record_attendance(course_id, day, {student_id: status})
+    if student_id not in ids:
+        # Already held that status: nothing was written, so look the record up.
+        ids[student_id] = Attendance.objects.filter(
+            student_id=student_id, course_id=course_id, date=day,
+        ).values_list('id', flat=True).get()
+    return Attendance(id=ids[student_id], student_id=student_id, course_id=course_id, date=day, status=status)
+
+
+def take_roll_call(course_id, day, statuses):
+    """
+    Record ``statuses`` (student id -> status) for ``course_id`` on ``day``;
+    existing records for the day get the new status.
+    """
+    record_attendance(course_id, day, statuses)
+    return len(statuses)
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive import archive_term
+from courses.models import Term
+
+
+class Command(BaseCommand):
+    help = 'Move the attendance of closed terms into the bitmap archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', help='Names of the terms to archive (default: every closed term)')
+
+    def handle(self, *args, **kwargs):
+        terms = Term.objects.filter(end_date__lt=date.today())
+        if kwargs['terms']:
+            terms = terms.filter(name__in=kwargs['terms'])
+            missing = set(kwargs['terms']) - {term.name for term in terms}
+            if missing:
+                raise CommandError(f"Unknown or open term(s): {', '.join(sorted(missing))}")
+
+        for term in terms:
+            archived, deleted = archive_term(term)
+            self.stdout.write(f"{term}: {deleted} record(s) archived into {archived} row(s).")
+        self.stdout.write(self.style.SUCCESS("Attendance archived."))
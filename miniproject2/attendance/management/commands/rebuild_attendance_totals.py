@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from attendance.rates import refresh_totals
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Recount the attendance totals from the attendance records and the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Courses to rebuild (default: all)')
+
+    def handle(self, *args, **kwargs):
+        course_ids = kwargs['course_ids'] or list(Course.objects.values_list('id', flat=True))
+        refresh_totals(course_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the attendance totals of {len(course_ids)} course(s)."))
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keep the latest record of each student, course and day.
+    """
+    Attendance = apps.get_model('attendance', 'Attendance')
+    latest = (
+        Attendance.objects.values('student', 'course', 'date')
+        .annotate(latest=Max('id')).order_by().values('latest')
+    )
+    Attendance.objects.exclude(id__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
@@ -1,10 +1,61 @@
 from django.db import models
 from students.models import Student
-from courses.models import Course
+from courses.models import Course, Term
+
+STATUS_CHOICES = [('present', 'Present'), ('absent', 'Absent')]
 
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     date = models.DateField()
-    status = models.CharField(max_length=10, choices=[('present', 'Present'), ('absent', 'Absent')])
-    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+
+    class Meta:
+        constraints = [
+            # One record per student, course and day; roll calls upsert against it.
+            models.UniqueConstraint(fields=['student', 'course', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+            models.Index(fields=['student', 'date'], name='attendance_student_date_idx'),
+            models.Index(fields=['date'], name='attendance_date_idx'),
+        ]
+
+
+class AttendanceTotal(models.Model):
+    """
+    Running present/absent counts per student and course, kept in step with
+    ``Attendance`` writes by ``attendance.rates``.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_attendance_total'),
+        ]
+        indexes = [models.Index(fields=['course', 'student'], name='attendance_total_course_idx')]
+
+
+class ArchivedAttendance(models.Model):
+    """
+    A closed term of one student's attendance in one course as bitmaps: bit
+    ``i`` stands for ``term.start_date + i`` days. ``recorded`` flags the days
+    with a record, ``present`` those marked present. The counts are kept so
+    totals never have to decode the bitmaps.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, related_name='+')
+    recorded = models.BinaryField()
+    present = models.BinaryField()
+    present_count = models.PositiveSmallIntegerField(default=0)
+    absent_count = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course', 'term'], name='unique_archived_attendance'),
+        ]
@@ -0,0 +1,161 @@
+"""
+Attendance rates per student and course.
+
+Overall counts come from ``AttendanceTotal``, archived terms included.
+Writers add the change in present and absent records to it with ``F()``
+updates in their own transaction; ``refresh_totals`` recounts from scratch
+for the ``rebuild_attendance_totals`` command. Rolling windows are summed
+from ``Attendance`` itself: with one
+record per student, course and day, a 30-day window is at most 30 rows of
+the (student, course, date) unique index, so a separate daily bucket table
+would only duplicate it.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from attendance.models import ArchivedAttendance, Attendance, AttendanceTotal
+
+WINDOWS = (7, 30)
+
+
+def _counts():
+    return {'present': Count('id', filter=Q(status='present')), 'absent': Count('id', filter=Q(status='absent'))}
+
+
+def rate(present, absent):
+    total = present + absent
+    return {
+        'present': present, 'absent': absent,
+        'rate': round(100 * present / total, 2) if total else None,
+    }
+
+
+def tally(deltas, student_id, course_id, status, change=1):
+    """
+    Count ``change`` records of ``status`` into ``deltas``, a
+    ``(student id, course id) -> (present, absent)`` dict.
+    """
+    present, absent = deltas.get((student_id, course_id), (0, 0))
+    if status == 'present':
+        deltas[student_id, course_id] = (present + change, absent)
+    else:
+        deltas[student_id, course_id] = (present, absent + change)
+
+
+def _counted(name, change):
+    # A total missing records it never counted must not go negative.
+    return F(name) + change if change >= 0 else Greatest(F(name) + change, Value(0))
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas`` (see ``tally``) to the totals: one ``F()`` update per
+    course and distinct change. Totals missing for pairs that gain records
+    are created first.
+    """
+    groups = defaultdict(list)
+    for (student_id, course_id), change in deltas.items():
+        if change != (0, 0):
+            groups[course_id, change].append(student_id)
+
+    now = timezone.now()
+    for (course_id, (present, absent)), student_ids in groups.items():
+        totals = AttendanceTotal.objects.filter(course_id=course_id, student_id__in=student_ids)
+        changes = {'present': _counted('present', present), 'absent': _counted('absent', absent), 'updated_at': now}
+        if totals.update(**changes) == len(student_ids) or (present <= 0 and absent <= 0):
+            continue
+        found = set(totals.values_list('student_id', flat=True))
+        missing = [student_id for student_id in student_ids if student_id not in found]
+        # Created empty and then counted, so a total created concurrently still gets both changes.
+        AttendanceTotal.objects.bulk_create(
+            [AttendanceTotal(student_id=student_id, course_id=course_id) for student_id in missing], ignore_conflicts=True,
+        )
+        AttendanceTotal.objects.filter(course_id=course_id, student_id__in=missing).update(**changes)
+
+
+def refresh_totals(course_ids, student_ids=None):
+    """
+    Recompute the totals of ``student_ids`` (every student when ``None``) in
+    ``course_ids`` from scratch: one grouped query over the live records, one
+    over the archived terms, and one upsert. Writers apply deltas instead;
+    this repairs totals that drifted or predate them.
+    """
+    records = Attendance.objects.filter(course_id__in=course_ids)
+    archived = ArchivedAttendance.objects.filter(course_id__in=course_ids)
+    totals = AttendanceTotal.objects.filter(course_id__in=course_ids)
+    if student_ids is not None:
+        records = records.filter(student_id__in=student_ids)
+        archived = archived.filter(student_id__in=student_ids)
+        totals = totals.filter(student_id__in=student_ids)
+
+    counts = Counter()
+    for row in records.values('student_id', 'course_id').annotate(**_counts()).order_by():
+        counts[row['student_id'], row['course_id'], 'present'] += row['present']
+        counts[row['student_id'], row['course_id'], 'absent'] += row['absent']
+    for row in archived.values('student_id', 'course_id').annotate(
+        present=Sum('present_count'), absent=Sum('absent_count'),
+    ).order_by():
+        counts[row['student_id'], row['course_id'], 'present'] += row['present']
+        counts[row['student_id'], row['course_id'], 'absent'] += row['absent']
+
+    pairs = {(student_id, course_id) for student_id, course_id, _ in counts}
+    with transaction.atomic():
+        AttendanceTotal.objects.bulk_create(
+            [
+                AttendanceTotal(
+                    student_id=student_id, course_id=course_id,
+                    present=counts[student_id, course_id, 'present'], absent=counts[student_id, course_id, 'absent'],
+                )
+                for student_id, course_id in pairs
+            ],
+            update_conflicts=True, unique_fields=['student', 'course'], update_fields=['present', 'absent', 'updated_at'],
+        )
+        totals.filter(
+            ~Exists(Attendance.objects.filter(student_id=OuterRef('student_id'), course_id=OuterRef('course_id'))),
+            ~Exists(ArchivedAttendance.objects.filter(student_id=OuterRef('student_id'), course_id=OuterRef('course_id'))),
+        ).delete()
+
+
+def window_start(days, today=None):
+    return (today or date.today()) - timedelta(days=days - 1)
+
+
+def student_rates(student_id, course_id, today=None):
+    """
+    Overall and rolling-window rates for one student in one course.
+    """
+    total = AttendanceTotal.objects.filter(student_id=student_id, course_id=course_id).first()
+    recent = Attendance.objects.filter(
+        student_id=student_id, course_id=course_id, date__gte=window_start(max(WINDOWS), today),
+    ).aggregate(**{
+        f"{status}_{days}": Count('id', filter=Q(status=status, date__gte=window_start(days, today)))
+        for days in WINDOWS for status in ('present', 'absent')
+    })
+    rates = {'overall': rate(total.present, total.absent) if total else rate(0, 0)}
+    for days in WINDOWS:
+        rates[f"last_{days}_days"] = rate(recent[f"present_{days}"], recent[f"absent_{days}"])
+    return rates
+
+
+def students_below(course_id, threshold, days=None, today=None):
+    """
+    Students of ``course_id`` whose attendance rate is under ``threshold``
+    percent, overall or over the last ``days`` days, lowest first.
+    """
+    if days is None:
+        rows = AttendanceTotal.objects.filter(course_id=course_id).values('student_id', 'present', 'absent')
+    else:
+        rows = (
+            Attendance.objects.filter(course_id=course_id, date__gte=window_start(days, today))
+            .values('student_id').annotate(**_counts()).order_by()
+        )
+    rows = rows.annotate(
+        rate=100 * Cast(F('present'), FloatField()) / (F('present') + F('absent')),
+    ).filter(rate__lt=threshold).order_by('rate', 'student_id')
+    return [{'student': row['student_id'], **rate(row['present'], row['absent'])} for row in rows]
@@ -1,8 +1,43 @@
 # attendance/serializers.py
 from rest_framework import serializers  # Ensure this is the correct import
-from attendance.models import Attendance
+from attendance.models import STATUS_CHOICES, Attendance
+from courses.serializers import CourseSerializer
+from miniproject2.serializers import ExpandableFieldsMixin, SparseFieldsMixin
+from students.serializers import StudentSerializer
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = ['id', 'student', 'course', 'date', 'status']
+        expandable_fields = {'student': StudentSerializer, 'course': CourseSerializer}
+
+
+class MarkAttendanceSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    status = serializers.ChoiceField(choices=STATUS_CHOICES)
+
+
+class RollCallEntrySerializer(serializers.Serializer):
+    student = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=STATUS_CHOICES)
+
+
+class RollCallSerializer(serializers.Serializer):
+    """
+    A course's attendance for one day. Enrolled students missing from
+    ``statuses`` get ``default`` when it is given.
+    """
+    course = serializers.IntegerField()
+    date = serializers.DateField()
+    statuses = RollCallEntrySerializer(many=True, required=False)
+    default = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        entries = attrs.get('statuses', [])
+        if not entries and 'default' not in attrs:
+            raise serializers.ValidationError("Give statuses, a default status or both.")
+        statuses = {entry['student']: entry['status'] for entry in entries}
+        if len(statuses) != len(entries):
+            raise serializers.ValidationError("Each student can only appear once.")
+        attrs['statuses'] = statuses
+        return attrs
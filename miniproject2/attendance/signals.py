@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from attendance.models import Attendance
+from attendance.rates import apply_deltas, tally
+from students.dashboard import invalidate_dashboards
+
+# Sent by bulk writers, which skip the model signals and apply their own
+# total deltas, with ``course_id`` and the ``student_ids`` whose attendance
+# changed.
+attendance_bulk_changed = Signal()
+
+
+def attendance_changed(student_ids):
+    student_ids = set(student_ids)
+    transaction.on_commit(lambda: invalidate_dashboards(student_ids))
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_attendance(sender, instance, **kwargs):
+    # An edited record may change status, student or course; count the old one out.
+    if instance.pk is not None:
+        instance._counted = Attendance.objects.filter(pk=instance.pk).values_list(
+            'student_id', 'course_id', 'status',
+        ).first()
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, **kwargs):
+    deltas = {}
+    old = instance.__dict__.pop('_counted', None)
+    if old is not None:
+        tally(deltas, *old, change=-1)
+    tally(deltas, instance.student_id, instance.course_id, instance.status)
+    apply_deltas(deltas)
+    attendance_changed([instance.student_id] + ([old[0]] if old else []))
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    deltas = {}
+    tally(deltas, instance.student_id, instance.course_id, instance.status, -1)
+    apply_deltas(deltas)
+    attendance_changed([instance.student_id])
+
+
+@receiver(attendance_bulk_changed)
+def attendance_bulk_written(sender, course_id, student_ids, **kwargs):
+    attendance_changed(student_ids)
@@ -1,10 +1,23 @@
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from attendance.models import Attendance
+from attendance.models import ArchivedAttendance, Attendance, AttendanceTotal
+from attendance.archive import archive_term, decode
+from attendance.bulk import take_roll_call
+from attendance.rates import refresh_totals
+from courses.models import Term
 from students.models import Student
 from courses.models import Course, Enrollment
 from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from attendance.serializers import AttendanceSerializer
+from miniproject2.serializers import compile_values_serializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from courses.membership import is_enrolled
+from datetime import date, timedelta
 
 class AttendanceTests(APITestCase):
 
@@ -67,3 +80,291 @@ class AttendanceTests(APITestCase):
         }
         response = self.admin_client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class AttendanceValuesListParityTest(APITestCase):
+    """The fast values_list() read path must render exactly what AttendanceSerializer renders."""
+
+    def setUp(self):
+        user_model = get_user_model()
+        self.teacher_user = user_model.objects.create_user(username='teacher', password='testpass', role='teacher')
+        self.course = Course.objects.create(name="Math 101", description="Basics", professor=self.teacher_user)
+        for i in range(3):
+            user = user_model.objects.create_user(username=f'student{i}', password='testpass', role='student')
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            Attendance.objects.create(student=student, course=self.course, date=f"2024-11-2{i}",
+                                      status='present' if i % 2 else 'absent')
+
+    def test_rows_are_byte_identical(self):
+        queryset = Attendance.objects.order_by('id')
+        columns, convert = compile_values_serializer(AttendanceSerializer)
+        fast = [convert(row) for row in queryset.values_list(*columns)]
+        regular = AttendanceSerializer(queryset, many=True).data
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(regular))
+
+    def test_list_endpoint_matches_serializer(self):
+        admin_user = get_user_model().objects.create_user(username='admin', password='testpass', role='admin')
+        self.client.force_authenticate(user=admin_user)
+        response = self.client.get(reverse('attendance-list'), {'fields': 'id,date,status'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = AttendanceSerializer(Attendance.objects.all(), many=True, fields={'id': {}, 'date': {}, 'status': {}}).data
+        self.assertEqual(
+            sorted(response.data['results'], key=lambda row: row['id']),
+            sorted(expected, key=lambda row: row['id']),
+        )
+
+
+class RollCallTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        UserModel = get_user_model()
+        self.teacher_user = UserModel.objects.create_user(username='teacher', password='testpass', role='teacher')
+        self.other_teacher = UserModel.objects.create_user(username='other', password='testpass', role='teacher')
+        self.course = Course.objects.create(name="Math 101", description="Math", professor=self.teacher_user)
+        self.students = []
+        for i in range(3):
+            user = UserModel.objects.create_user(username=f'student{i}', password='testpass', role='student')
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            Enrollment.objects.create(student=student, course=self.course)
+            self.students.append(student)
+        user = UserModel.objects.create_user(username='outsider', password='testpass', role='student')
+        self.outsider = Student.objects.create(user=user, dob='2000-01-01')
+        self.url = reverse('attendance-roll-call')
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_roll_call_upserts_whole_class(self):
+        Attendance.objects.create(student=self.students[0], course=self.course, date='2024-11-20', status='present')
+        data = {
+            'course': self.course.id, 'date': '2024-11-20', 'default': 'present',
+            'statuses': [{'student': self.students[0].id, 'status': 'absent'}],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['recorded'], response.data['present'], response.data['absent']), (3, 2, 1))
+        self.assertEqual(Attendance.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(Attendance.objects.get(student=self.students[0]).status, 'absent')
+
+    def test_students_must_be_enrolled(self):
+        data = {'course': self.course.id, 'date': '2024-11-20', 'statuses': [{'student': self.outsider.id, 'status': 'present'}]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['students'], [self.outsider.id])
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_other_teacher_is_forbidden(self):
+        self.client.force_authenticate(user=self.other_teacher)
+        data = {'course': self.course.id, 'date': '2024-11-20', 'default': 'present'}
+        self.assertEqual(self.client.post(self.url, data, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MarkAttendanceUpsertTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        UserModel = get_user_model()
+        self.teacher_user = UserModel.objects.create_user(username='teacher', password='testpass', role='teacher')
+        self.course = Course.objects.create(name="Math 101", description="Math", professor=self.teacher_user)
+        self.student_user = UserModel.objects.create_user(username='student', password='testpass', role='student')
+        self.student = Student.objects.create(id=self.student_user.id, user=self.student_user, dob='2000-01-01')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.url = reverse('mark-attendance', args=[self.student.id, self.course.id])
+        self.client.force_authenticate(user=self.student_user)
+
+    def statements(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([query for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']])
+
+    def test_marks_and_overwrites_with_a_total_delta(self):
+        is_enrolled(self.course.id, self.student.id)  # Warm the membership index
+        self.client.post(self.url, {"date": "2024-11-20", "status": "present"})
+        # The upsert and the total update (or the id lookup for an unchanged record); other
+        # databases than PostgreSQL first read the day's records.
+        expected = 2 if connection.vendor == 'postgresql' else 3
+        self.assertEqual(self.statements({"date": "2024-11-21", "status": "present"}), expected)
+        self.assertEqual(self.statements({"date": "2024-11-21", "status": "present"}), expected)
+
+        response = self.client.post(self.url, {"date": "2024-11-21", "status": "absent"})
+        record = Attendance.objects.get(date="2024-11-21")
+        self.assertEqual(record.status, 'absent')
+        self.assertEqual(response.data['attendance_id'], record.id)
+        total = AttendanceTotal.objects.get()
+        self.assertEqual((total.present, total.absent), (1, 1))
+
+    def test_invalid_input_writes_nothing(self):
+        response = self.client.post(self.url, {"date": "2024-11-21", "status": "late"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {"date": "someday", "status": "present"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_unknown_course_is_not_found(self):
+        url = reverse('mark-attendance', args=[self.student.id, self.course.id + 1])
+        response = self.client.post(url, {"date": "2024-11-21", "status": "present"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AttendanceRateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        UserModel = get_user_model()
+        self.teacher_user = UserModel.objects.create_user(username='teacher', password='testpass', role='teacher')
+        self.course = Course.objects.create(name="Math 101", description="Math", professor=self.teacher_user)
+        self.students = []
+        for i in range(2):
+            user = UserModel.objects.create_user(username=f'student{i}', password='testpass', role='student')
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            Enrollment.objects.create(student=student, course=self.course)
+            self.students.append(student)
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            # student0: absent today, present 10 and 40 days ago; student1: present today.
+            for days_ago, value in [(0, 'absent'), (10, 'present'), (40, 'present')]:
+                Attendance.objects.create(student=self.students[0], course=self.course, date=today - timedelta(days=days_ago), status=value)
+            Attendance.objects.create(student=self.students[1], course=self.course, date=today, status='present')
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_totals_follow_writes(self):
+        total = AttendanceTotal.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual((total.present, total.absent), (2, 1))
+
+        url = reverse('attendance-roll-call')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'course': self.course.id, 'date': str(date.today()), 'default': 'present'}, format='json')
+        total = AttendanceTotal.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual((total.present, total.absent), (3, 0))
+
+    def test_deltas_match_a_rebuild(self):
+        record = Attendance.objects.get(student=self.students[0], date=date.today())
+        record.student = self.students[1]
+        record.date -= timedelta(days=1)
+        record.save()
+        Attendance.objects.filter(student=self.students[0], status='present').first().delete()
+        take_roll_call(self.course.id, date.today(), {self.students[0].id: 'absent', self.students[1].id: 'absent'})
+
+        incremental = set(AttendanceTotal.objects.values_list('student_id', 'present', 'absent'))
+        self.assertEqual(incremental, {(self.students[0].id, 1, 1), (self.students[1].id, 0, 2)})
+        AttendanceTotal.objects.update(present=0, absent=0)
+        refresh_totals([self.course.id])
+        self.assertEqual(set(AttendanceTotal.objects.values_list('student_id', 'present', 'absent')), incremental)
+
+    def test_rolling_window_rates(self):
+        url = reverse('attendance-rates', kwargs={'student_id': self.students[0].id, 'course_id': self.course.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['overall']['rate'], 66.67)
+        self.assertEqual(response.data['last_7_days'], {'present': 0, 'absent': 1, 'rate': 0.0})
+        self.assertEqual(response.data['last_30_days']['rate'], 50.0)
+
+    def test_student_only_sees_own_rates(self):
+        self.client.force_authenticate(user=self.students[1].user)
+        url = reverse('attendance-rates', kwargs={'student_id': self.students[0].id, 'course_id': self.course.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_students_below_threshold(self):
+        url = reverse('attendance-below-threshold', kwargs={'course_id': self.course.id})
+        response = self.client.get(url, {'threshold': 70})
+        self.assertEqual([row['student'] for row in response.data['students']], [self.students[0].id])
+        response = self.client.get(url, {'threshold': 70, 'window': 7})
+        self.assertEqual(response.data['students'][0]['rate'], 0.0)
+        self.assertEqual(self.client.get(url, {'window': 5}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AttendanceArchiveTests(APITestCase):
+    def setUp(self):
+        UserModel = get_user_model()
+        self.admin_user = UserModel.objects.create_user(username='admin', password='testpass', role='admin')
+        self.course = Course.objects.create(name="Math 101", description="Math", professor=self.admin_user)
+        user = UserModel.objects.create_user(username='student', password='testpass', role='student')
+        self.student = Student.objects.create(user=user, dob='2000-01-01')
+        self.term = Term.objects.create(name="Fall 2023", start_date=date(2023, 9, 1), end_date=date(2023, 12, 20))
+        self.days = {date(2023, 9, 1): 'present', date(2023, 9, 2): 'absent', date(2023, 12, 20): 'present'}
+        for day, value in self.days.items():
+            Attendance.objects.create(student=self.student, course=self.course, date=day, status=value)
+        Attendance.objects.create(student=self.student, course=self.course, date=date(2024, 1, 10), status='absent')
+
+    def test_archive_round_trip(self):
+        self.assertEqual(archive_term(self.term), (1, 3))
+        archived = ArchivedAttendance.objects.get()
+        self.assertEqual(decode(archived, self.term), self.days)
+        self.assertEqual(len(archived.recorded) + len(archived.present), 28)
+        self.assertEqual(Attendance.objects.count(), 1)
+
+        # Records written later are merged on the next run.
+        Attendance.objects.create(student=self.student, course=self.course, date=date(2023, 9, 2), status='present')
+        self.assertEqual(archive_term(self.term), (1, 1))
+        self.assertEqual(decode(ArchivedAttendance.objects.get(), self.term)[date(2023, 9, 2)], 'present')
+        total = AttendanceTotal.objects.get()
+        self.assertEqual((total.present, total.absent), (3, 1))  # The archived absence was replaced
+
+    def test_totals_keep_archived_counts(self):
+        archive_term(self.term)
+        refresh_totals([self.course.id])
+        total = AttendanceTotal.objects.get()
+        self.assertEqual((total.present, total.absent), (2, 2))
+
+    def test_list_serves_archived_dates(self):
+        archive_term(self.term)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('attendance-list'), {'date': '2023-09-02'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'id': None, 'student': self.student.id, 'course': self.course.id, 'date': '2023-09-02', 'status': 'absent'},
+        ])
+
+    def test_archived_dates_follow_fields_and_expand(self):
+        archive_term(self.term)
+        Attendance.objects.create(student=self.student, course=self.course, date=date(2023, 9, 2), status='present')
+        other = Student.objects.create(
+            user=get_user_model().objects.create_user(username='other', password='testpass', role='student'),
+            dob='2000-01-01',
+        )
+        Attendance.objects.create(student=other, course=self.course, date=date(2023, 9, 1), status='present')
+        archive_term(self.term)
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('attendance-list')
+
+        response = self.client.get(url, {'date': '2023-09-01', 'fields': 'id,status'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': None, 'status': 'present'}] * 2)
+
+        live = Attendance.objects.create(student=other, course=self.course, date=date(2023, 9, 2), status='absent')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'date': '2023-09-02', 'fields': 'id,status'})
+        self.assertEqual(response.data['results'], [{'id': None, 'status': 'present'}, {'id': live.id, 'status': 'absent'}])
+        self.assertFalse([query for query in queries.captured_queries if 'attendance_attendance' in query['sql']][1:])
+
+        response = self.client.get(url, {'date': '2023-09-01', 'expand': 'student', 'omit': 'date'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['student']['id'] for row in response.data['results']], [self.student.id, other.id])
+        self.assertNotIn('date', response.data['results'][0])
+
+
+class AttendanceTermTests(APITestCase):
+    def setUp(self):
+        UserModel = get_user_model()
+        self.admin_user = UserModel.objects.create_user(username='admin', password='testpass', role='admin')
+        course = Course.objects.create(name="Math 101", description="Math", professor=self.admin_user)
+        user = UserModel.objects.create_user(username='student', password='testpass', role='student')
+        student = Student.objects.create(user=user, dob='2000-01-01')
+        today = date.today()
+        Term.objects.create(name="Current", start_date=today - timedelta(days=30), end_date=today + timedelta(days=30))
+        Term.objects.create(name="Previous", start_date=today - timedelta(days=90), end_date=today - timedelta(days=31))
+        self.current = Attendance.objects.create(student=student, course=course, date=today, status='present')
+        self.previous = Attendance.objects.create(student=student, course=course, date=today - timedelta(days=60),
+                                                  status='absent')
+        self.client.force_authenticate(user=self.admin_user)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('attendance-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(record['id'] for record in response.data['results'])
+
+    def test_list_defaults_to_current_term(self):
+        self.assertEqual(self.listed(), [self.current.id])
+        self.assertEqual(self.listed(term='Previous'), [self.previous.id])
+        self.assertEqual(self.listed(term='all'), sorted([self.current.id, self.previous.id]))
+        self.assertEqual(self.listed(term='Unknown'), [])
+
+    def test_date_filter_lifts_term_bound(self):
+        self.assertEqual(self.listed(date=self.previous.date.isoformat()), [self.previous.id])
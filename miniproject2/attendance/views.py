@@ -1,15 +1,26 @@
 import logging
+from collections import Counter
+from datetime import date
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, OR
 
-from attendance.models import Attendance
-from attendance.serializers import AttendanceSerializer
+from attendance.archive import archived_records
+from attendance.bulk import mark_attendance, take_roll_call
+from attendance.models import STATUS_CHOICES, ArchivedAttendance, Attendance
+from attendance.rates import WINDOWS, student_rates, students_below
+from attendance.serializers import AttendanceSerializer, MarkAttendanceSerializer, RollCallSerializer
 from users.permissions import IsStudent, IsTeacher, IsAdmin
 from students.models import Student
-from courses.models import Course, Enrollment
+from courses.membership import course_professor, enrolled_students, is_enrolled
+from courses.models import Course, Term
+from miniproject2.mixins import (
+    ExpandQuerysetMixin, SparseFieldsQuerysetMixin, ValuesListMixin, EXPAND_PARAMETER, FIELDS_PARAMETER,
+    OMIT_PARAMETER,
+)
 
 # Set up a logger
 logger = logging.getLogger('app_logger')
@@ -17,33 +28,100 @@ logger = logging.getLogger('app_logger')
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+TERM_PARAMETER = openapi.Parameter(
+    'term', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Name of the term to list, or 'all'. Defaults to the current term unless filtering on a date.",
+)
+
+class AttendanceViewSet(ValuesListMixin, SparseFieldsQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     """
     Viewset for admins and teachers to view, create, update, and delete attendance.
     """
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    filterset_fields = ['student', 'course', 'date']
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'destroy']:
             logger.info(f"User {self.request.user} attempting to {self.action} attendance.")
             return [IsTeacher()]
+        if self.action in ['roll_call', 'below_threshold']:
+            return [OR(IsTeacher(), IsAdmin())]
+        if self.action == 'rates':
+            return [IsAuthenticated()]
         return [IsAdmin()]  # Allow Admins to do everything
 
     def get_queryset(self):
         if self.request.user.role == 'teacher':
             logger.info(f"Teacher {self.request.user} retrieving attendance for their courses.")
-            return Attendance.objects.filter(course__professor=self.request.user)
-        logger.info(f"Admin {self.request.user} retrieving all attendance records.")
-        return Attendance.objects.all()
+            queryset = Attendance.objects.filter(course__professor=self.request.user)
+        else:
+            logger.info(f"Admin {self.request.user} retrieving all attendance records.")
+            queryset = Attendance.objects.all()
+        if self.action == 'list':
+            queryset = self.within_term(queryset)
+        return queryset
+
+    def within_term(self, queryset):
+        """
+        Bound listings to the ``?term=`` (default: the current one) so
+        PostgreSQL only scans that term's partition. ``?term=all`` and
+        ``?date=`` filters lift the bound.
+        """
+        name = self.request.query_params.get('term')
+        if name == 'all' or (name is None and self.request.query_params.get('date')):
+            return queryset
+        term = Term.objects.filter(name=name).first() if name else Term.current()
+        if term is None:
+            return queryset.none() if name else queryset
+        return queryset.filter(date__range=(term.start_date, term.end_date))
+
+    def get_archived_term(self):
+        """
+        ``(term, date)`` for a ``?date=`` filter inside a closed term,
+        otherwise ``(None, ...)``.
+        """
+        try:
+            day = date.fromisoformat(self.request.query_params.get('date', ''))
+        except ValueError:
+            return None, None
+        term = Term.objects.filter(start_date__lte=day, end_date__gte=day, end_date__lt=date.today()).first()
+        return term, day
 
     @swagger_auto_schema(
-        operation_description="Retrieve a list of all attendance records.",
+        operation_description=(
+            "Retrieve a list of attendance records of the current term. Filtering on a date of a closed "
+            "term also returns the archived records of that day, with a null id."
+        ),
+        manual_parameters=[TERM_PARAMETER, EXPAND_PARAMETER, FIELDS_PARAMETER, OMIT_PARAMETER],
         responses={200: AttendanceSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        term, day = self.get_archived_term()
+        if term is None:
+            return super().list(request, *args, **kwargs)
+
+        # A single day is small: merge the archive with what is still live, live records winning,
+        # then serialize both halves together so ?fields=, ?omit= and ?expand= shape them alike.
+        # The merge needs the student and course ids, which ?fields= may have deferred.
+        live = self.filter_queryset(self.get_queryset()).defer(None)
+        archived = ArchivedAttendance.objects.filter(term=term)
+        if self.request.user.role == 'teacher':
+            archived = archived.filter(course__professor=self.request.user)
+        for name in ('student', 'course'):
+            if request.query_params.get(name):
+                archived = archived.filter(**{f"{name}_id": int(request.query_params[name])})
+
+        archived = self.expand_queryset(archived)
+
+        records = {(record.student_id, record.course_id): record for record in archived_records(archived, term, day)}
+        records.update(((record.student_id, record.course_id), record) for record in live)
+        records = [records[key] for key in sorted(records)]
+        page = self.paginate_queryset(records)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(records, many=True).data)
 
     @swagger_auto_schema(
         operation_description="Create a new attendance record.",
@@ -68,6 +146,118 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Record a whole class's attendance for one day. Every listed student must be enrolled in the "
+            "course; enrolled students left out get the 'default' status if one is given. Existing records "
+            "for the day are overwritten."
+        ),
+        request_body=RollCallSerializer,
+        responses={200: 'Counts of recorded statuses.', 400: 'Invalid data or students not enrolled.',
+                   403: 'Forbidden.', 404: 'Course not found.'},
+    )
+    @action(detail=False, methods=['post'], url_path='roll-call')
+    def roll_call(self, request):
+        """
+        Teachers can take the roll call of courses they teach; admins of any course.
+        """
+        serializer = RollCallSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_id, day = serializer.validated_data['course'], serializer.validated_data['date']
+        statuses, default = serializer.validated_data['statuses'], serializer.validated_data.get('default')
+
+        professor_id = course_professor(course_id)
+        if professor_id is None:
+            return Response({"error": "Course not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not IsAdmin().has_permission(request, self) and professor_id != request.user.id:
+            logger.warning(f"User {request.user} tried to take the roll call of course {course_id}.")
+            return Response(
+                {"error": "You can only take the roll call of courses you teach."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        enrolled = enrolled_students(course_id)
+        not_enrolled = sorted(statuses.keys() - enrolled)
+        if not_enrolled:
+            return Response(
+                {"error": "Some students are not enrolled in this course.", "students": not_enrolled},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if default is not None:
+            statuses = {**dict.fromkeys(enrolled, default), **statuses}
+
+        recorded = take_roll_call(course_id, day, statuses)
+        counts = Counter(statuses.values())
+        logger.info(f"User {request.user} took the roll call of course {course_id} on {day}: {recorded} record(s).")
+        return Response(
+            {"course": course_id, "date": day, "recorded": recorded, **{value: counts[value] for value, _ in STATUS_CHOICES}},
+            status=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "A student's attendance rate in a course: overall and over the last 7 and 30 days. "
+            "Students can only view their own rates."
+        ),
+        responses={200: 'Present and absent counts with rates.', 403: 'Forbidden.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'rates/(?P<student_id>\d+)/(?P<course_id>\d+)')
+    def rates(self, request, student_id=None, course_id=None):
+        """
+        Students see their own rates, teachers those in courses they teach, admins all.
+        """
+        student_id, course_id = int(student_id), int(course_id)
+        if IsStudent().has_permission(request, self):
+            allowed = Student.objects.filter(id=student_id, user=request.user).exists()
+        else:
+            allowed = IsAdmin().has_permission(request, self) or course_professor(course_id) == request.user.id
+        if not allowed:
+            logger.warning(f"User {request.user} tried to view the attendance rates of student {student_id}.")
+            return Response(
+                {"error": "You cannot view this student's attendance."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        rates = student_rates(student_id, course_id)
+        return Response({"student": student_id, "course": course_id, **rates}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Students of a course whose attendance rate is below a threshold, lowest first.",
+        manual_parameters=[
+            openapi.Parameter('threshold', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description="Rate in percent (default 75)."),
+            openapi.Parameter('window', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, enum=[*WINDOWS], description="Only count the last 7 or 30 days."),
+        ],
+        responses={200: 'Students below the threshold.', 400: 'Invalid parameters.', 403: 'Forbidden.', 404: 'Course not found.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'course/(?P<course_id>\d+)/below-threshold')
+    def below_threshold(self, request, course_id=None):
+        """
+        Teachers can check courses they teach; admins any course.
+        """
+        course_id = int(course_id)
+        professor_id = course_professor(course_id)
+        if professor_id is None:
+            return Response({"error": "Course not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not IsAdmin().has_permission(request, self) and professor_id != request.user.id:
+            return Response(
+                {"error": "You can only view attendance of courses you teach."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            threshold = float(request.query_params.get('threshold', 75))
+            window = request.query_params.get('window')
+            window = int(window) if window else None
+        except ValueError:
+            return Response({"error": "Invalid threshold or window."}, status=status.HTTP_400_BAD_REQUEST)
+        if window is not None and window not in WINDOWS:
+            return Response({"error": f"The window must be one of {list(WINDOWS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        students = students_below(course_id, threshold, days=window)
+        return Response(
+            {"course": course_id, "threshold": threshold, "window": window, "students": students},
+            status=status.HTTP_200_OK
+        )
 
 
 class MarkAttendanceView(APIView):
@@ -108,66 +298,62 @@ class MarkAttendanceView(APIView):
     def post(self, request, student_id, course_id):
         """
         Students can mark their own attendance for a specific course and date.
-        """
-        try:
-            logger.info(f"Student {request.user} is attempting to mark attendance for course {course_id}.")
-
-            # Ensure the logged-in user is the student trying to mark their attendance
-            if request.user.id != student_id:
-                logger.warning(f"Unauthorized access: User {request.user} tried to mark attendance for student {student_id}.")
-                return Response(
-                    {"error": "You can only mark your own attendance."},
-                    status=status.HTTP_403_FORBIDDEN
-                )
 
-            # Ensure the student exists
-            student = Student.objects.get(id=student_id)
-
-            # Ensure the course exists
-            course = Course.objects.get(id=course_id)
-
-            # Verify the student is enrolled in the course
-            if not Enrollment.objects.filter(student=student, course=course).exists():
-                logger.warning(f"Enrollment check failed: Student {student_id} is not enrolled in course {course_id}.")
-                return Response(
-                    {"error": "You are not enrolled in this course."},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        Input is validated before touching the database; the happy path is an
+        enrollment check against the membership index and a single upsert.
+        """
+        logger.info(f"Student {request.user} is attempting to mark attendance for course {course_id}.")
 
-            # Check if attendance already exists for today; if so, update it
-            attendance, created = Attendance.objects.get_or_create(
-                student=student,
-                course=course,
-                date=request.data.get("date"),  # Date should be passed in the request body
+        # Ensure the logged-in user is the student trying to mark their attendance
+        if request.user.id != student_id:
+            logger.warning(f"Unauthorized access: User {request.user} tried to mark attendance for student {student_id}.")
+            return Response(
+                {"error": "You can only mark your own attendance."},
+                status=status.HTTP_403_FORBIDDEN
             )
 
-            # Validate and update attendance status (only 'present' or 'absent' allowed)
-            status_value = request.data.get("status")
-            if status_value not in ['present', 'absent']:
-                logger.error(f"Invalid status value '{status_value}' provided by student {student_id}.")
+        serializer = MarkAttendanceSerializer(data=request.data)
+        if not serializer.is_valid():
+            if 'status' in serializer.errors:
+                logger.error(f"Invalid status value '{request.data.get('status')}' provided by student {student_id}.")
                 return Response(
                     {"error": "Invalid status. Please choose 'present' or 'absent'."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            return Response({"error": "A valid date is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-            attendance.status = status_value
-            attendance.save()
+        # Verify the student is enrolled in the course
+        if not is_enrolled(course_id, student_id):
+            return self.not_enrolled(student_id, course_id)
 
-            logger.info(f"Attendance marked: Student {student_id} marked as {status_value} for course {course_id}.")
-            return Response(
-                {"message": f"Attendance marked as {status_value}.", "attendance_id": attendance.id},
-                status=status.HTTP_200_OK
-            )
+        status_value = serializer.validated_data['status']
+        attendance = mark_attendance(student_id, course_id, serializer.validated_data['date'], status_value)
 
-        except Student.DoesNotExist:
+        logger.info(f"Attendance marked: Student {student_id} marked as {status_value} for course {course_id}.")
+        return Response(
+            {"message": f"Attendance marked as {status_value}.", "attendance_id": attendance.id},
+            status=status.HTTP_200_OK
+        )
+
+    def not_enrolled(self, student_id, course_id):
+        """
+        Tell a missing student or course apart from a missing enrollment; only
+        reached when the enrollment check fails.
+        """
+        if not Student.objects.filter(id=student_id).exists():
             logger.error(f"Student {student_id} does not exist.")
             return Response(
                 {"error": "Student not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Course.DoesNotExist:
+        if not Course.objects.filter(id=course_id).exists():
             logger.error(f"Course {course_id} does not exist.")
             return Response(
                 {"error": "Course not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
+        logger.warning(f"Enrollment check failed: Student {student_id} is not enrolled in course {course_id}.")
+        return Response(
+            {"error": "You are not enrolled in this course."},
+            status=status.HTTP_403_FORBIDDEN
+        )
@@ -0,0 +1,104 @@
+"""
+Compare DRF's stdlib JSONRenderer/JSONParser with the orjson-based pair on
+payloads shaped like real grade and attendance pages.
+
+Run from the project directory:
+
+    python -m benchmarks.renderers
+"""
+
+import datetime
+import decimal
+import io
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'miniproject2.settings')
+django.setup()
+
+from django.utils.translation import gettext_lazy as _  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from miniproject2.parsers import ORJSONParser  # noqa: E402
+from miniproject2.renderers import ORJSONRenderer  # noqa: E402
+
+
+def grade_page(size):
+    start = datetime.date(2024, 9, 2)
+    return {
+        'count': size * 20,
+        'next': 'http://testserver/grades/?page=2',
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'student': 1000 + i % 2000,
+                'course': 1 + i % 40,
+                'grade': round((i * 37) % 10001 / 100, 2),
+                'date': (start + datetime.timedelta(days=i % 120)).isoformat(),
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def attendance_page(size):
+    start = datetime.date(2024, 9, 2)
+    return {
+        'count': size * 50,
+        'next': None,
+        'previous': 'http://testserver/attendance/attendance/?page=3',
+        'results': [
+            {
+                'id': i,
+                'student': 1000 + i % 300,
+                'course': 1 + i % 12,
+                'date': (start + datetime.timedelta(days=i // 300)).isoformat(),
+                'status': 'present' if i % 7 else 'absent',
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def native_objects(size):
+    """Rows holding raw Python values that go through the encoders' fallbacks."""
+    now = datetime.datetime(2024, 11, 21, 9, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            'id': i,
+            'average': decimal.Decimal('87.125'),
+            'date': now.date(),
+            'updated': now,
+            'label': _('Present'),
+        }
+        for i in range(size)
+    ]
+
+
+def run(label, payload, number):
+    stdlib_renderer, orjson_renderer = JSONRenderer(), ORJSONRenderer()
+    stdlib_parser, orjson_parser = JSONParser(), ORJSONParser()
+    body = stdlib_renderer.render(payload)
+    timings = {
+        'render stdlib': timeit.timeit(lambda: stdlib_renderer.render(payload), number=number),
+        'render orjson': timeit.timeit(lambda: orjson_renderer.render(payload), number=number),
+        'parse stdlib': timeit.timeit(lambda: stdlib_parser.parse(io.BytesIO(body)), number=number),
+        'parse orjson': timeit.timeit(lambda: orjson_parser.parse(io.BytesIO(body)), number=number),
+    }
+
+    print(f"{label} ({len(body) / 1024:.0f} KiB, {number} runs)")
+    for name, seconds in timings.items():
+        print(f"  {name:<14} {seconds / number * 1000:8.3f} ms")
+    print(f"  render speedup {timings['render stdlib'] / timings['render orjson']:.1f}x, "
+          f"parse speedup {timings['parse stdlib'] / timings['parse orjson']:.1f}x")
+
+
+if __name__ == '__main__':
+    for size in (10, 100, 1000):
+        run(f"Grade page, {size} rows", grade_page(size), number=max(20, 20000 // size))
+        run(f"Attendance page, {size} rows", attendance_page(size), number=max(20, 20000 // size))
+    run("Native objects, 1000 rows", native_objects(1000), number=50)
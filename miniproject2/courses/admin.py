@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from courses.models import Course, Enrollment
+from courses.models import Course, Enrollment, Term
 
 # Register your models here.
 admin.site.register(Course)
-admin.site.register(Enrollment)
\ No newline at end of file
+admin.site.register(Enrollment)
+admin.site.register(Term)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CourcesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'courses'
+
+    def ready(self):
+        import courses.signals  # Keeps the membership index in sync
@@ -0,0 +1,165 @@
+"""
+Redis-backed membership index for authorization checks: one set of student
+ids per course and one hash of course -> professor id.
+
+Entries are kept in sync by the signals in ``courses.signals`` and rebuilt
+from the database on a miss, so the hot path never touches the database.
+Every write also bumps the course's version key, which a rebuild watches:
+a change landing while the rebuild reads the database makes it start over
+instead of replacing the set with a stale snapshot. With Redis down, checks
+fall back to the database.
+"""
+
+import logging
+from uuid import uuid4
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, WatchError
+
+from courses.models import Course, Enrollment
+
+# Only a loaded set holds it; a set without it (e.g. one started by add_member
+# after an expiry) is a miss, so a course without students is still a hit.
+LOADED = '-'
+MEMBERS_TTL = 24 * 60 * 60
+LOAD_ATTEMPTS = 3
+
+logger = logging.getLogger('app_logger')
+
+
+def members_key(course_id):
+    return cache.make_key(f"course_members_{course_id}")
+
+
+def members_version_key(course_id):
+    return cache.make_key(f"course_members_version_{course_id}")
+
+
+def professors_key():
+    return cache.make_key("course_professors")
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _members(course_id):
+    return set(Enrollment.objects.filter(course_id=course_id).values_list('student_id', flat=True))
+
+
+def load_members(course_id):
+    """
+    Rebuild the set of ``course_id`` from the database into a temporary key
+    renamed into place, unless a membership change lands meanwhile; the
+    read is then retried. Returns the student ids read.
+    """
+    key, version_key = members_key(course_id), members_version_key(course_id)
+    with _redis().pipeline() as pipeline:
+        for _ in range(LOAD_ATTEMPTS):
+            pipeline.watch(version_key)
+            student_ids = _members(course_id)
+            building = f"{key}:{uuid4().hex}"
+            pipeline.multi()
+            pipeline.sadd(building, LOADED, *student_ids)
+            pipeline.expire(building, MEMBERS_TTL)
+            pipeline.rename(building, key)
+            try:
+                pipeline.execute()
+                break
+            except WatchError:
+                continue
+    # After LOAD_ATTEMPTS busy rounds the ids are still served, just not cached.
+    return student_ids
+
+
+def _write(course_id, command, *args):
+    # Bumping the version aborts any rebuild that read the database before this change committed.
+    try:
+        pipeline = _redis().pipeline()
+        pipeline.incr(members_version_key(course_id))
+        pipeline.expire(members_version_key(course_id), MEMBERS_TTL)
+        getattr(pipeline, command)(members_key(course_id), *args)
+        pipeline.expire(members_key(course_id), MEMBERS_TTL)
+        pipeline.execute()
+    except RedisError as exc:
+        logger.error(f"Could not update the membership index of course {course_id}: {exc}")
+        try:
+            _redis().delete(members_key(course_id))
+        except RedisError as exc:
+            logger.error(f"Could not drop the membership index of course {course_id}: {exc}")
+
+
+def is_enrolled(course_id, student_id):
+    try:
+        pipeline = _redis().pipeline()
+        pipeline.sismember(members_key(course_id), LOADED)
+        pipeline.sismember(members_key(course_id), student_id)
+        loaded, member = pipeline.execute()
+        if not loaded:
+            return int(student_id) in load_members(course_id)
+        return bool(member)
+    except RedisError:
+        return Enrollment.objects.filter(course_id=course_id, student_id=student_id).exists()
+
+
+def enrolled_students(course_id):
+    try:
+        members = _redis().smembers(members_key(course_id))
+        if LOADED.encode() not in members:
+            return load_members(course_id)
+    except RedisError:
+        return _members(course_id)
+    return {int(member) for member in members if member != LOADED.encode()}
+
+
+def course_professor(course_id):
+    """
+    The professor id of ``course_id``, or ``None`` if the course does not exist.
+    """
+    try:
+        professor_id = _redis().hget(professors_key(), course_id)
+    except RedisError:
+        professor_id = None
+    if professor_id is not None:
+        return int(professor_id)
+    professor_id = Course.objects.filter(id=course_id).values_list('professor_id', flat=True).first()
+    if professor_id is not None:
+        try:
+            _redis().hset(professors_key(), course_id, professor_id)
+        except RedisError:
+            pass
+    return professor_id
+
+
+def teaches(user, course_id):
+    return course_professor(course_id) == user.id
+
+
+def add_member(course_id, student_id):
+    # Added even to a missing set, which stays a miss without LOADED.
+    _write(course_id, 'sadd', student_id)
+
+
+def remove_member(course_id, student_id):
+    _write(course_id, 'srem', student_id)
+
+
+def set_professor(course_id, professor_id):
+    try:
+        _redis().hset(professors_key(), course_id, professor_id)
+    except RedisError as exc:
+        logger.error(f"Could not update the professor of course {course_id}: {exc}")
+        _forget_professor(course_id)
+
+
+def _forget_professor(course_id):
+    try:
+        _redis().hdel(professors_key(), course_id)
+    except RedisError as exc:
+        logger.error(f"Could not drop the professor of course {course_id}: {exc}")
+
+
+def forget_course(course_id):
+    _forget_professor(course_id)
+    _write(course_id, 'delete')
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+from miniproject2.migration_utils import add_unique_constraint_concurrently, remove_duplicates
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('courses', '0004_term'),
+    ]
+
+    operations = [
+        remove_duplicates('courses', 'Enrollment', ['student', 'course']),
+        add_unique_constraint_concurrently(
+            'enrollment', 'courses_enrollment',
+            models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment'),
+        ),
+    ]
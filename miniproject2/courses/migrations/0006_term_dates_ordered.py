@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_unique_enrollment'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='term',
+            constraint=models.CheckConstraint(condition=models.Q(start_date__lte=models.F('end_date')), name='term_dates_ordered'),
+        ),
+    ]
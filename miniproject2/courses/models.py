@@ -1,3 +1,6 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from users.models import User
 from students.models import Student
@@ -10,3 +13,48 @@ class Course(models.Model):
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+
+
+class Term(models.Model):
+    """
+    An academic term. A term is closed once its end date has passed.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        ordering = ['start_date']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(start_date__lte=models.F('end_date')), name='term_dates_ordered'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        """
+        Terms bound the attendance and grade history partitions, so they
+        cannot end before they start or overlap another term.
+        """
+        if self.start_date is None or self.end_date is None:
+            return
+        if self.start_date > self.end_date:
+            raise ValidationError({'end_date': "A term cannot end before it starts."})
+        overlapping = Term.objects.filter(start_date__lte=self.end_date, end_date__gte=self.start_date).exclude(pk=self.pk)
+        if overlapping.exists():
+            raise ValidationError(f"The term overlaps {', '.join(term.name for term in overlapping)}.")
+
+    @property
+    def days(self):
+        return (self.end_date - self.start_date).days + 1
+
+    @classmethod
+    def current(cls):
+        today = date.today()
+        return cls.objects.filter(start_date__lte=today, end_date__gte=today).first()
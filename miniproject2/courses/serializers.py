@@ -1,13 +1,18 @@
 from courses.models import Course, Enrollment
 from rest_framework import serializers
+from miniproject2.serializers import ExpandableFieldsMixin, SparseFieldsMixin
+from students.serializers import StudentSerializer
+from users.serializers import PublicUserSerializer
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'name', 'description', 'professor']
+        expandable_fields = {'professor': PublicUserSerializer}
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = ['id', 'student', 'course']
+        expandable_fields = {'student': StudentSerializer, 'course': CourseSerializer}
@@ -0,0 +1,66 @@
+import logging
+
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from courses import membership
+from courses.models import Course, Enrollment, Term
+from miniproject2.partitioning import create_term_partitions
+from students.dashboard import invalidate_dashboards
+
+logger = logging.getLogger('app_logger')
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment(sender, instance, **kwargs):
+    # An edited enrollment may move the student or course; drop the old pair.
+    if instance.pk is not None:
+        old = Enrollment.objects.filter(pk=instance.pk).values_list('course_id', 'student_id').first()
+        if old is not None and old != (instance.course_id, instance.student_id):
+            transaction.on_commit(lambda: membership.remove_member(*old))
+            transaction.on_commit(lambda: invalidate_dashboards([old[1]]))
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, **kwargs):
+    course_id, student_id = instance.course_id, instance.student_id
+    transaction.on_commit(lambda: membership.add_member(course_id, student_id))
+    transaction.on_commit(lambda: invalidate_dashboards([student_id]))
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    course_id, student_id = instance.course_id, instance.student_id
+    transaction.on_commit(lambda: membership.remove_member(course_id, student_id))
+    transaction.on_commit(lambda: invalidate_dashboards([student_id]))
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    course_id, professor_id = instance.id, instance.professor_id
+    transaction.on_commit(lambda: membership.set_professor(course_id, professor_id))
+    transaction.on_commit(lambda: invalidate_dashboards(course_ids=[course_id]))
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    course_id = instance.id
+    transaction.on_commit(lambda: membership.forget_course(course_id))
+
+
+@receiver(post_save, sender=Term)
+def term_saved(sender, instance, created, **kwargs):
+    # Partition bounds are fixed when created; later date edits need a manual re-partition.
+    if created:
+        transaction.on_commit(lambda: create_partitions(instance))
+
+
+def create_partitions(term):
+    # The term is already committed; a failed ATTACH (e.g. bounds overlapping a
+    # term saved without clean()) must not fail the request. Rows keep landing
+    # in the default partition until create_term_partitions is rerun.
+    try:
+        create_term_partitions([term])
+    except DatabaseError as exc:
+        logger.error(f"Could not create the partitions of term {term} (ID: {term.id}): {exc}")
@@ -1,9 +1,20 @@
 import pytest
 from rest_framework.test import APIClient
 from rest_framework import status
-from courses.models import Course
+from courses import membership
+from courses.models import Course, Enrollment, Term
+from students.models import Student
 from users.models import User
+from datetime import date
+from unittest.mock import patch
+from uuid import uuid4
+
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
 
 
 @pytest.mark.django_db
@@ -220,3 +231,192 @@ class TestCoursePermissions:
         client.force_authenticate(user=teacher_user)
         response = client.post("/courses/", data)
         assert response.status_code == 403  # Forbidden
+
+
+@pytest.mark.django_db
+class TestCourseSparseFields:
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_fields_trims_output_and_columns(self):
+        """
+        Ensure ?fields= trims the response and the description column is not fetched.
+        """
+        admin_user = User.objects.create_user(username="admin", password="password", role="admin")
+        Course.objects.create(name="Math 101", description="A very long description", professor=admin_user)
+        client = APIClient()
+        client.force_authenticate(user=admin_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/courses/", {"fields": "id,name"})
+
+        assert response.status_code == 200
+        assert response.data == [{"id": Course.objects.get().id, "name": "Math 101"}]
+        assert not any("description" in query["sql"] for query in queries)
+        assert cache.get("courses_list") is None  # Trimmed responses are not cached
+
+    def test_omit_drops_fields(self):
+        """
+        Ensure ?omit= removes the listed fields and keeps the rest.
+        """
+        admin_user = User.objects.create_user(username="admin", password="password", role="admin")
+        course = Course.objects.create(name="Math 101", description="Basics", professor=admin_user)
+        client = APIClient()
+        client.force_authenticate(user=admin_user)
+
+        response = client.get(f"/courses/{course.id}/", {"omit": "description"})
+        assert response.status_code == 200
+        assert response.data == {"id": course.id, "name": "Math 101", "professor": admin_user.id}
+
+    def test_fields_reach_into_expanded_relations(self):
+        """
+        Ensure dotted names trim expanded objects too.
+        """
+        admin_user = User.objects.create_user(username="admin", password="password", role="admin")
+        course = Course.objects.create(name="Math 101", description="Basics", professor=admin_user)
+        client = APIClient()
+        client.force_authenticate(user=admin_user)
+
+        response = client.get(f"/courses/{course.id}/", {"expand": "professor", "fields": "name,professor.username"})
+        assert response.status_code == 200
+        assert response.data == {"name": "Math 101", "professor": {"username": "admin"}}
+
+
+@pytest.mark.django_db
+class TestCourseMultiGet:
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_ids_are_served_from_cache_in_request_order(self):
+        """
+        Ensure ?ids= reads hits with one cache lookup and only queries the misses.
+        """
+        admin_user = User.objects.create_user(username="admin", password="password", role="admin")
+        courses = [Course.objects.create(name=f"Course {i}", description="", professor=admin_user) for i in range(3)]
+        client = APIClient()
+        client.force_authenticate(user=admin_user)
+        ids = f"{courses[2].id},{courses[0].id},999999"
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/courses/", {"ids": ids})
+        assert response.status_code == 200
+        assert [course["id"] for course in response.data] == [courses[2].id, courses[0].id]
+        assert len(queries) == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/courses/", {"ids": f"{courses[0].id},{courses[1].id}"})
+        assert [course["name"] for course in response.data] == ["Course 0", "Course 1"]
+        assert len(queries) == 1 and f"IN ({courses[1].id})" in queries[0]["sql"]
+
+        client.patch(f"/courses/{courses[0].id}/", {"name": "Renamed"})
+        assert client.get("/courses/", {"ids": str(courses[0].id)}).data[0]["name"] == "Renamed"
+        assert client.get("/courses/", {"ids": "1,x"}).status_code == 400
+
+
+@pytest.mark.django_db
+class TestCourseMembershipIndex:
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_checks_are_database_free_once_loaded(self):
+        """
+        Ensure membership and ownership checks only hit the database on a miss.
+        """
+        teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+        student = Student.objects.create(user=User.objects.create_user(username="student", password="password"), dob="2000-01-01")
+        course = Course.objects.create(name="Math 101", description="Basics", professor=teacher)
+        Enrollment.objects.create(student=student, course=course)
+
+        assert membership.is_enrolled(course.id, student.id)
+        assert membership.teaches(teacher, course.id)
+        with CaptureQueriesContext(connection) as queries:
+            assert membership.is_enrolled(course.id, student.id)
+            assert not membership.is_enrolled(course.id, student.id + 1)
+            assert membership.course_professor(course.id) == teacher.id
+            assert membership.enrolled_students(course.id) == {student.id}
+        assert len(queries) == 0
+
+    def test_signals_keep_the_index_in_sync(self, django_capture_on_commit_callbacks):
+        """
+        Ensure enrollment and course changes reach an already loaded index.
+        """
+        teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+        other = User.objects.create_user(username="other", password="password", role="teacher")
+        student = Student.objects.create(user=User.objects.create_user(username="student", password="password"), dob="2000-01-01")
+        course = Course.objects.create(name="Math 101", description="Basics", professor=teacher)
+        assert membership.enrolled_students(course.id) == set()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            enrollment = Enrollment.objects.create(student=student, course=course)
+            course.professor = other
+            course.save()
+        assert membership.is_enrolled(course.id, student.id)
+        assert membership.course_professor(course.id) == other.id
+
+        with django_capture_on_commit_callbacks(execute=True):
+            enrollment.delete()
+        assert not membership.is_enrolled(course.id, student.id)
+
+
+
+@pytest.mark.django_db
+class TestTermValidation:
+
+    def test_terms_are_ordered_and_disjoint(self):
+        fall = Term.objects.create(name="Fall", start_date=date(2024, 9, 1), end_date=date(2024, 12, 20))
+        with pytest.raises(ValidationError):
+            Term(name="Backwards", start_date=date(2025, 2, 1), end_date=date(2025, 1, 1)).full_clean()
+        with pytest.raises(ValidationError):
+            Term(name="Overlap", start_date=date(2024, 12, 1), end_date=date(2025, 1, 31)).full_clean()
+        Term(name="Spring", start_date=date(2025, 1, 10), end_date=date(2025, 5, 20)).full_clean()
+        fall.end_date = date(2024, 12, 22)
+        fall.full_clean()
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Term.objects.create(name="Backwards", start_date=date(2025, 2, 1), end_date=date(2025, 1, 1))
+
+    def test_rebuild_does_not_drop_a_concurrent_enrollment(self, django_capture_on_commit_callbacks):
+        """
+        Ensure an enrollment committed after a rebuild read the database is
+        not lost to the stale read, and that loaded sets expire.
+        """
+        teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+        student = Student.objects.create(user=User.objects.create_user(username="student", password="password"), dob="2000-01-01")
+        course = Course.objects.create(name="Math 101", description="Basics", professor=teacher)
+        temporary_keys = []
+
+        def enroll_after_the_first_read():
+            # Runs between the enrollment read and the swap of the rebuilt set.
+            if not temporary_keys:
+                with django_capture_on_commit_callbacks(execute=True):
+                    Enrollment.objects.create(student=student, course=course)
+            temporary_keys.append(uuid4())
+            return temporary_keys[-1]
+
+        with patch("courses.membership.uuid4", side_effect=enroll_after_the_first_read):
+            assert membership.load_members(course.id) == {student.id}
+        assert len(temporary_keys) == 2
+        assert membership.is_enrolled(course.id, student.id)
+        assert 0 < get_redis_connection("default").ttl(membership.members_key(course.id)) <= membership.MEMBERS_TTL
+
+    def test_checks_fall_back_to_the_database_without_redis(self, monkeypatch, django_capture_on_commit_callbacks):
+        """
+        Ensure membership and ownership checks and index updates survive Redis being down.
+        """
+        teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+        student = Student.objects.create(user=User.objects.create_user(username="student", password="password"), dob="2000-01-01")
+
+        def unavailable():
+            raise RedisError("Connection refused")
+
+        monkeypatch.setattr(membership, "_redis", unavailable)
+        with django_capture_on_commit_callbacks(execute=True):
+            course = Course.objects.create(name="Math 101", description="Basics", professor=teacher)
+            Enrollment.objects.create(student=student, course=course)
+        assert membership.is_enrolled(course.id, student.id)
+        assert not membership.is_enrolled(course.id, student.id + 1)
+        assert membership.enrolled_students(course.id) == {student.id}
+        assert membership.teaches(teacher, course.id)
@@ -10,13 +10,17 @@ from courses.serializers import CourseSerializer, EnrollmentSerializer
 from users.permissions import IsAdmin,IsStudent
 from drf_yasg.utils import swagger_auto_schema
 from analytics.models import CourseMetric
+from miniproject2.mixins import (
+    CachedMultiGetMixin, ExpandQuerysetMixin, SparseFieldsQuerysetMixin, EXPAND_PARAMETER, FIELDS_PARAMETER,
+    IDS_PARAMETER, OMIT_PARAMETER, is_reshaped,
+)
 
 
 import logging
 
 logger = logging.getLogger('app_logger')
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(CachedMultiGetMixin, SparseFieldsQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     """
     Handles operations related to courses.
     Includes caching for the course list and admin-only permissions for specific actions.
@@ -26,6 +30,7 @@ class CourseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['professor', 'name']
+    object_cache_key = 'course_{}'
     
     def get_permissions(self):
         """
@@ -38,15 +43,24 @@ class CourseViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="List all courses",
-        operation_description="Retrieve a list of courses, with caching enabled to improve performance.",
+        operation_description=(
+            "Retrieve a list of courses, with caching enabled to improve performance. "
+            "?ids= fetches specific courses in one call."
+        ),
+        manual_parameters=[IDS_PARAMETER, EXPAND_PARAMETER, FIELDS_PARAMETER, OMIT_PARAMETER],
         responses={200: CourseSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
         """
         Override the list method to add caching for the courses list.
+        Expanded or trimmed responses are not cached.
         """
+        if 'ids' in request.query_params:
+            return super().list(request, *args, **kwargs)
+
         cache_key = "courses_list"
-        cached_data = cache.get(cache_key)
+        cacheable = not is_reshaped(request)
+        cached_data = cache.get(cache_key) if cacheable else None
 
         if cached_data:
             logger.info("Cache hit for courses list")
@@ -55,7 +69,8 @@ class CourseViewSet(viewsets.ModelViewSet):
         logger.info("Cache miss for courses list")
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
-        cache.set(cache_key, serializer.data, timeout=3600)  # Cache for 1 hour
+        if cacheable:
+            cache.set(cache_key, serializer.data, timeout=3600)  # Cache for 1 hour
         return Response(serializer.data)
 
     @swagger_auto_schema(
@@ -89,7 +104,7 @@ class CourseViewSet(viewsets.ModelViewSet):
         Clear cache when a course is updated.
         """
         instance = serializer.save()
-        cache.delete("courses_list")
+        cache.delete_many(["courses_list", self.object_cache_key.format(instance.id)])
         logger.info("Cache invalidated after updating a course")
         return instance
 
@@ -106,12 +121,13 @@ class CourseViewSet(viewsets.ModelViewSet):
         """
         Clear cache when a course is deleted.
         """
+        course_id = instance.id
         super().perform_destroy(instance)
-        cache.delete("courses_list")
+        cache.delete_many(["courses_list", self.object_cache_key.format(course_id)])
         logger.info("Cache invalidated after deleting a course")
 
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(SparseFieldsQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     """
     Handles operations related to enrollments with role-based permissions.
     Includes logging for key actions.
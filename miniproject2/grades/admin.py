@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from grades.models import Grade
+from grades.models import Grade, GradeHistory, StudentSummary
 
 # Register your models here.
-admin.site.register(Grade)
\ No newline at end of file
+admin.site.register(Grade)
+admin.site.register(StudentSummary)
+admin.site.register(GradeHistory)
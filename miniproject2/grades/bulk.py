@@ -0,0 +1,246 @@
+"""
+Bulk grade writes that bypass the one-request-per-grade API.
+"""
+
+import codecs
+import csv
+import math
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Greatest, Least
+
+from courses.models import Course
+from grades.history import CREATED, UPDATED, record_history
+from grades.models import GRADE_MAX, GRADE_MIN, Grade
+from grades.signals import grades_bulk_changed
+from grades.stats import grade_distribution
+from students.models import Student
+
+CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ('student', 'course', 'grade')
+NOT_UTF8 = "The file is not valid UTF-8."
+
+
+class GradeCSVImporter:
+    """
+    Streams a CSV of ``student,course,grade`` rows into ``Grade``.
+
+    Rows are validated and written in chunks inside one transaction: course
+    ownership, student existence and existing grades are resolved with one
+    set-based query per chunk, new grades go through ``bulk_create`` and
+    existing ones through ``bulk_update``. If any row is invalid nothing is
+    written and ``errors`` lists the offending rows.
+
+    ``professor`` restricts the import to courses taught by that user;
+    pass ``None`` for admins. Written grades are logged to the grade history
+    as changed by ``changed_by``.
+    """
+
+    def __init__(self, professor=None, chunk_size=CHUNK_SIZE, changed_by=None):
+        self.professor = professor
+        self.changed_by = changed_by
+        self.chunk_size = chunk_size
+        self.course_professors = {}  # course id -> professor id, None if missing
+        self.known_students = {}  # student id -> exists
+        self.grade_field = Grade._meta.get_field('grade')
+        self.errors = []
+        self.created = 0
+        self.updated = 0
+        self.course_ids = set()
+        self.student_ids = set()
+
+    def run(self, upload):
+        reader = csv.DictReader(codecs.iterdecode(upload, 'utf-8-sig'))
+        try:
+            fieldnames = reader.fieldnames or []
+        except UnicodeDecodeError:
+            self.errors.append({'row': 1, 'errors': [NOT_UTF8]})
+            return self
+        missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+        if missing:
+            self.errors.append({'row': 1, 'errors': [f"Missing column(s): {', '.join(missing)}."]})
+            return self
+
+        with transaction.atomic():
+            chunk = []
+            try:
+                for row in reader:
+                    parsed = self.parse_row(reader.line_num, row)
+                    if parsed is not None:
+                        chunk.append(parsed)
+                    if len(chunk) >= self.chunk_size:
+                        self.write_chunk(chunk)
+                        chunk = []
+            except UnicodeDecodeError:
+                self.errors.append({'row': reader.line_num + 1, 'errors': [NOT_UTF8]})
+            if chunk:
+                self.write_chunk(chunk)
+
+            if self.errors:
+                transaction.set_rollback(True)
+                self.created = self.updated = 0
+            elif self.course_ids:
+                grades_bulk_changed.send(
+                    sender=Grade, course_ids=self.course_ids, student_ids=self.student_ids
+                )
+        return self
+
+    def parse_row(self, line, row):
+        errors = []
+        values = {}
+        for column in ('student', 'course'):
+            try:
+                values[column] = int(row[column])
+            except (TypeError, ValueError):
+                errors.append(f"Invalid {column} ID {row[column]!r}.")
+        try:
+            values['grade'] = float(row['grade'])
+            # NaN compares false against the Min/Max validators, so it would pass them.
+            if not math.isfinite(values['grade']):
+                raise ValueError
+            self.grade_field.run_validators(values['grade'])
+        except (TypeError, ValueError):
+            errors.append(f"Invalid grade {row['grade']!r}.")
+        except ValidationError as exc:
+            errors += exc.messages
+
+        if errors:
+            self.errors.append({'row': line, 'errors': errors})
+            return None
+        return line, values['student'], values['course'], values['grade']
+
+    def write_chunk(self, chunk):
+        self.resolve_courses({course_id for _, _, course_id, _ in chunk})
+        self.resolve_students({student_id for _, student_id, _, _ in chunk})
+
+        grades = {}  # (student, course) -> grade; the last row wins
+        for line, student_id, course_id, grade in chunk:
+            errors = self.check_access(student_id, course_id)
+            if errors:
+                self.errors.append({'row': line, 'errors': errors})
+            else:
+                grades[student_id, course_id] = grade
+
+        # Once a row has failed the transaction is rolled back, so only keep validating.
+        if self.errors or not grades:
+            return
+
+        existing = {}
+        for instance in Grade.objects.filter(
+            student_id__in={student_id for student_id, _ in grades},
+            course_id__in={course_id for _, course_id in grades},
+        ).only('id', 'student_id', 'course_id').order_by('id'):
+            existing.setdefault((instance.student_id, instance.course_id), instance)
+
+        today = date.today()
+        to_create, to_update = [], []
+        for (student_id, course_id), grade in grades.items():
+            instance = existing.get((student_id, course_id))
+            if instance is None:
+                to_create.append(Grade(student_id=student_id, course_id=course_id, grade=grade))
+            else:
+                instance.grade, instance.date = grade, today
+                to_update.append(instance)
+
+        Grade.objects.bulk_create(to_create)
+        Grade.objects.bulk_update(to_update, ['grade', 'date'])
+        record_history(to_create, CREATED, changed_by=self.changed_by)
+        record_history(to_update, UPDATED, changed_by=self.changed_by)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        self.course_ids.update(course_id for _, course_id in grades)
+        self.student_ids.update(student_id for student_id, _ in grades)
+
+    def resolve_courses(self, course_ids):
+        missing = course_ids - self.course_professors.keys()
+        if missing:
+            self.course_professors.update(dict.fromkeys(missing))
+            self.course_professors.update(
+                Course.objects.filter(id__in=missing).values_list('id', 'professor_id')
+            )
+
+    def resolve_students(self, student_ids):
+        missing = student_ids - self.known_students.keys()
+        if missing:
+            self.known_students.update(dict.fromkeys(missing, False))
+            self.known_students.update(
+                (student_id, True)
+                for student_id in Student.objects.filter(id__in=missing).values_list('id', flat=True)
+            )
+
+    def check_access(self, student_id, course_id):
+        errors = []
+        professor_id = self.course_professors[course_id]
+        if professor_id is None:
+            errors.append(f"Course {course_id} does not exist.")
+        elif self.professor is not None and professor_id != self.professor.id:
+            errors.append(f"You can only grade students in courses you teach (course {course_id}).")
+        if not self.known_students[student_id]:
+            errors.append(f"Student {student_id} does not exist.")
+        return errors
+
+
+def _value(number):
+    return Value(float(number), output_field=FloatField())
+
+
+def _clamp(expression, lower, upper):
+    if lower is not None:
+        expression = Greatest(expression, _value(lower))
+    if upper is not None:
+        expression = Least(expression, _value(upper))
+    return expression
+
+
+def grade_operation(queryset, operation, params):
+    """
+    Return ``(queryset, expression)`` for a bulk operation: the grades it
+    touches and the SQL expression computing their new value, clamped to
+    the model's validator bounds.
+
+    - ``curve``: add ``points`` to every grade.
+    - ``rescale``: ``grade * factor + offset``.
+    - ``clamp``: raise grades below ``floor`` and lower grades above ``cap``.
+    - ``patch``: set explicit values, ``grades`` being ``{grade id: value}``.
+    """
+    grade = F('grade')
+    if operation == 'curve':
+        expression = grade + _value(params['points'])
+    elif operation == 'rescale':
+        expression = grade * _value(params.get('factor', 1.0)) + _value(params.get('offset', 0.0))
+    elif operation == 'clamp':
+        expression = _clamp(grade, params.get('floor'), params.get('cap'))
+    elif operation == 'patch':
+        queryset = queryset.filter(id__in=params['grades'])
+        expression = Case(
+            *(When(id=grade_id, then=_value(value)) for grade_id, value in params['grades'].items()),
+            default=grade, output_field=FloatField(),
+        )
+    else:
+        raise ValueError(f"Unknown grade operation {operation!r}.")
+    return queryset, _clamp(expression, GRADE_MIN, GRADE_MAX)
+
+
+def apply_grade_operation(course_id, operation, params, dry_run=False, changed_by=None):
+    """
+    Run a bulk operation on every grade of ``course_id`` as a single
+    ``UPDATE ... SET grade = <expression>``. With ``dry_run`` nothing is
+    written and the distribution the operation would produce is returned.
+    The new values are logged to the grade history in the same transaction.
+    """
+    queryset, expression = grade_operation(Grade.objects.filter(course_id=course_id), operation, params)
+
+    if dry_run:
+        return {'dry_run': True, 'updated': 0, 'distribution': grade_distribution(queryset, expression)}
+
+    with transaction.atomic():
+        updated = queryset.update(grade=expression, date=date.today())
+        record_history(
+            queryset.values_list('id', 'student_id', 'course_id', 'grade').iterator(chunk_size=CHUNK_SIZE),
+            UPDATED, changed_by=changed_by,
+        )
+        grades_bulk_changed.send(sender=Grade, course_ids=[course_id])
+    return {'dry_run': False, 'updated': updated, 'distribution': grade_distribution(queryset)}
@@ -0,0 +1,39 @@
+"""
+The students x courses gradebook matrix, fetched in one query and laid out
+as columns: the student ids, the course ids and one dense, row-major grade
+array with ``None`` for students without a grade in a course.
+"""
+
+from django.db.models import Avg, FloatField, Value
+
+from courses.models import Enrollment
+from grades.models import Grade
+
+
+def build_gradebook(course_ids):
+    """
+    A student appears if they are graded in or enrolled on any of
+    ``course_ids``. A cell is the student's average grade in the course.
+    """
+    course_ids = sorted(course_ids)
+    graded = (
+        Grade.objects.filter(course_id__in=course_ids)
+        .values_list('student_id', 'course_id').annotate(score=Avg('grade')).order_by()
+    )
+    enrolled = (
+        Enrollment.objects.filter(course_id__in=course_ids)
+        .annotate(score=Value(None, output_field=FloatField()))
+        .values_list('student_id', 'course_id', 'score')
+    )
+
+    cells = {}
+    for student_id, course_id, score in graded.union(enrolled, all=True):
+        if score is not None or (student_id, course_id) not in cells:
+            cells[student_id, course_id] = score
+
+    student_ids = sorted({student_id for student_id, _ in cells})
+    return {
+        'students': student_ids,
+        'courses': course_ids,
+        'grades': [cells.get((student_id, course_id)) for student_id in student_ids for course_id in course_ids],
+    }
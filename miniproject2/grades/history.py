@@ -0,0 +1,53 @@
+"""
+Writers and compaction for the append-only ``GradeHistory`` log.
+
+Callers record history inside the transaction that changes the grades, so a
+rolled-back write leaves no trace in the log either.
+"""
+
+from datetime import timedelta
+
+from django.db.models import DateTimeField, Exists, ExpressionWrapper, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from grades.models import GradeHistory
+
+HISTORY_BATCH_SIZE = 1000
+COMPACT_AFTER_DAYS = 30
+
+CREATED, UPDATED, DELETED = 'c', 'u', 'd'
+
+
+def record_history(grades, action, changed_by=None):
+    """
+    Append one entry per grade. ``grades`` are ``Grade`` instances or
+    ``(id, student_id, course_id, grade)`` tuples.
+    """
+    changed_at = timezone.now()
+    entries = []
+    for grade in grades:
+        grade_id, student_id, course_id, value = (
+            grade if isinstance(grade, tuple) else (grade.id, grade.student_id, grade.course_id, grade.grade)
+        )
+        entries.append(GradeHistory(
+            grade_id=grade_id, student_id=student_id, course_id=course_id, value=value,
+            action=action, changed_by=changed_by, changed_at=changed_at,
+        ))
+    GradeHistory.objects.bulk_create(entries, batch_size=HISTORY_BATCH_SIZE)
+
+
+def compact_history(older_than_days=COMPACT_AFTER_DAYS):
+    """
+    Collapse the edits older than ``older_than_days`` to the last entry per
+    grade and day, in one DELETE.
+    """
+    cutoff = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=older_than_days)
+    later_same_day = GradeHistory.objects.filter(
+        grade_id=OuterRef('grade_id'),
+        # OuterRef has no output field for TruncDate to infer a type from.
+        changed_at__date=TruncDate(ExpressionWrapper(OuterRef('changed_at'), output_field=DateTimeField())),
+        changed_at__gt=OuterRef('changed_at'),
+    )
+    deleted, _ = GradeHistory.objects.filter(changed_at__lt=cutoff).filter(Exists(later_same_day)).delete()
+    return deleted
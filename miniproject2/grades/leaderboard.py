@@ -0,0 +1,117 @@
+"""
+Per-course rankings kept in Redis sorted sets: one set per course, scored by
+each student's average grade in it, so top-N, rank and neighbour lookups are
+O(log n) instead of sorting the course's grades per request.
+"""
+
+from django.core.cache import cache
+from django.db.models import Avg
+from django_redis import get_redis_connection
+
+from grades.models import Grade
+
+
+def leaderboard_key(course_id):
+    return cache.make_key(f"leaderboard_{course_id}")
+
+
+def course_scores(grades):
+    return grades.values_list('course_id', 'student_id').annotate(score=Avg('grade')).order_by()
+
+
+def rebuild_leaderboards(course_ids):
+    """
+    Replace the sorted sets of ``course_ids`` with the scores in the database.
+    """
+    scores = {course_id: {} for course_id in course_ids}
+    for course_id, student_id, score in course_scores(Grade.objects.filter(course_id__in=course_ids)):
+        scores[course_id][student_id] = score
+
+    pipeline = get_redis_connection('default').pipeline()
+    for course_id, members in scores.items():
+        pipeline.delete(leaderboard_key(course_id))
+        if members:
+            pipeline.zadd(leaderboard_key(course_id), members)
+    pipeline.execute()
+
+
+def update_leaderboards(course_ids, student_ids):
+    """
+    Re-score ``student_ids`` in ``course_ids``; students left without a grade
+    in a course drop out of its ranking. Courses whose set Redis lost are
+    skipped, as writing into them would leave a partial ranking; they are
+    rebuilt whole on their next read.
+    """
+    redis = get_redis_connection('default')
+    course_ids = list(course_ids)
+    pipeline = redis.pipeline()
+    for course_id in course_ids:
+        pipeline.exists(leaderboard_key(course_id))
+    course_ids = [course_id for course_id, exists in zip(course_ids, pipeline.execute()) if exists]
+    if not course_ids:
+        return
+
+    grades = Grade.objects.filter(course_id__in=course_ids, student_id__in=student_ids)
+    scores = {(course_id, student_id): score for course_id, student_id, score in course_scores(grades)}
+
+    pipeline = redis.pipeline()
+    for course_id in course_ids:
+        for student_id in student_ids:
+            score = scores.get((course_id, student_id))
+            if score is None:
+                pipeline.zrem(leaderboard_key(course_id), student_id)
+            else:
+                pipeline.zadd(leaderboard_key(course_id), {student_id: score})
+    pipeline.execute()
+
+
+def _leaderboard(course_id):
+    """
+    The course's Redis key and client, rebuilding the set if Redis lost it.
+    """
+    redis, key = get_redis_connection('default'), leaderboard_key(course_id)
+    if not redis.exists(key):
+        rebuild_leaderboards([course_id])
+    return redis, key
+
+
+def _entries(redis, key, start, stop):
+    return [
+        {'student': int(member), 'score': score}
+        for member, score in redis.zrevrange(key, start, stop, withscores=True)
+    ]
+
+
+def top_students(course_id, limit):
+    redis, key = _leaderboard(course_id)
+    return {'count': redis.zcard(key), 'results': _entries(redis, key, 0, limit - 1)}
+
+
+def student_rank(course_id, student_id, neighbours=0):
+    """
+    ``student_id``'s competition rank (ties share a rank) and the percentage
+    of the course scoring below them, or ``None`` if they are not ranked.
+    """
+    redis, key = _leaderboard(course_id)
+    pipeline = redis.pipeline()
+    pipeline.zscore(key, student_id)
+    pipeline.zrevrank(key, student_id)
+    pipeline.zcard(key)
+    score, position, count = pipeline.execute()
+    if score is None:
+        return None
+
+    pipeline = redis.pipeline()
+    pipeline.zcount(key, f"({score}", '+inf')
+    pipeline.zcount(key, '-inf', f"({score}")
+    above, below = pipeline.execute()
+    ranking = {
+        'student': int(student_id),
+        'score': score,
+        'rank': above + 1,
+        'count': count,
+        'percentile': round(100 * below / count, 2),
+    }
+    if neighbours:
+        ranking['neighbours'] = _entries(redis, key, max(position - neighbours, 0), position + neighbours)
+    return ranking
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from grades.leaderboard import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis course leaderboards from the grades table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Courses to rebuild (default: all)')
+
+    def handle(self, *args, **kwargs):
+        course_ids = kwargs['course_ids'] or list(Course.objects.values_list('id', flat=True))
+        rebuild_leaderboards(course_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(course_ids)} course leaderboard(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from grades.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute every student grade summary from the grades table'
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_summaries()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} student summaries."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from grades.signals import grades_changed
+
+
+class Command(BaseCommand):
+    help = ('Bring the grade read models (summaries, statistics, dashboards, leaderboards) in line with the '
+            'grades table after writes that skipped the grade signals, such as data migrations')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', nargs='+', type=int, help='Courses whose grades changed (default: all)')
+        parser.add_argument('--students', nargs='+', type=int,
+                            help='Students whose grades changed (default: every student graded in the courses)')
+
+    def handle(self, *args, **kwargs):
+        course_ids = kwargs['courses'] or list(Course.objects.values_list('id', flat=True))
+        # Outside a transaction the on-commit updates run right away.
+        grades_changed(course_ids, kwargs['students'])
+        self.stdout.write(self.style.SUCCESS(f"Resynced the grade read models of {len(course_ids)} course(s)."))
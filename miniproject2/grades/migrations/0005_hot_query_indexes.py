@@ -0,0 +1,55 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.utils import timezone
+
+from miniproject2.migration_utils import add_unique_constraint_concurrently, logger, remove_duplicates
+
+
+def grades_removed(apps, removed):
+    """
+    Log the removed duplicates to the grade history. The read models built
+    from grades (summaries, statistics, dashboards, leaderboards) are left to
+    the ``resync_grades`` command, whose invocation is logged.
+    """
+    GradeHistory = apps.get_model('grades', 'GradeHistory')
+    now = timezone.now()
+    GradeHistory.objects.bulk_create([
+        GradeHistory(grade_id=row['id'], student_id=row['student_id'], course_id=row['course_id'],
+                     value=row['grade'], action='d', changed_at=now)
+        for row in removed
+    ])
+    course_ids = sorted({row['course_id'] for row in removed})
+    student_ids = sorted({row['student_id'] for row in removed})
+    logger.warning(
+        f"Duplicate grades were removed; once migrated, run: manage.py resync_grades "
+        f"--courses {' '.join(map(str, course_ids))} --students {' '.join(map(str, student_ids))}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('grades', '0004_gradehistory'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='grade',
+            index=models.Index(fields=['course', 'date'], name='grade_course_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='grade',
+            index=models.Index(fields=['student', 'date'], name='grade_student_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='grade',
+            index=models.Index(fields=['date'], name='grade_date_idx'),
+        ),
+        remove_duplicates('grades', 'Grade', ['student', 'course'], grades_removed),
+        add_unique_constraint_concurrently(
+            'grade', 'grades_grade',
+            models.UniqueConstraint(fields=('student', 'course'), name='unique_grade_per_course'),
+        ),
+    ]
@@ -2,17 +2,80 @@ from django.db import models
 from students.models import Student
 from courses.models import Course
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from users.models import User
+
+GRADE_MIN = 0.0
+GRADE_MAX = 100.0
 
 class Grade(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     grade = models.FloatField(
         validators=[
-            MinValueValidator(0.0),  # Minimum value is 0
-            MaxValueValidator(100.0)  # Maximum value is 100
+            MinValueValidator(GRADE_MIN),  # Minimum value is 0
+            MaxValueValidator(GRADE_MAX)  # Maximum value is 100
         ]
     )
     date = models.DateField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_grade_per_course'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'date'], name='grade_course_date_idx'),
+            models.Index(fields=['student', 'date'], name='grade_student_date_idx'),
+            models.Index(fields=['date'], name='grade_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.user.username} - {self.course.name} - {self.grade}"
+
+
+class StudentSummary(models.Model):
+    """
+    Per-student grade aggregates, kept in step with ``Grade`` writes by
+    ``grades.summary`` so a transcript is a primary-key lookup.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    course_count = models.PositiveIntegerField(default=0)
+    grade_count = models.PositiveIntegerField(default=0)
+    grade_total = models.FloatField(default=0.0)
+    min_grade = models.FloatField(null=True)
+    max_grade = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def average(self):
+        # Every grade counts once, so courses with more grades weigh more.
+        return self.grade_total / self.grade_count if self.grade_count else None
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_count} course(s) - {self.average}"
+
+
+HISTORY_ACTION_CHOICES = [
+    ('c', 'Created'),
+    ('u', 'Updated'),
+    ('d', 'Deleted'),
+]
+
+class GradeHistory(models.Model):
+    """
+    Append-only log of grade values. ``grade_id`` is a plain integer so the
+    history outlives the grade; deletions are recorded with the last value.
+    """
+    grade_id = models.BigIntegerField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    value = models.FloatField()
+    action = models.CharField(max_length=1, choices=HISTORY_ACTION_CHOICES)
+    changed_by = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['student', 'course', 'changed_at'], name='grade_history_lookup_idx')]
+
+    def __str__(self):
+        return f"{self.grade_id} - {self.get_action_display()} {self.value} at {self.changed_at}"
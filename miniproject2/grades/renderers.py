@@ -0,0 +1,32 @@
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer
+
+
+class GradebookCSVRenderer(BaseRenderer):
+    """
+    Renders a gradebook matrix as CSV: a ``student`` column followed by one
+    column per course id, empty cells for missing grades. Anything else (error
+    responses) is written as ``key,value`` rows.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not {'students', 'courses', 'grades'} <= data.keys():
+            writer.writerows(data.items())
+            return buffer.getvalue().encode(self.charset)
+
+        courses, grades = data['courses'], data['grades']
+        writer.writerow(['student', *courses])
+        for row, student_id in enumerate(data['students']):
+            cells = grades[row * len(courses):(row + 1) * len(courses)]
+            writer.writerow([student_id, *('' if grade is None else grade for grade in cells)])
+        return buffer.getvalue().encode(self.charset)
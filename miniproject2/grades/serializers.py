@@ -1,7 +1,79 @@
-from grades.models import Grade
+import math
+
+from grades.models import GRADE_MAX, GRADE_MIN, Grade, StudentSummary
 from rest_framework import serializers
+from courses.serializers import CourseSerializer
+from miniproject2.serializers import ExpandableFieldsMixin, SparseFieldsMixin
+from students.serializers import StudentSerializer
 
-class GradeSerializer(serializers.ModelSerializer):
+class GradeSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Grade
         fields = ['id', 'student', 'course', 'grade', 'date']
+        expandable_fields = {'student': StudentSerializer, 'course': CourseSerializer}
+
+
+class StudentSummarySerializer(serializers.ModelSerializer):
+    average = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = StudentSummary
+        fields = ['student', 'course_count', 'grade_count', 'average', 'min_grade', 'max_grade', 'updated_at']
+
+
+class FiniteFloatField(serializers.FloatField):
+    """
+    A ``FloatField`` rejecting NaN and infinities, which slip past
+    ``min_value``/``max_value`` and end up at a bound once clamped in SQL.
+    """
+    default_error_messages = {'non_finite': "A finite number is required."}
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not math.isfinite(value):
+            self.fail('non_finite')
+        return value
+
+
+class GradePatchSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    grade = FiniteFloatField(min_value=GRADE_MIN, max_value=GRADE_MAX)
+
+
+class GradeBulkOperationSerializer(serializers.Serializer):
+    """
+    Input for the course-wide bulk grade operations; see ``grades.bulk.grade_operation``.
+    """
+    operation = serializers.ChoiceField(choices=['curve', 'rescale', 'clamp', 'patch'])
+    points = FiniteFloatField(required=False)
+    factor = FiniteFloatField(required=False, min_value=0.0)
+    offset = FiniteFloatField(required=False)
+    floor = FiniteFloatField(required=False, min_value=GRADE_MIN, max_value=GRADE_MAX)
+    cap = FiniteFloatField(required=False, min_value=GRADE_MIN, max_value=GRADE_MAX)
+    grades = GradePatchSerializer(many=True, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    required_params = {
+        'curve': ['points'],
+        'rescale': [],
+        'clamp': [],
+        'patch': ['grades'],
+    }
+
+    def validate(self, attrs):
+        operation = attrs['operation']
+        missing = [name for name in self.required_params[operation] if name not in attrs]
+        if missing:
+            raise serializers.ValidationError(
+                {name: f"This field is required for '{operation}'." for name in missing}
+            )
+        if operation == 'rescale' and 'factor' not in attrs and 'offset' not in attrs:
+            raise serializers.ValidationError("'rescale' needs a factor, an offset or both.")
+        if operation == 'clamp':
+            if 'floor' not in attrs and 'cap' not in attrs:
+                raise serializers.ValidationError("'clamp' needs a floor, a cap or both.")
+            if attrs.get('floor', GRADE_MIN) > attrs.get('cap', GRADE_MAX):
+                raise serializers.ValidationError("The floor cannot be above the cap.")
+        if operation == 'patch':
+            attrs['grades'] = {patch['id']: patch['grade'] for patch in attrs['grades']}
+        return attrs
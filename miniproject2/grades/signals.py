@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+import logging
+
+from grades.leaderboard import rebuild_leaderboards, update_leaderboards
+from grades.models import Grade
+from grades.stats import invalidate_statistics
+from grades.summary import refresh_summaries
+from students.dashboard import invalidate_dashboards
+
+logger = logging.getLogger('app_logger')
+
+# Sent by bulk writers (queryset.update(), bulk_create/bulk_update), which skip
+# the model signals, with ``course_ids``: the courses whose grades changed, and
+# optionally ``student_ids`` when the writer knows which students were touched.
+grades_bulk_changed = Signal()
+
+
+def grades_changed(course_ids, student_ids=None):
+    course_ids = set(course_ids)
+    student_ids = set(student_ids) if student_ids is not None else None
+    transaction.on_commit(lambda: invalidate_statistics(course_ids))
+    transaction.on_commit(lambda: refresh_summaries(student_ids=student_ids, course_ids=course_ids))
+    transaction.on_commit(lambda: invalidate_dashboards(student_ids, course_ids))
+    if student_ids is None:
+        transaction.on_commit(lambda: rebuild_leaderboards(course_ids))
+    else:
+        transaction.on_commit(lambda: update_leaderboards(course_ids, student_ids))
+
+
+@receiver([post_save, post_delete], sender=Grade)
+def grade_saved_or_deleted(sender, instance, **kwargs):
+    grades_changed([instance.course_id], [instance.student_id])
+
+
+@receiver(grades_bulk_changed)
+def grades_bulk_written(sender, course_ids, student_ids=None, **kwargs):
+    logger.info(f"Bulk grade change in course(s) {sorted(course_ids)}.")
+    grades_changed(course_ids, student_ids)
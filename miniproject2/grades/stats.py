@@ -0,0 +1,141 @@
+"""
+Per-course grade statistics, computed in the database where it can and
+cached until the course's grades change.
+
+Cache entries are keyed by a per-course generation that invalidation drops:
+statistics computed from a read that a grade write overtook are stored
+under the old generation, which is never read again.
+"""
+
+from uuid import uuid4
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Max, Min, Q, StdDev
+
+from grades.models import GRADE_MAX, GRADE_MIN, Grade
+
+STATS_CACHE_TIMEOUT = 3600
+PERCENTILES = (25, 50, 75, 90)
+BUCKET_SIZE = 10
+
+
+class PercentileCont(Aggregate):
+    """
+    PostgreSQL's ``percentile_cont(fraction) WITHIN GROUP (ORDER BY expression)``.
+    """
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def stats_generation_key(course_id):
+    return f"grade_stats_generation_{course_id}"
+
+
+def stats_cache_key(course_id, generation):
+    return f"grade_stats_{course_id}_{generation}"
+
+
+def histogram_edges(bucket_size=BUCKET_SIZE):
+    return list(range(int(GRADE_MIN), int(GRADE_MAX), bucket_size))
+
+
+def histogram(counts, bucket_size=BUCKET_SIZE):
+    return [
+        {'from': start, 'to': min(start + bucket_size, GRADE_MAX), 'count': count}
+        for start, count in zip(histogram_edges(bucket_size), counts)
+    ]
+
+
+def course_statistics(course_id):
+    """
+    Statistics for one course, served from the cache when possible.
+    """
+    # Read before computing: a write committed meanwhile drops this generation.
+    generation = cache.get_or_set(stats_generation_key(course_id), lambda: uuid4().hex, timeout=None)
+    key = stats_cache_key(course_id, generation)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_statistics(course_id)
+        cache.set(key, stats, timeout=STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_statistics(course_ids):
+    cache.delete_many([stats_generation_key(course_id) for course_id in course_ids])
+
+
+def grade_distribution(queryset, expression=None, bucket_size=BUCKET_SIZE, **aggregates):
+    """
+    Count, mean, min, max and a histogram of ``expression`` (the stored grade
+    by default) over ``queryset``, computed in a single aggregate query.
+    Extra ``aggregates`` over ``value`` join the query and are returned under
+    their names.
+    """
+    queryset = queryset.annotate(value=expression if expression is not None else F('grade'))
+
+    edges = histogram_edges(bucket_size)
+    aggregates.update(count=Count('id'), mean=Avg('value'), min=Min('value'), max=Max('value'))
+    for start in edges:
+        in_bucket = Q(value__gte=start)
+        if start + bucket_size < GRADE_MAX:
+            in_bucket &= Q(value__lt=start + bucket_size)
+        aggregates[f"bucket_{start}"] = Count('id', filter=in_bucket)
+
+    result = queryset.aggregate(**aggregates)
+    counts = [result.pop(f"bucket_{start}") for start in edges]
+    return {**result, 'histogram': histogram(counts, bucket_size)}
+
+
+def compute_statistics(course_id):
+    queryset = Grade.objects.filter(course_id=course_id)
+    if connections[router.db_for_read(Grade)].vendor == 'postgresql':
+        return _aggregate_statistics(queryset)
+    return _numpy_statistics(queryset)
+
+
+def _aggregate_statistics(queryset):
+    """
+    Everything in one aggregate query using PostgreSQL's ordered-set aggregates.
+    """
+    percentiles = {f"p{percentile}": PercentileCont('value', percentile / 100) for percentile in PERCENTILES}
+    result = grade_distribution(queryset, stddev=StdDev('value'), **percentiles)
+    return _statistics(result, {percentile: result[f"p{percentile}"] for percentile in PERCENTILES})
+
+
+def _numpy_statistics(queryset):
+    """
+    Fallback for backends without ``percentile_cont``: fetch the grade column
+    only and let NumPy do the maths in one vectorized pass.
+    """
+    values = np.fromiter(queryset.values_list('grade', flat=True), dtype=float)
+    counts, _ = np.histogram(values, bins=histogram_edges() + [GRADE_MAX])
+
+    if not values.size:
+        result = dict.fromkeys(['mean', 'stddev', 'min', 'max'])
+        return _statistics({'count': 0, **result, 'histogram': histogram(counts.tolist())}, dict.fromkeys(PERCENTILES))
+
+    result = {
+        'count': int(values.size), 'mean': float(values.mean()), 'stddev': float(values.std()),
+        'min': float(values.min()), 'max': float(values.max()), 'histogram': histogram(counts.tolist()),
+    }
+    percentiles = np.percentile(values, PERCENTILES)
+    return _statistics(result, {percentile: float(value) for percentile, value in zip(PERCENTILES, percentiles)})
+
+
+def _statistics(result, percentiles):
+    return {
+        'count': result['count'],
+        'mean': result['mean'],
+        'median': percentiles[50],
+        'stddev': result['stddev'],
+        'min': result['min'],
+        'max': result['max'],
+        'percentiles': {str(percentile): value for percentile, value in percentiles.items()},
+        'histogram': result['histogram'],
+    }
@@ -0,0 +1,73 @@
+"""
+Maintenance of the ``StudentSummary`` read model: one grouped aggregate over
+the affected students' grades, upserted in a single statement.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Sum
+
+from grades.models import Grade, StudentSummary
+
+SUMMARY_FIELDS = ['course_count', 'grade_count', 'grade_total', 'min_grade', 'max_grade', 'updated_at']
+BATCH_SIZE = 1000
+
+
+def summary_rows(grades):
+    return grades.values('student_id').annotate(
+        course_count=Count('course_id', distinct=True),
+        grade_count=Count('id'),
+        grade_total=Sum('grade'),
+        min_grade=Min('grade'),
+        max_grade=Max('grade'),
+    ).order_by()
+
+
+def _write(rows):
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(StudentSummary(**row))
+        if len(batch) >= BATCH_SIZE:
+            written += _upsert(batch)
+            batch = []
+    return written + _upsert(batch)
+
+
+def _upsert(summaries):
+    if summaries:
+        StudentSummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=['student'], update_fields=SUMMARY_FIELDS,
+        )
+    return len(summaries)
+
+
+def _without_grades(summaries):
+    return summaries.filter(~Exists(Grade.objects.filter(student_id=OuterRef('student_id'))))
+
+
+def refresh_summaries(student_ids=None, course_ids=None):
+    """
+    Recompute the summaries of ``student_ids``, or of every student graded in
+    ``course_ids``. Students left without grades lose their summary.
+    """
+    if student_ids is None:
+        student_ids = set(
+            Grade.objects.filter(course_id__in=course_ids).values_list('student_id', flat=True).distinct()
+        )
+    if not student_ids:
+        return 0
+
+    with transaction.atomic():
+        written = _write(summary_rows(Grade.objects.filter(student_id__in=student_ids)))
+        _without_grades(StudentSummary.objects.filter(student_id__in=student_ids)).delete()
+    return written
+
+
+def rebuild_summaries():
+    """
+    Recompute every summary from scratch with one grouped query.
+    """
+    with transaction.atomic():
+        written = _write(summary_rows(Grade.objects.all()))
+        _without_grades(StudentSummary.objects.all()).delete()
+    return written
@@ -0,0 +1,19 @@
+"""
+Background tasks for the grades app.
+
+Tasks:
+- compact_grade_history: Collapses old intra-day grade edits in the history log.
+"""
+
+from celery import shared_task
+
+from grades.history import compact_history
+
+
+@shared_task
+def compact_grade_history():
+    """
+    Keeps only the last recorded value per grade and day for history older
+    than a month. This task is executed every day using Celery Beat.
+    """
+    return compact_history()
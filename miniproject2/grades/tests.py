@@ -5,12 +5,30 @@ from users.models import User
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 from students.models import Student
-from courses.models import Course
-from grades.models import Grade
+from courses.models import Course, Enrollment
+from grades.models import Grade, GradeHistory, StudentSummary
 from users.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 import json
 from django.urls import reverse
+from django.core.management import call_command
+from io import StringIO
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.renderers import JSONRenderer
+from courses.serializers import CourseSerializer
+from grades.serializers import GradeSerializer
+from miniproject2.serializers import compile_values_serializer
+from django.core.cache import cache
+from grades.stats import compute_statistics, stats_generation_key
+from grades.summary import rebuild_summaries
+from grades.history import compact_history
+from datetime import timedelta
+from django.utils import timezone
+from grades.leaderboard import leaderboard_key
+from django_redis import get_redis_connection
 
 class GradeModelTest(TestCase):
     def setUp(self):
@@ -81,8 +99,9 @@ class GradeAPITestCase(APITestCase):
         response = self.client.get(protected_url, **headers)
         self.assertNotEqual(response.status_code, 401, "Authentication failed: Unauthorized access.")
 
-        # Step 3: Attempt to create a grade
-        data = {'student': self.student.id, 'course': self.course.id, 'grade': 95.0}
+        # Step 3: Attempt to create a grade (one grade per student and course)
+        course = Course.objects.create(name="Second Course", description="Second", professor=self.teacher_user)
+        data = {'student': self.student.id, 'course': course.id, 'grade': 95.0}
         response = self.client.post(protected_url, data, format='json', **headers)
 
         # Assert that the grade was successfully created
@@ -109,8 +128,9 @@ class GradeAPITestCase(APITestCase):
         response = self.client.get(protected_url, **headers)
         self.assertNotEqual(response.status_code, 401, "Authentication failed: Unauthorized access.")
 
-        # Step 3: Attempt to create a grade
-        data = {'student': self.student.id, 'course': self.course.id, 'grade': 95.0}
+        # Step 3: Attempt to create a grade (one grade per student and course)
+        course = Course.objects.create(name="Second Course", description="Second", professor=self.teacher_user)
+        data = {'student': self.student.id, 'course': course.id, 'grade': 95.0}
         response = self.client.post(protected_url, data, format='json', **headers)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED, "Grade creation failed.")
         self.assertEqual(response.data['grade'], data['grade'], "The grade value does not match.")
@@ -118,6 +138,13 @@ class GradeAPITestCase(APITestCase):
         self.assertEqual(response.data['course'], data['course'], "The course value does not match.")
 
         
+    def test_grade_create_duplicate(self):
+        """Test that a student can only have one grade per course."""
+        data = {'student': self.student.id, 'course': self.course.id, 'grade': 95.0}
+        headers = self.get_authentication_headers(self.teacher_user)
+        response = self.client.post(reverse('grade-list'), data, format='json', **headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_grade_update_teacher(self):
         """Test that a teacher can update a grade."""
         data = {'grade': 98.0}
@@ -207,4 +234,538 @@ class GradeAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Admin should see all grades
-        self.assertGreater(len(response.data), 0)  # Admin should see at least one grade
\ No newline at end of file
+        self.assertGreater(len(response.data), 0)  # Admin should see at least one grade
+
+class GradeExpandTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def create_grades(self, count):
+        for i in range(count):
+            user = User.objects.create_user(username=f"student{Grade.objects.count()}", password="password", role="student")
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            Grade.objects.create(student=student, course=self.course, grade=50.0 + i)
+
+    def test_expand_embeds_related_objects(self):
+        self.create_grades(1)
+        response = self.client.get(reverse('grade-list'), {'expand': 'student,course,student.user'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        row = response.data['results'][0]
+        self.assertEqual(row['course']['name'], "Test Course")
+        self.assertEqual(row['student']['dob'], '2000-01-01')
+        self.assertEqual(row['student']['user']['username'], "student0")
+
+    def test_expand_does_not_expose_emails(self):
+        self.create_grades(1)
+        response = self.client.get(reverse('grade-list'), {'expand': 'student,course,student.user,course.professor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        row = response.data['results'][0]
+        self.assertEqual(set(row['student']['user']), {'id', 'username', 'role'})
+        self.assertEqual(set(row['course']['professor']), {'id', 'username', 'role'})
+
+    def test_expand_ignores_unknown_fields(self):
+        self.create_grades(1)
+        response = self.client.get(reverse('grade-list'), {'expand': 'grade,nonexistent'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['course'], self.course.id)
+
+    def test_expand_uses_constant_number_of_queries(self):
+        """An expanded page costs the same number of queries regardless of its size."""
+        params = {'expand': 'student,course,student.user'}
+
+        self.create_grades(2)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(reverse('grade-list'), params)
+
+        self.create_grades(8)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(reverse('grade-list'), params)
+
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(small_page), len(large_page))
+
+
+class GradeValuesListParityTest(APITestCase):
+    """The fast values_list() read path must render exactly what GradeSerializer renders."""
+
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        for i, value in enumerate([0.0, 55.5, 72.25, 100.0, 88.0]):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            Grade.objects.create(student=student, course=self.course, grade=value)
+
+    def render_both(self, field_names=None):
+        queryset = Grade.objects.order_by('id')
+        columns, convert = compile_values_serializer(GradeSerializer, field_names)
+        fast = [convert(row) for row in queryset.values_list(*columns)]
+        regular = GradeSerializer(queryset, many=True, fields=dict.fromkeys(field_names or [], {})).data
+        return JSONRenderer().render(fast), JSONRenderer().render(regular)
+
+    def test_full_rows_are_byte_identical(self):
+        fast, regular = self.render_both()
+        self.assertEqual(fast, regular)
+
+    def test_sparse_rows_are_byte_identical(self):
+        fast, regular = self.render_both(('id', 'grade', 'date'))
+        self.assertEqual(fast, regular)
+
+    def test_list_endpoint_matches_serializer(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(reverse('grade-list'))
+        expected = GradeSerializer(Grade.objects.filter(course__professor=self.teacher_user), many=True).data
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            sorted(json.loads(JSONRenderer().render(response.data['results'])), key=lambda row: row['id']),
+            sorted(json.loads(JSONRenderer().render(expected)), key=lambda row: row['id']),
+        )
+
+    def test_unsupported_serializer_falls_back(self):
+        class NestedGradeSerializer(GradeSerializer):
+            course = CourseSerializer(read_only=True)
+
+        self.assertIsNone(compile_values_serializer(NestedGradeSerializer))
+
+
+class GradeImportTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="otherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.other_course = Course.objects.create(name="Other Course", description="Other", professor=self.other_teacher)
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            self.students.append(Student.objects.create(user=user, dob='2000-01-01'))
+        self.existing = Grade.objects.create(student=self.students[0], course=self.course, grade=40.0)
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def upload(self, rows):
+        content = "student,course,grade\n" + "".join(f"{s},{c},{g}\n" for s, c, g in rows)
+        upload = SimpleUploadedFile("grades.csv", content.encode(), content_type="text/csv")
+        return self.client.post(reverse('grade-import-csv'), {'file': upload}, format='multipart')
+
+    def test_import_creates_and_updates(self):
+        response = self.upload([(student.id, self.course.id, 70 + i) for i, student in enumerate(self.students)])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 2, "updated": 1})
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.grade, 70.0)
+        self.assertEqual(Grade.objects.filter(course=self.course).count(), 3)
+
+    def test_import_reports_row_errors_and_writes_nothing(self):
+        response = self.upload([
+            (self.students[1].id, self.course.id, 80),
+            (self.students[2].id, self.course.id, 105),
+            (999, self.course.id, 50),
+            (self.students[1].id, self.other_course.id, 60),
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row['row'] for row in response.data['rows']], [3, 4, 5])
+        self.assertEqual(Grade.objects.count(), 1)
+
+    def test_import_rejects_non_finite_grades(self):
+        response = self.upload([
+            (self.students[1].id, self.course.id, 'nan'),
+            (self.students[2].id, self.course.id, 'inf'),
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row['row'] for row in response.data['rows']], [2, 3])
+        self.assertEqual(Grade.objects.count(), 1)
+
+    def test_import_rejects_files_that_are_not_utf8(self):
+        content = f"student,course,grade\n{self.students[1].id},{self.course.id},80\n".encode() + b"\xff\xfe,1,2\n"
+        upload = SimpleUploadedFile("grades.csv", content, content_type="text/csv")
+        response = self.client.post(reverse('grade-import-csv'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Grade.objects.count(), 1)
+
+    def test_import_uses_set_based_queries(self):
+        """The number of queries does not grow with the number of rows."""
+        for i in range(3, 6):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            self.students.append(Student.objects.create(user=user, dob='2000-01-01'))
+
+        with CaptureQueriesContext(connection) as few_rows:
+            self.upload([(student.id, self.course.id, 65) for student in self.students[:2]])
+        with CaptureQueriesContext(connection) as more_rows:
+            self.upload([(student.id, self.course.id, 75) for student in self.students[:1] + self.students[2:]])
+        self.assertEqual(Grade.objects.filter(course=self.course).count(), 6)
+        self.assertEqual(len(few_rows), len(more_rows))
+
+    def test_student_cannot_import(self):
+        student_user = self.students[0].user
+        self.client.force_authenticate(user=student_user)
+        response = self.upload([(self.students[0].id, self.course.id, 100)])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GradeBulkOperationTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="otherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.other_course = Course.objects.create(name="Other Course", description="Other", professor=self.other_teacher)
+        self.grades = []
+        for i, value in enumerate([40.0, 75.0, 95.0]):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            student = Student.objects.create(user=user, dob='2000-01-01')
+            self.grades.append(Grade.objects.create(student=student, course=self.course, grade=value))
+        self.outside = Grade.objects.create(student=student, course=self.other_course, grade=50.0)
+        self.url = reverse('grade-bulk-operation', kwargs={'course_id': self.course.id})
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def values(self):
+        return list(Grade.objects.filter(course=self.course).order_by('id').values_list('grade', flat=True))
+
+    def test_curve_is_clamped_and_leaves_other_courses_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'operation': 'curve', 'points': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(self.values(), [50.0, 85.0, 100.0])
+        self.assertEqual(response.data['distribution']['max'], 100.0)
+        self.outside.refresh_from_db()
+        self.assertEqual(self.outside.grade, 50.0)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+    def test_rescale_and_clamp(self):
+        self.client.post(self.url, {'operation': 'rescale', 'factor': 0.5, 'offset': 20}, format='json')
+        self.assertEqual(self.values(), [40.0, 57.5, 67.5])
+        self.client.post(self.url, {'operation': 'clamp', 'floor': 45, 'cap': 60}, format='json')
+        self.assertEqual(self.values(), [45.0, 57.5, 60.0])
+
+    def test_patch_only_touches_listed_grades_in_course(self):
+        response = self.client.post(self.url, {'operation': 'patch', 'grades': [
+            {'id': self.grades[0].id, 'grade': 65}, {'id': self.outside.id, 'grade': 10},
+        ]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self.values(), [65.0, 75.0, 95.0])
+        self.outside.refresh_from_db()
+        self.assertEqual(self.outside.grade, 50.0)
+
+    def test_dry_run_returns_distribution_without_writing(self):
+        response = self.client.post(self.url, {'operation': 'curve', 'points': -50, 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        distribution = response.data['distribution']
+        self.assertEqual((distribution['count'], distribution['min'], distribution['max']), (3, 0.0, 45.0))
+        self.assertEqual(distribution['histogram'][0]['count'], 1)
+        self.assertEqual(sum(bucket['count'] for bucket in distribution['histogram']), 3)
+        self.assertEqual(self.values(), [40.0, 75.0, 95.0])
+
+    def test_invalid_operation_parameters(self):
+        response = self.client.post(self.url, {'operation': 'curve'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'operation': 'clamp', 'floor': 80, 'cap': 20}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_finite_parameters_are_rejected(self):
+        for payload in [
+            {'operation': 'curve', 'points': 'NaN'},
+            {'operation': 'rescale', 'factor': 'Infinity'},
+            {'operation': 'clamp', 'floor': 'NaN'},
+            {'operation': 'patch', 'grades': [{'id': self.grades[0].id, 'grade': 'NaN'}]},
+        ]:
+            response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        self.assertEqual(self.values(), [40.0, 75.0, 95.0])
+
+    def test_teacher_cannot_change_other_course(self):
+        url = reverse('grade-bulk-operation', kwargs={'course_id': self.other_course.id})
+        response = self.client.post(url, {'operation': 'curve', 'points': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.outside.refresh_from_db()
+        self.assertEqual(self.outside.grade, 50.0)
+
+
+class GradeStatisticsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="otherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.other_course = Course.objects.create(name="Other Course", description="Other", professor=self.other_teacher)
+        self.grades = []
+        for i, value in enumerate([50.0, 60.0, 70.0, 100.0]):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            self.student = Student.objects.create(user=user, dob='2000-01-01')
+            self.grades.append(Grade.objects.create(student=self.student, course=self.course, grade=value))
+        self.url = reverse('grade-statistics', kwargs={'course_id': self.course.id})
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_statistics_values(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['mean'], 70.0)
+        self.assertEqual(response.data['median'], 65.0)
+        self.assertAlmostEqual(response.data['stddev'], 18.708, places=3)
+        self.assertEqual((response.data['min'], response.data['max']), (50.0, 100.0))
+        self.assertEqual(response.data['percentiles']['25'], 57.5)
+        histogram = {bucket['from']: bucket['count'] for bucket in response.data['histogram']}
+        self.assertEqual((histogram[50], histogram[60], histogram[70], histogram[90]), (1, 1, 1, 1))
+
+    def test_empty_course(self):
+        stats = compute_statistics(self.other_course.id)
+        self.assertEqual(stats['count'], 0)
+        self.assertIsNone(stats['median'])
+        self.assertEqual(sum(bucket['count'] for bucket in stats['histogram']), 0)
+
+    def test_statistics_are_cached_and_invalidated_on_write(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([query for query in queries.captured_queries if 'grades_grade' in query['sql']])
+
+        student = Student.objects.create(user=User.objects.create_user(username="late", password="password"), dob='2000-01-01')
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=student, course=self.course, grade=80.0)
+        self.assertIsNone(cache.get(stats_generation_key(self.course.id)))
+        self.assertEqual(self.client.get(self.url).data['count'], 5)
+
+    def test_statistics_overtaken_by_a_write_are_not_served(self):
+        student = Student.objects.create(user=User.objects.create_user(username="late", password="password"), dob='2000-01-01')
+
+        def write_while_computing(course_id):
+            stats = compute_statistics(course_id)
+            with self.captureOnCommitCallbacks(execute=True):
+                Grade.objects.create(student=student, course=self.course, grade=80.0)
+            return stats
+
+        with patch('grades.stats.compute_statistics', side_effect=write_while_computing):
+            self.assertEqual(self.client.get(self.url).data['count'], 4)
+        self.assertEqual(self.client.get(self.url).data['count'], 5)
+
+    def test_bulk_operation_invalidates_statistics(self):
+        self.client.get(self.url)
+        bulk_url = reverse('grade-bulk-operation', kwargs={'course_id': self.course.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(bulk_url, {'operation': 'curve', 'points': -50}, format='json')
+        self.assertEqual(self.client.get(self.url).data['min'], 0.0)
+
+    def test_teacher_cannot_view_other_course(self):
+        url = reverse('grade-statistics', kwargs={'course_id': self.other_course.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StudentSummaryTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.student_user = User.objects.create_user(username="student", password="studentpassword", role="student")
+        self.other_user = User.objects.create_user(username="other", password="otherpassword", role="student")
+        self.student = Student.objects.create(user=self.student_user, dob='2000-01-01')
+        self.other_student = Student.objects.create(user=self.other_user, dob='2000-01-01')
+        self.math = Course.objects.create(name="Math", description="Math", professor=self.teacher_user)
+        self.art = Course.objects.create(name="Art", description="Art", professor=self.teacher_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = Grade.objects.create(student=self.student, course=self.math, grade=60.0)
+            Grade.objects.create(student=self.student, course=self.art, grade=100.0)
+        self.url = reverse('grade-student-summary', kwargs={'student_id': self.student.id})
+
+    def test_summary_follows_grade_writes(self):
+        summary = StudentSummary.objects.get(pk=self.student.id)
+        self.assertEqual((summary.course_count, summary.grade_count), (2, 2))
+        self.assertEqual((summary.average, summary.min_grade, summary.max_grade), (80.0, 60.0, 100.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.grade = 90.0
+            self.first.save()
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.id).min_grade, 90.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.filter(student=self.student).delete()
+        self.assertFalse(StudentSummary.objects.filter(pk=self.student.id).exists())
+
+    def test_resync_command_catches_up_with_unsignalled_writes(self):
+        Grade.objects.filter(pk=self.first.pk).update(grade=20.0)
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.id).min_grade, 60.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('resync_grades', '--courses', str(self.math.id), stdout=StringIO())
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.id).min_grade, 20.0)
+
+    def test_bulk_operation_refreshes_summary(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        bulk_url = reverse('grade-bulk-operation', kwargs={'course_id': self.art.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(bulk_url, {'operation': 'curve', 'points': -40}, format='json')
+        self.assertEqual(StudentSummary.objects.get(pk=self.student.id).max_grade, 60.0)
+
+    def test_rebuild_matches_incremental(self):
+        StudentSummary.objects.all().delete()
+        Grade.objects.filter(student=self.student, course=self.art).update(grade=40.0)
+        self.assertEqual(rebuild_summaries(), 1)
+        summary = StudentSummary.objects.get(pk=self.student.id)
+        self.assertEqual((summary.grade_count, summary.average), (2, 50.0))
+
+    def test_student_reads_own_summary_in_one_query(self):
+        self.client.force_authenticate(user=self.student_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['average'], 80.0)
+        self.assertEqual(len([query for query in queries.captured_queries if 'grades_' in query['sql']]), 1)
+
+    def test_student_cannot_read_other_summary(self):
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_teacher_reads_only_summaries_of_own_students(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        stranger = User.objects.create_user(username="stranger", password="strangerpassword", role="teacher")
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GradeLeaderboardTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="otherpassword", role="teacher")
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.students = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, value in enumerate([50.0, 90.0, 70.0, 70.0]):
+                user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+                student = Student.objects.create(user=user, dob='2000-01-01')
+                Grade.objects.create(student=student, course=self.course, grade=value)
+                self.students.append(student)
+        self.top_url = reverse('grade-leaderboard', kwargs={'course_id': self.course.id})
+        self.rank_url = reverse('grade-rank', kwargs={'course_id': self.course.id})
+
+    def test_top_students(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.top_url, {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0], {'student': self.students[1].id, 'score': 90.0})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_rank_with_ties_and_neighbours(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.rank_url, {'student': self.students[2].id, 'neighbours': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['rank'], response.data['percentile']), (2, 25.0))
+        self.assertEqual(len(response.data['neighbours']), 3)
+
+    def test_student_sees_only_own_rank(self):
+        self.client.force_authenticate(user=self.students[0].user)
+        response = self.client.get(self.rank_url, {'student': self.students[1].id, 'neighbours': 3})
+        self.assertEqual(response.data['student'], self.students[0].id)
+        self.assertEqual(response.data['rank'], 4)
+        self.assertNotIn('neighbours', response.data)
+        self.assertEqual(self.client.get(self.top_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_other_teacher_is_forbidden(self):
+        self.client.force_authenticate(user=self.other_teacher)
+        self.assertEqual(self.client.get(self.top_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_grade_writes_update_and_lost_sets_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.filter(student=self.students[0]).get().delete()
+        self.client.force_authenticate(user=self.teacher_user)
+        self.assertEqual(self.client.get(self.top_url).data['count'], 3)
+
+        get_redis_connection('default').delete(leaderboard_key(self.course.id))
+        self.assertEqual(self.client.get(self.top_url).data['count'], 3)
+
+    def test_write_after_lost_set_does_not_truncate_ranking(self):
+        get_redis_connection('default').delete(leaderboard_key(self.course.id))
+        grade = Grade.objects.get(student=self.students[0])
+        grade.grade = 95.0
+        with self.captureOnCommitCallbacks(execute=True):
+            grade.save()
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.top_url)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0], {'student': self.students[0].id, 'score': 95.0})
+
+
+class GradeHistoryTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.student_user = User.objects.create_user(username="student", password="studentpassword", role="student")
+        self.student = Student.objects.create(user=self.student_user, dob='2000-01-01')
+        self.course = Course.objects.create(name="Test Course", description="Test Course Description", professor=self.teacher_user)
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_api_writes_are_logged(self):
+        response = self.client.post(reverse('grade-list'), {'student': self.student.id, 'course': self.course.id, 'grade': 70.0})
+        grade_id = response.data['id']
+        self.client.patch(reverse('grade-detail', kwargs={'pk': grade_id}), {'grade': 75.0})
+        self.client.delete(reverse('grade-detail', kwargs={'pk': grade_id}))
+
+        history = GradeHistory.objects.filter(grade_id=grade_id).order_by('id')
+        self.assertEqual([(entry.action, entry.value) for entry in history], [('c', 70.0), ('u', 75.0), ('d', 75.0)])
+        self.assertTrue(all(entry.changed_by_id == self.teacher_user.id for entry in history))
+
+    def test_bulk_operation_is_logged(self):
+        grade = Grade.objects.create(student=self.student, course=self.course, grade=60.0)
+        bulk_url = reverse('grade-bulk-operation', kwargs={'course_id': self.course.id})
+        self.client.post(bulk_url, {'operation': 'curve', 'points': 5}, format='json')
+        entry = GradeHistory.objects.get(grade_id=grade.id)
+        self.assertEqual((entry.action, entry.value), ('u', 65.0))
+
+    def test_compaction_keeps_last_edit_per_day(self):
+        old_day = timezone.now() - timedelta(days=40)
+        recent_day = timezone.now() - timedelta(days=1)
+        for changed_at, value in [(old_day, 10.0), (old_day + timedelta(seconds=1), 20.0),
+                                  (recent_day, 30.0), (recent_day + timedelta(seconds=1), 40.0)]:
+            GradeHistory.objects.create(
+                grade_id=1, student=self.student, course=self.course, value=value, action='u', changed_at=changed_at,
+            )
+
+        self.assertEqual(compact_history(), 1)
+        self.assertEqual(list(GradeHistory.objects.order_by('changed_at').values_list('value', flat=True)), [20.0, 30.0, 40.0])
+
+
+class GradebookTestCase(APITestCase):
+    def setUp(self):
+        self.teacher_user = User.objects.create_user(username="teacher", password="teacherpassword", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="otherpassword", role="teacher")
+        self.math = Course.objects.create(name="Math", description="Math", professor=self.teacher_user)
+        self.art = Course.objects.create(name="Art", description="Art", professor=self.teacher_user)
+        self.other_course = Course.objects.create(name="Other", description="Other", professor=self.other_teacher)
+        self.students = []
+        for i in range(2):
+            user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+            self.students.append(Student.objects.create(user=user, dob='2000-01-01'))
+        Grade.objects.create(student=self.students[0], course=self.math, grade=80.0)
+        Grade.objects.create(student=self.students[0], course=self.other_course, grade=10.0)
+        Enrollment.objects.create(student=self.students[0], course=self.art)
+        Enrollment.objects.create(student=self.students[1], course=self.art)
+        Grade.objects.create(student=self.students[1], course=self.art, grade=60.0)
+        self.url = reverse('grade-gradebook')
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_columnar_matrix(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'students': [self.students[0].id, self.students[1].id],
+            'courses': [self.math.id, self.art.id],
+            'grades': [80.0, None, None, 60.0],
+        })
+        self.assertEqual(len([query for query in queries.captured_queries if 'grades_grade' in query['sql']]), 1)
+
+    def test_csv_variant(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response.content.decode().splitlines(), [
+            f"student,{self.math.id},{self.art.id}",
+            f"{self.students[0].id},80.0,",
+            f"{self.students[1].id},,60.0",
+        ])
+
+    def test_students_are_forbidden(self):
+        self.client.force_authenticate(user=self.students[0].user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
@@ -1,18 +1,38 @@
 import logging
+from django.db import transaction
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated ,OR
-from .models import Grade
-from .serializers import GradeSerializer
+from .models import Grade, StudentSummary
+from .serializers import GradeBulkOperationSerializer, GradeSerializer, StudentSummarySerializer
 from users.permissions import IsStudent, IsTeacher, IsAdmin
+from courses.membership import course_professor
 from courses.models import Course
+from students.models import Student
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from .bulk import GradeCSVImporter, apply_grade_operation
+from .gradebook import build_gradebook
+from .history import CREATED, DELETED, UPDATED, record_history
+from .leaderboard import student_rank, top_students
+from .renderers import GradebookCSVRenderer
+from .stats import course_statistics
+from miniproject2.renderers import ORJSONRenderer
+from miniproject2.mixins import (
+    ExpandQuerysetMixin, SparseFieldsQuerysetMixin, ValuesListMixin, EXPAND_PARAMETER, FIELDS_PARAMETER,
+    OMIT_PARAMETER,
+)
 
 # Configure logger
 logger = logging.getLogger('app_logger')
 
+MAX_LEADERBOARD_LIMIT = 100
+MAX_NEIGHBOURS = 10
 
-class GradeViewSet(viewsets.ModelViewSet):
+
+class GradeViewSet(ValuesListMixin, SparseFieldsQuerysetMixin, ExpandQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing grades:
     - Students: View only their grades.
@@ -28,9 +48,11 @@ class GradeViewSet(viewsets.ModelViewSet):
         Assign specific permissions based on the action.
         """
         logger.info(f"Assigning permissions for action: {self.action}")
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'import_csv', 'bulk_operation']:
             return [OR(IsTeacher(), IsAdmin())]  # Only teachers or admins can modify grades
-        elif self.action in ['list', 'retrieve']:
+        elif self.action in ['statistics', 'leaderboard', 'gradebook']:
+            return [OR(IsTeacher(), IsAdmin())]  # Course-wide statistics are for teachers and admins
+        elif self.action in ['list', 'retrieve', 'student_summary', 'rank']:
             return [IsAuthenticated()]  # Allow authenticated users to view
         return super().get_permissions()
 
@@ -56,8 +78,26 @@ class GradeViewSet(viewsets.ModelViewSet):
         logger.warning(f"User {user} does not have access to any grades.")
         return Grade.objects.none()
 
+    def get_managed_course(self, course_id):
+        """
+        Return ``(course id, None)`` if the user may manage the course's grades,
+        otherwise ``(None, error response)``. Answered from the membership index.
+        """
+        course_id = int(course_id)
+        professor_id = course_professor(course_id)
+        if professor_id is None:
+            return None, Response({"error": "Course not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not IsAdmin().has_permission(self.request, self) and professor_id != self.request.user.id:
+            logger.error(f"User {self.request.user} does not teach the course {course_id}.")
+            return None, Response(
+                {"error": "You can only grade students in courses you teach."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return course_id, None
+
     @swagger_auto_schema(
         operation_description="Retrieve a list of grades.",
+        manual_parameters=[EXPAND_PARAMETER, FIELDS_PARAMETER, OMIT_PARAMETER],
         responses={200: GradeSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -82,9 +122,12 @@ class GradeViewSet(viewsets.ModelViewSet):
 
         data = request.data
         try:
-            course = Course.objects.get(id=data['course'])
-        except Course.DoesNotExist:
-            logger.error(f"Course with id {data['course']} not found.")
+            course_id = int(data['course'])
+        except (KeyError, TypeError, ValueError):
+            course_id = None
+        professor_id = course_professor(course_id) if course_id is not None else None
+        if professor_id is None:
+            logger.error(f"Course with id {data.get('course')} not found.")
             return Response(
                 {"error": "Invalid course ID."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -93,8 +136,8 @@ class GradeViewSet(viewsets.ModelViewSet):
     # Check if the user is a teacher
         if IsTeacher().has_permission(request, self):
             # If the user is a teacher, check if they are the course professor
-            if course.professor != user:
-                logger.error(f"User {user} does not teach the course {course}.")
+            if professor_id != user.id:
+                logger.error(f"User {user} does not teach the course {course_id}.")
                 return Response(
                     {"error": "You can only grade students in courses you teach."},
                     status=status.HTTP_403_FORBIDDEN
@@ -114,12 +157,28 @@ class GradeViewSet(viewsets.ModelViewSet):
         # Proceed with grade creation
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        grade = serializer.save()
+        self.perform_create(serializer)
+        grade = serializer.instance
         logger.info(f"Grade created successfully: {grade}")
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            grade = serializer.save()
+            record_history([grade], CREATED, changed_by=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            grade = serializer.save()
+            record_history([grade], UPDATED, changed_by=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_history([instance], DELETED, changed_by=self.request.user)
+            instance.delete()
+
     @swagger_auto_schema(
         operation_description="Update an existing grade.",
         request_body=GradeSerializer,
@@ -148,3 +207,204 @@ class GradeViewSet(viewsets.ModelViewSet):
         super().destroy(request, *args, **kwargs)
         logger.info(f"Grade deleted successfully: {grade}")
         return Response({"message": "Grade deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Import grades from a CSV file with 'student', 'course' and 'grade' columns. "
+            "Existing grades for a student and course are updated. Nothing is written if any row is invalid."
+        ),
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description="CSV file"),
+        ],
+        responses={200: 'Counts of created and updated grades.', 400: 'Row-level errors.', 403: 'Forbidden.'},
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Teachers can import grades for courses they teach; admins for any course.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A CSV file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        professor = None if IsAdmin().has_permission(request, self) else request.user
+        logger.info(f"User {request.user} is importing grades from {upload.name}.")
+        importer = GradeCSVImporter(professor=professor, changed_by=request.user).run(upload)
+
+        if importer.errors:
+            logger.error(f"Grade import by {request.user} rejected: {len(importer.errors)} invalid row(s).")
+            return Response(
+                {"error": "The CSV contains invalid rows. No grades were saved.", "rows": importer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logger.info(f"Grade import by {request.user}: {importer.created} created, {importer.updated} updated.")
+        return Response({"created": importer.created, "updated": importer.updated}, status=status.HTTP_200_OK)
+
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Apply one operation to every grade of a course in a single statement: 'curve' adds points, "
+            "'rescale' applies grade * factor + offset, 'clamp' enforces a floor and/or cap, 'patch' sets "
+            "explicit values by grade id. Results are clamped to 0-100. With dry_run nothing is saved and "
+            "the resulting distribution is returned."
+        ),
+        request_body=GradeBulkOperationSerializer,
+        responses={200: 'Number of updated grades and the resulting distribution.', 400: 'Invalid data.',
+                   403: 'Forbidden.', 404: 'Course not found.'},
+    )
+    @action(detail=False, methods=['post'], url_path=r'course/(?P<course_id>\d+)/bulk')
+    def bulk_operation(self, request, course_id=None):
+        """
+        Teachers can run bulk operations on courses they teach; admins on any course.
+        """
+        course_id, error = self.get_managed_course(course_id)
+        if error is not None:
+            return error
+
+        serializer = GradeBulkOperationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        operation, dry_run = params.pop('operation'), params.pop('dry_run')
+
+        result = apply_grade_operation(course_id, operation, params, dry_run=dry_run, changed_by=request.user)
+        logger.info(
+            f"User {request.user} ran '{operation}' on course {course_id}"
+            f"{' (dry run)' if dry_run else ''}: {result['updated']} grade(s) updated."
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Grade statistics for a course: count, mean, median, standard deviation, min, max, "
+            "percentiles and a histogram in 10-point buckets. Cached until the course's grades change."
+        ),
+        responses={200: 'Course grade statistics.', 403: 'Forbidden.', 404: 'Course not found.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'course/(?P<course_id>\d+)/statistics')
+    def statistics(self, request, course_id=None):
+        """
+        Teachers can view statistics for courses they teach; admins for any course.
+        """
+        course_id, error = self.get_managed_course(course_id)
+        if error is not None:
+            return error
+
+        logger.info(f"User {request.user} is retrieving grade statistics for course {course_id}.")
+        return Response({"course": course_id, **course_statistics(course_id)}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "A student's grade summary: course count, grade count, average, min and max. "
+            "Students can only view their own summary, teachers those of students graded in their courses."
+        ),
+        responses={200: StudentSummarySerializer, 404: 'No grades recorded for this student.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'student/(?P<student_id>\d+)/summary')
+    def student_summary(self, request, student_id=None):
+        """
+        Served from the ``StudentSummary`` read model with a primary-key lookup.
+        """
+        summaries = StudentSummary.objects.all()
+        if IsStudent().has_permission(request, self):
+            summaries = summaries.filter(student__user=request.user)
+        elif IsTeacher().has_permission(request, self):
+            # Same scope as the grade list: students graded in the teacher's courses.
+            summaries = summaries.filter(student__in=Grade.objects.filter(course__professor=request.user).values('student_id'))
+        elif not IsAdmin().has_permission(request, self):
+            summaries = summaries.none()
+
+        summary = summaries.filter(pk=student_id).first()
+        if summary is None:
+            logger.warning(f"User {request.user} requested a missing summary for student {student_id}.")
+            return Response({"error": "No grades recorded for this student."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StudentSummarySerializer(summary).data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="The top students of a course by average grade.",
+        manual_parameters=[
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="How many students (1-100, default 10)."),
+        ],
+        responses={200: 'Top students with their scores.', 403: 'Forbidden.', 404: 'Course not found.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'course/(?P<course_id>\d+)/leaderboard')
+    def leaderboard(self, request, course_id=None):
+        """
+        Teachers can view the leaderboard of courses they teach; admins of any course.
+        """
+        course_id, error = self.get_managed_course(course_id)
+        if error is not None:
+            return error
+
+        limit = _bounded_int(request.query_params.get('limit'), default=10, upper=MAX_LEADERBOARD_LIMIT)
+        return Response({"course": course_id, **top_students(course_id, limit)}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "A student's rank and percentile in a course. Students always get their own rank; "
+            "teachers and admins pass ?student= and may ask for ?neighbours=."
+        ),
+        manual_parameters=[
+            openapi.Parameter('student', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Student ID (teachers and admins)."),
+            openapi.Parameter('neighbours', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Students listed on each side (0-10, teachers and admins)."),
+        ],
+        responses={200: 'Rank, percentile and neighbours.', 403: 'Forbidden.', 404: 'Not ranked in this course.'},
+    )
+    @action(detail=False, methods=['get'], url_path=r'course/(?P<course_id>\d+)/rank')
+    def rank(self, request, course_id=None):
+        """
+        Students only see their own position; the ranking around them stays hidden.
+        """
+        if IsStudent().has_permission(request, self):
+            student_id = Student.objects.filter(user=request.user).values_list('id', flat=True).first()
+            neighbours = 0
+        else:
+            _, error = self.get_managed_course(course_id)
+            if error is not None:
+                return error
+            student_id = _bounded_int(request.query_params.get('student'), default=None)
+            if student_id is None:
+                return Response({"error": "Pass the student to rank as ?student=."}, status=status.HTTP_400_BAD_REQUEST)
+            neighbours = _bounded_int(request.query_params.get('neighbours'), default=0, lower=0, upper=MAX_NEIGHBOURS)
+
+        ranking = student_rank(int(course_id), student_id, neighbours) if student_id is not None else None
+        if ranking is None:
+            return Response({"error": "The student has no grade in this course."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"course": int(course_id), **ranking}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "The students x courses grade matrix of a teacher's courses as columns: student ids, course ids "
+            "and a row-major grade array (null where a student has no grade). Add ?format=csv for a CSV grid. "
+            "Admins see every course, or a teacher's with ?professor=."
+        ),
+        manual_parameters=[
+            openapi.Parameter('professor', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Teacher ID (admins)."),
+        ],
+        responses={200: 'Gradebook matrix.', 403: 'Forbidden.'},
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[ORJSONRenderer, GradebookCSVRenderer])
+    def gradebook(self, request):
+        """
+        Teachers get the gradebook of the courses they teach; admins of any teacher.
+        """
+        courses = Course.objects.all()
+        if IsAdmin().has_permission(request, self):
+            professor_id = _bounded_int(request.query_params.get('professor'), default=None)
+            if professor_id is not None:
+                courses = courses.filter(professor_id=professor_id)
+        else:
+            courses = courses.filter(professor=request.user)
+
+        logger.info(f"User {request.user} is retrieving the gradebook.")
+        return Response(build_gradebook(courses.values_list('id', flat=True)), status=status.HTTP_200_OK)
+
+
+def _bounded_int(value, default, lower=1, upper=None):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    value = max(value, lower)
+    return min(value, upper) if upper is not None else value
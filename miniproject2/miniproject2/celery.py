@@ -29,3 +29,13 @@ def setup_periodic_tasks(sender, **kwargs):
         name='Daily Report Summary',
         task='notifications.tasks.daily_report_summary',
     )
+    PeriodicTask.objects.get_or_create(
+        interval=schedule,
+        name='Compact Grade History',
+        task='grades.tasks.compact_grade_history',
+    )
+    PeriodicTask.objects.get_or_create(
+        interval=schedule,
+        name='Purge Expired Tokens',
+        task='users.tasks.purge_expired_tokens',
+    )
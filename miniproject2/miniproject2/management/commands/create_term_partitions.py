@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Term
+from miniproject2.partitioning import create_term_partitions, is_supported
+
+
+class Command(BaseCommand):
+    help = 'Create the missing per-term partitions of attendance and grade history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', help='Names of the terms to partition (default: every term)')
+
+    def handle(self, *args, **kwargs):
+        if not is_supported():
+            raise CommandError("Partitioning needs PostgreSQL.")
+        terms = Term.objects.all()
+        if kwargs['terms']:
+            terms = terms.filter(name__in=kwargs['terms'])
+            missing = set(kwargs['terms']) - {term.name for term in terms}
+            if missing:
+                raise CommandError(f"Unknown term(s): {', '.join(sorted(missing))}")
+
+        for name in create_term_partitions(list(terms)):
+            self.stdout.write(f"Created {name}.")
+        self.stdout.write(self.style.SUCCESS("Partitions up to date."))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.models import Attendance
+from attendance.rates import refresh_totals
+from courses.models import Term
+from miniproject2.partitioning import detach_term_partitions, is_supported
+
+
+class Command(BaseCommand):
+    help = (
+        'Detach the partitions of closed terms. Their rows leave attendance and grade history '
+        'but stay in standalone tables, ready to be dumped and dropped. Attendance totals of the '
+        'courses concerned are recounted afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='+', help='Names of the closed terms to detach')
+
+    def handle(self, *args, **kwargs):
+        if not is_supported():
+            raise CommandError("Partitioning needs PostgreSQL.")
+        terms = Term.objects.filter(name__in=kwargs['terms'], end_date__lt=date.today())
+        missing = set(kwargs['terms']) - {term.name for term in terms}
+        if missing:
+            raise CommandError(f"Unknown or open term(s): {', '.join(sorted(missing))}")
+
+        for term in terms:
+            # The detached records leave the totals; recount them once the detach (and any archiving
+            # running against it, whose deltas it may have raced) is over.
+            course_ids = list(Attendance.objects.filter(
+                date__range=(term.start_date, term.end_date),
+            ).values_list('course_id', flat=True).distinct())
+            for name in detach_term_partitions(term):
+                self.stdout.write(f"{term}: detached {name}.")
+            if course_ids:
+                refresh_totals(course_ids)
+                self.stdout.write(f"{term}: recounted the attendance totals of {len(course_ids)} course(s).")
+        self.stdout.write(self.style.SUCCESS("Partitions detached."))
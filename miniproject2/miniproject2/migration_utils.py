@@ -0,0 +1,77 @@
+"""
+Helpers for migrations that must not lock hot tables: duplicate clean-up
+before adding unique constraints, and unique constraints attached to an
+index built with ``CREATE UNIQUE INDEX CONCURRENTLY`` (PostgreSQL).
+"""
+
+import logging
+
+from django.db import migrations
+from django.db.models import Max
+
+logger = logging.getLogger('app_logger')
+
+
+def remove_duplicates(app_label, model_name, fields, removed_callback=None):
+    """
+    A ``RunPython`` operation keeping only the latest row of each ``fields``
+    combination. Every removed row is logged. Historical models send no
+    signals, so ``removed_callback(apps, rows)`` gets the removed rows (as
+    ``values()`` dicts) to bring the read models up to date.
+    """
+    def forwards(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        latest = model.objects.values(*fields).annotate(latest=Max('id')).order_by().values('latest')
+        duplicates = model.objects.exclude(id__in=latest)
+        removed = list(duplicates.values())
+        if not removed:
+            return
+        for row in removed:
+            logger.warning(f"Removing duplicate {app_label}.{model_name}: {row}")
+        duplicates.delete()
+        logger.warning(f"Removed {len(removed)} duplicate {app_label}.{model_name} row(s) by {fields}.")
+        if removed_callback is not None:
+            removed_callback(apps, removed)
+
+    return migrations.RunPython(forwards, migrations.RunPython.noop, atomic=True)
+
+
+def drop_invalid_index(name):
+    """
+    Drop index ``name`` if a failed concurrent build left it INVALID (e.g.
+    duplicates written while it was built), so the build can be retried.
+    Needs ``atomic = False``.
+    """
+    def forwards(apps, schema_editor):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [name])
+            row = cursor.fetchone()
+        if row is not None and row[0]:
+            logger.warning(f"Dropping the invalid index {name} left by an interrupted build.")
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+    return migrations.RunPython(forwards, migrations.RunPython.noop, atomic=False)
+
+
+def add_unique_constraint_concurrently(model_name, table, constraint):
+    """
+    Build the unique index of ``constraint`` concurrently, then attach it as
+    the constraint, which only needs a brief lock. An INVALID index left by
+    an earlier failed build is dropped first; a valid one is reused. Needs
+    ``atomic = False``.
+    """
+    columns = ', '.join(f"{field}_id" for field in constraint.fields)
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[
+            drop_invalid_index(constraint.name),
+            migrations.RunSQL(
+                f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {constraint.name} ON {table} ({columns})",
+                f"DROP INDEX CONCURRENTLY IF EXISTS {constraint.name}",
+            ),
+            migrations.RunSQL(
+                f"ALTER TABLE {table} ADD CONSTRAINT {constraint.name} UNIQUE USING INDEX {constraint.name}",
+                f"ALTER TABLE {table} DROP CONSTRAINT {constraint.name}",
+            ),
+        ],
+        state_operations=[migrations.AddConstraint(model_name=model_name, constraint=constraint)],
+    )
@@ -0,0 +1,225 @@
+"""
+ViewSet mixins shared by the API apps.
+"""
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from miniproject2.renderers import NDJSONRenderer
+
+from miniproject2.serializers import (
+    ExpandableFieldsMixin, SparseFieldsMixin, compile_values_serializer, parse_field_tree,
+    select_field_names,
+)
+
+RESHAPING_PARAMS = ('expand', 'fields', 'omit')
+
+EXPAND_PARAMETER = openapi.Parameter(
+    'expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma-separated relations to embed, e.g. 'student,course,student.user'.",
+)
+FIELDS_PARAMETER = openapi.Parameter(
+    'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma-separated fields to return, e.g. 'id,name'.",
+)
+OMIT_PARAMETER = openapi.Parameter(
+    'omit', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma-separated fields to leave out, e.g. 'description'.",
+)
+
+IDS_PARAMETER = openapi.Parameter(
+    'ids', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma-separated ids to fetch in one call, e.g. '3,1,2'. Returned in that order, unpaginated; "
+                "unknown ids are left out.",
+)
+
+
+def is_reshaped(request):
+    """
+    True when the request asks for a response shape other than the default,
+    which shared caches must not serve.
+    """
+    return any(request.query_params.get(param) for param in RESHAPING_PARAMS)
+
+
+def prune_field_tree(tree, fields, omit):
+    """
+    Drop the branches of ``tree`` that a ``fields``/``omit`` pair excludes.
+    """
+    return {
+        name: prune_field_tree(nested, fields.get(name, {}), omit.get(name, {}))
+        for name, nested in tree.items()
+        if select_field_names([name], fields, omit)
+    }
+
+
+class ExpandQuerysetMixin:
+    """
+    Adds the ``select_related``/``prefetch_related`` calls matching the
+    ``?expand=`` parameter to the viewset's queryset, so an expanded page
+    costs the same number of queries as a plain one.
+    """
+
+    def get_expand(self):
+        return parse_field_tree(self.request.query_params.get('expand'))
+
+    def expand_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, ExpandableFieldsMixin):
+            return queryset
+
+        select_related, prefetch_related = serializer_class.get_expand_plan(self.get_expand())
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.expand_queryset(super().filter_queryset(queryset))
+
+
+class SparseFieldsQuerysetMixin:
+    """
+    Pushes ``?fields=``/``?omit=`` down into the queryset with ``only()``, so
+    columns the client did not ask for are never fetched. Must come before
+    ``ExpandQuerysetMixin`` so unrequested relations are not joined either.
+    """
+
+    def get_sparse_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return {}, {}
+        return (
+            parse_field_tree(self.request.query_params.get('fields')),
+            parse_field_tree(self.request.query_params.get('omit')),
+        )
+
+    def get_expand(self):
+        return prune_field_tree(super().get_expand(), *self.get_sparse_fields())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsMixin):
+            return queryset
+
+        fields, omit = self.get_sparse_fields()
+        only = serializer_class.get_only_fields(fields, omit, self.get_expand())
+        return queryset.only(*only) if only is not None else queryset
+
+
+class ValuesListMixin:
+    """
+    Opt-in fast read path for ``list``: rows are fetched with
+    ``values_list()`` and turned into dicts by a converter compiled once per
+    serializer, skipping model instances and per-field serializer calls.
+    The JSON is identical to the regular serializer output; expanded
+    responses and serializers with unsupported fields use the regular path.
+    """
+
+    def get_values_serializer(self):
+        if self.request.query_params.get('expand'):
+            return None
+
+        serializer_class = self.get_serializer_class()
+        fields = parse_field_tree(self.request.query_params.get('fields'))
+        omit = parse_field_tree(self.request.query_params.get('omit'))
+        field_names = None
+        if fields or omit:
+            field_names = tuple(select_field_names(serializer_class.Meta.fields, fields, omit))
+        return compile_values_serializer(serializer_class, field_names)
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_values_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        columns, convert = compiled
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([convert(row) for row in page])
+        return Response([convert(row) for row in queryset])
+
+
+class NDJSONStreamMixin:
+    """
+    Adds an export mode to ``list``: ``?format=ndjson`` (or ``Accept:
+    application/x-ndjson``) streams every row unpaginated, one JSON document
+    per line. Rows are read through a server-side cursor and serialized a
+    chunk at a time, so memory stays flat however large the table.
+    """
+    stream_chunk_size = 2000
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(NDJSONRenderer())
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != NDJSONRenderer.format:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(self.stream_rows(queryset), content_type=NDJSONRenderer.media_type)
+
+    def stream_rows(self, queryset):
+        renderer, chunk = NDJSONRenderer(), []
+        for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(instance)
+            if len(chunk) == self.stream_chunk_size:
+                yield renderer.render(self.get_serializer(chunk, many=True).data)
+                chunk = []
+        if chunk:
+            yield renderer.render(self.get_serializer(chunk, many=True).data)
+
+
+class CachedMultiGetMixin:
+    """
+    Adds ``?ids=`` to ``list``: the listed objects, in request order, read
+    from the per-object cache entries (``object_cache_key``) with one
+    ``cache.get_many``. Misses are fetched with one ``id__in`` query and
+    written back with ``set_many``. Reshaped responses skip the cache.
+
+    Cached entries bypass ``get_queryset``; viewsets that hide objects from
+    some users narrow the ids first in ``visible_ids``.
+    """
+    object_cache_key = None  # e.g. 'student_{}'
+    object_cache_timeout = 3600
+    max_ids = 100
+
+    def visible_ids(self, ids):
+        return ids
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params['ids'].split(',') if pk.strip()))
+        except ValueError:
+            return Response({"error": "ids must be comma-separated integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_ids:
+            return Response({"error": f"At most {self.max_ids} ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_many(self.visible_ids(ids)))
+
+    def get_many(self, ids):
+        cacheable = not is_reshaped(self.request)
+        keys = {pk: self.object_cache_key.format(pk) for pk in ids}
+        found = {}
+        if cacheable and ids:
+            hits = cache.get_many(keys.values())
+            found = {pk: hits[key] for pk, key in keys.items() if key in hits}
+
+        misses = [pk for pk in ids if pk not in found]
+        if misses:
+            queryset = self.filter_queryset(self.get_queryset()) if not cacheable else self.get_queryset()
+            fetched = {instance.pk: self.get_serializer(instance).data for instance in queryset.filter(pk__in=misses)}
+            if cacheable and fetched:
+                cache.set_many({keys[pk]: row for pk, row in fetched.items()}, timeout=self.object_cache_timeout)
+            found.update(fetched)
+        return [found[pk] for pk in ids if pk in found]
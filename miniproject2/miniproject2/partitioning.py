@@ -0,0 +1,166 @@
+"""
+Range partitioning of the date-keyed tables that grow every term
+(PostgreSQL). Each table gets one partition per ``courses.Term`` plus a
+default partition for the days between terms, so queries bounded to a term
+only scan its partition and a closed term can be detached in one statement.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+
+# Table -> partition key. Attendance is keyed by day and grade history by
+# change time; Grade itself is one row per (student, course) edited in place,
+# so it has no stable date to partition on.
+PARTITIONED_TABLES = {
+    'attendance_attendance': 'date',
+    'grades_gradehistory': 'changed_at',
+}
+
+
+def partition_name(table, term):
+    return f"{table}_term_{term.id}"
+
+
+def default_partition(table):
+    return f"{table}_default"
+
+
+def is_supported(using=connection):
+    return using.vendor == 'postgresql'
+
+
+def _bounds(term):
+    return f"'{term.start_date.isoformat()}'", f"'{(term.end_date + timedelta(days=1)).isoformat()}'"
+
+
+def _exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def _is_attached(cursor, table, name):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhparent = to_regclass(%s) AND inhrelid = to_regclass(%s))",
+        [table, name],
+    )
+    return cursor.fetchone()[0]
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s)",
+        [table],
+    )
+    return cursor.fetchone()[0]
+
+
+def convert_table(cursor, table, statements):
+    """
+    Replace ``table`` by a copy partitioned on its key, holding every row in
+    the default partition. The primary key grows the partition key, as
+    PostgreSQL requires; ``statements`` recreate indexes, unique constraints
+    and foreign keys on the new table. Rewrites the whole table under an
+    exclusive lock: run it in a maintenance window.
+    """
+    column = PARTITIONED_TABLES[table]
+    staging = f"{table}_partitioned"
+    cursor.execute(
+        f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+        f"PARTITION BY RANGE ({column})"
+    )
+    cursor.execute(f"CREATE TABLE {default_partition(table)} PARTITION OF {staging} DEFAULT")
+    cursor.execute(f"INSERT INTO {staging} OVERRIDING SYSTEM VALUE SELECT * FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+    )
+    cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})")
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def revert_table(cursor, table, statements):
+    """
+    Undo ``convert_table``: copy the rows of ``table`` (its attached
+    partitions) back into a plain table keyed on ``id`` alone, then run
+    ``statements``. Detached partitions are left alone. Same exclusive lock
+    as ``convert_table``.
+    """
+    staging = f"{table}_unpartitioned"
+    cursor.execute(f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING IDENTITY)")
+    cursor.execute(f"INSERT INTO {staging} OVERRIDING SYSTEM VALUE SELECT * FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+    )
+    cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def create_partition(cursor, table, term):
+    """
+    Attach the partition of ``term``, moving its rows out of the default
+    partition first. Returns False if it already exists, detached or not.
+    """
+    name, column = partition_name(table, term), PARTITIONED_TABLES[table]
+    if _exists(cursor, name):
+        return False
+    start, end = _bounds(term)
+    in_term = f"{column} >= {start} AND {column} < {end}"
+    cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+    cursor.execute(f"INSERT INTO {name} SELECT * FROM {default_partition(table)} WHERE {in_term}")
+    cursor.execute(f"DELETE FROM {default_partition(table)} WHERE {in_term}")
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})")
+    return True
+
+
+def detach_partition(cursor, table, term):
+    """
+    Detach the partition of ``term``; its rows leave ``table`` but stay in a
+    standalone table ready to be dumped or dropped. Returns the table name,
+    or None if there was no partition.
+    """
+    name = partition_name(table, term)
+    if not _is_attached(cursor, table, name):
+        return None
+    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+    return name
+
+
+def create_term_partitions(terms):
+    """
+    Create the missing partitions of ``terms`` on every partitioned table.
+    Returns the names of the partitions created.
+    """
+    created = []
+    if not is_supported():
+        return created
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                continue
+            for term in terms:
+                if create_partition(cursor, table, term):
+                    created.append(partition_name(table, term))
+    return created
+
+
+def detach_term_partitions(term):
+    """
+    Detach the partitions of ``term`` from every partitioned table. Returns
+    the names of the detached tables.
+    """
+    detached = []
+    if not is_supported():
+        return detached
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            name = detach_partition(cursor, table, term)
+            if name is not None:
+                detached.append(name)
+    return detached
@@ -0,0 +1,89 @@
+"""
+orjson-based renderers: the API's default JSON renderer and the NDJSON
+renderer of streaming exports.
+"""
+
+import datetime
+import math
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+def _has_non_finite(data):
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(item) for item in data)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders the same JSON as DRF's ``JSONRenderer`` using orjson.
+
+    Types orjson does not know (lazy translation strings, Decimals, querysets,
+    ...) go through DRF's own encoder, and datetimes keep DRF's ``Z`` suffix
+    for UTC. orjson writes NaN and infinities as ``null``; under
+    ``STRICT_JSON`` the stdlib renderer raises ``ValueError`` for them
+    instead, so output holding a ``null`` is checked and handed to it.
+    Indented output (``Accept: application/json; indent=4`` and the
+    browsable API) is delegated to the stdlib renderer.
+    """
+    _encoder = encoders.JSONEncoder()
+
+    @classmethod
+    def default(cls, obj):
+        if isinstance(obj, datetime.datetime):
+            representation = obj.isoformat()
+            if representation.endswith('+00:00'):
+                representation = representation[:-6] + 'Z'
+            return representation
+        return cls._encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, which the stdlib handles.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.strict and b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, like JSONRenderer.
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    Newline-delimited JSON: one compact document per item of a list, or a
+    single line for anything else (error responses). Used by the streaming
+    exports, which render one chunk of rows at a time.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        return None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            return super().render(data, accepted_media_type, renderer_context) + b'\n'
+        return b''.join(super(NDJSONRenderer, self).render(item) + b'\n' for item in data)
@@ -0,0 +1,256 @@
+"""
+Serializer mixins shared by the API apps.
+"""
+
+import datetime
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, relations, serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+
+
+def parse_field_tree(value):
+    """
+    Turn ``"student,course,student.user"`` into a nested dict:
+    ``{'student': {'user': {}}, 'course': {}}``.
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def select_field_names(names, fields, omit):
+    """
+    Return the entries of ``names`` kept by a ``fields``/``omit`` pair of
+    field trees. Dotted omissions (``student.dob``) keep the parent.
+    """
+    return [
+        name for name in names
+        if (not fields or name in fields) and not (name in omit and not omit[name])
+    ]
+
+
+class ExpandableFieldsMixin:
+    """
+    Lets clients embed related objects instead of bare ids with
+    ``?expand=student,course,student.user``.
+
+    Serializers declare what can be expanded in ``Meta.expandable_fields``,
+    a mapping of field name to the serializer used for the related object.
+    Expansion only applies to reads; writes keep accepting ids.
+    """
+
+    def __init__(self, *args, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._expand = expand
+
+    @classmethod
+    def get_expandable_fields(cls):
+        return getattr(cls.Meta, 'expandable_fields', {})
+
+    @property
+    def expand(self):
+        """
+        The requested expansion tree. Nested serializers receive theirs from
+        the parent; the top-level one reads it from the request.
+        """
+        if self._expand is None:
+            request = self.context.get('request')
+            if request is None or request.method not in SAFE_METHODS:
+                self._expand = {}
+            else:
+                self._expand = parse_field_tree(request.query_params.get('expand'))
+        return self._expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = self.get_expandable_fields()
+
+        for name, nested in self.expand.items():
+            if name not in expandable or name not in fields:
+                continue
+            serializer_class = expandable[name]
+            fields[name] = serializer_class(
+                **self.get_expanded_field_kwargs(name, serializer_class, nested)
+            )
+        return fields
+
+    def get_expanded_field_kwargs(self, name, serializer_class, nested):
+        kwargs = {'read_only': True}
+        if issubclass(serializer_class, ExpandableFieldsMixin):
+            kwargs['expand'] = nested
+        return kwargs
+
+    @classmethod
+    def get_expand_plan(cls, expand, prefix='', prefetch_only=False):
+        """
+        Work out the ``select_related`` and ``prefetch_related`` lookups needed
+        to render ``expand`` without extra queries per row.
+        """
+        select_related, prefetch_related = [], []
+        model = cls.Meta.model
+        expandable = cls.get_expandable_fields()
+
+        for name, nested in expand.items():
+            if name not in expandable:
+                continue
+            field = model._meta.get_field(name)
+            path = f"{prefix}{name}"
+            is_many = prefetch_only or field.many_to_many or field.one_to_many
+            (prefetch_related if is_many else select_related).append(path)
+
+            serializer_class = expandable[name]
+            if nested and issubclass(serializer_class, ExpandableFieldsMixin):
+                nested_select, nested_prefetch = serializer_class.get_expand_plan(
+                    nested, prefix=f"{path}__", prefetch_only=is_many
+                )
+                select_related += nested_select
+                prefetch_related += nested_prefetch
+        return select_related, prefetch_related
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients trim responses with ``?fields=id,name`` or
+    ``?omit=description``. Dotted names reach into expanded relations,
+    e.g. ``?expand=student&fields=id,grade,student.dob``.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse_fields = fields
+        self._omit = omit
+
+    @property
+    def sparse_fields(self):
+        """
+        The ``(fields, omit)`` trees for this serializer. Nested serializers
+        receive theirs from the parent; the top-level one reads the request.
+        """
+        if self._sparse_fields is None:
+            request = self.context.get('request')
+            if request is None or request.method not in SAFE_METHODS:
+                self._sparse_fields, self._omit = {}, {}
+            else:
+                self._sparse_fields = parse_field_tree(request.query_params.get('fields'))
+                self._omit = parse_field_tree(request.query_params.get('omit'))
+        return self._sparse_fields, self._omit or {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, omit = self.sparse_fields
+        if not requested and not omit:
+            return fields
+
+        kept = select_field_names(fields, requested, omit)
+        return {name: field for name, field in fields.items() if name in kept}
+
+    def get_expanded_field_kwargs(self, name, serializer_class, nested):
+        kwargs = super().get_expanded_field_kwargs(name, serializer_class, nested)
+        if issubclass(serializer_class, SparseFieldsMixin):
+            requested, omit = self.sparse_fields
+            kwargs['fields'] = requested.get(name, {})
+            kwargs['omit'] = omit.get(name, {})
+        return kwargs
+
+    @classmethod
+    def get_only_fields(cls, fields, omit, expand=None, prefix=''):
+        """
+        Work out the ``only()`` column list matching a ``fields``/``omit``
+        pair, following select_related expansions. Returns ``None`` when the
+        serializer needs every column (nothing to prune, or a field that does
+        not map to a model column).
+        """
+        if not fields and not omit:
+            return None
+
+        expand = expand or {}
+        model = cls.Meta.model
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        only = []
+
+        for name in select_field_names(cls.Meta.fields, fields, omit):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.many_to_many or field.one_to_many:
+                continue
+            only.append(f"{prefix}{name}")
+
+            serializer_class = expandable.get(name)
+            if name in expand and serializer_class and issubclass(serializer_class, SparseFieldsMixin):
+                nested = serializer_class.get_only_fields(
+                    fields.get(name, {}), omit.get(name, {}), expand[name], prefix=f"{prefix}{name}__"
+                )
+                only += nested or []
+        return only
+
+
+def _compile_field(field):
+    """
+    Return a plain callable equivalent to ``field.to_representation`` for a
+    raw column value, ``None`` when the value passes through unchanged, or
+    raise ``TypeError`` for fields that need a model instance.
+    """
+    if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                          relations.ManyRelatedField)) or field.source == '*':
+        raise TypeError(f"{type(field).__name__} cannot be built from a values() row.")
+
+    if isinstance(field, relations.RelatedField):
+        if type(field) is relations.PrimaryKeyRelatedField and field.pk_field is None:
+            return None
+        raise TypeError(f"{type(field).__name__} cannot be built from a values() row.")
+
+    to_representation = type(field).to_representation
+    if to_representation is serializers.IntegerField.to_representation:
+        return int
+    if to_representation is serializers.FloatField.to_representation:
+        return float
+    if to_representation is serializers.CharField.to_representation:
+        return str
+    if to_representation is serializers.DateField.to_representation:
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() == ISO_8601:
+            return datetime.date.isoformat
+    return field.to_representation
+
+
+@lru_cache(maxsize=None)
+def compile_values_serializer(serializer_class, field_names=None):
+    """
+    Precompile a fast, read-only equivalent of ``serializer_class`` that
+    works on ``values_list()`` rows instead of model instances.
+
+    Returns ``(columns, convert)``: the lookups to pass to ``values_list()``
+    and a function turning one row into the dict the serializer would have
+    produced. Returns ``None`` when a field needs the full serializer.
+    """
+    readable = [
+        field for field in serializer_class().fields.values()
+        if not field.write_only and (field_names is None or field.field_name in field_names)
+    ]
+    try:
+        converters = tuple(_compile_field(field) for field in readable)
+    except TypeError:
+        return None
+
+    columns = tuple('__'.join(field.source_attrs) for field in readable)
+    names = tuple(field.field_name for field in readable)
+    entries = tuple(zip(names, converters))
+
+    def convert(row):
+        return {
+            name: value if value is None or converter is None else converter(value)
+            for (name, converter), value in zip(entries, row)
+        }
+
+    return columns, convert
@@ -170,11 +170,20 @@ AUTH_USER_MODEL='users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'miniproject2.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'miniproject2.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
@@ -195,8 +204,17 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    # Tokens carry the role and student id, so requests authenticate without a user query.
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RoleTokenRefreshSerializer',
+    # Blacklist checks go to the Redis mirror in users.blacklist.
+    'TOKEN_BLACKLIST_SERIALIZER': 'users.serializers.MirroredTokenBlacklistSerializer',
 }
 
+# Set to e.g. {'bits': 2 ** 24, 'hashes': 7} to mirror the token blacklist as
+# fixed-size Bloom filters (2 MB per refresh-token lifetime) instead of a set.
+TOKEN_BLACKLIST_BLOOM = None
+
 DJOSER = {
     'USER_ID_FIELD': 'username',  # or 'id' depending on your setup
     'JWT_AUTH_HEADER_PREFIX': 'Bearer',  # Specifies the prefix for the Authorization header, which is "Bearer"
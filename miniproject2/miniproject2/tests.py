@@ -0,0 +1,165 @@
+import datetime
+import decimal
+import io
+
+import pytest
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from attendance.models import Attendance
+from courses.models import Course, Enrollment, Term
+from django.db import IntegrityError, connection, transaction
+from grades.models import Grade
+from miniproject2.parsers import ORJSONParser
+from miniproject2.partitioning import create_term_partitions, detach_term_partitions
+from miniproject2.renderers import ORJSONRenderer
+from students.models import Student
+from users.models import User
+
+
+PAYLOAD = {
+    'count': 2,
+    'results': [
+        {'id': 1, 'grade': 91.5, 'date': datetime.date(2024, 11, 21), 'status': 'présent'},
+        {'id': 2, 'grade': 100.0, 'date': '2024-11-22', 'status': None},
+    ],
+    'average': decimal.Decimal('95.75'),
+    'updated': datetime.datetime(2024, 11, 21, 9, 30, tzinfo=datetime.timezone.utc),
+    'label': _('Present'),
+    'separators': 'line\u2028paragraph\u2029',
+}
+
+
+def test_orjson_renderer_matches_json_renderer():
+    assert ORJSONRenderer().render(PAYLOAD) == JSONRenderer().render(PAYLOAD)
+
+
+def test_orjson_renderer_indents_like_json_renderer():
+    media_type = 'application/json; indent=4'
+    assert ORJSONRenderer().render(PAYLOAD, media_type) == JSONRenderer().render(PAYLOAD, media_type)
+
+
+def test_orjson_renderer_falls_back_for_big_integers():
+    assert ORJSONRenderer().render({'id': 2 ** 70}) == JSONRenderer().render({'id': 2 ** 70})
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf')])
+def test_orjson_renderer_rejects_non_finite_floats_like_json_renderer(value):
+    data = {'results': [{'id': 1, 'grade': value}]}
+    with pytest.raises(ValueError):
+        JSONRenderer().render(data)
+    with pytest.raises(ValueError):
+        ORJSONRenderer().render(data)
+
+
+def test_orjson_parser_matches_json_parser():
+    body = JSONRenderer().render(PAYLOAD)
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+def test_orjson_parser_rejects_invalid_json():
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"grade": NaN}'))
+
+
+@pytest.mark.django_db
+def test_api_renders_json_and_browsable_api():
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="admin", password="password", role="admin"))
+
+    response = client.get("/grades/", HTTP_ACCEPT="application/json")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    assert response.json() == {"count": 0, "next": None, "previous": None, "results": []}
+
+    response = client.get("/grades/", HTTP_ACCEPT="text/html")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/html")
+
+
+def _seed_school(students=20, days=10):
+    teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+    courses = [Course.objects.create(name=f"Course {i}", description="", professor=teacher) for i in range(3)]
+    today = datetime.date.today()
+    first = None
+    for i in range(students):
+        user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+        student = Student.objects.create(user=user, dob="2000-01-01")
+        first = first or student
+        for course in courses:
+            Grade.objects.create(student=student, course=course, grade=50.0 + i)
+            Attendance.objects.bulk_create([
+                Attendance(student=student, course=course, date=today - datetime.timedelta(days=day), status="present")
+                for day in range(days)
+            ])
+    return teacher, first, today
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason="EXPLAIN output is PostgreSQL's")
+def test_hot_queries_use_indexes():
+    """
+    Ensure the hot viewset and report queries can be answered from an index.
+    Sequential scans are disabled so the seeded tables being small does not
+    let the planner prefer them; a query without a usable index still scans.
+    """
+    teacher, student, today = _seed_school()
+    hot_queries = {
+        "attendance of a teacher's courses": Attendance.objects.filter(course__professor=teacher),
+        "attendance of a course by date": Attendance.objects.filter(course__professor=teacher, date__gte=today),
+        "attendance of a student by date": Attendance.objects.filter(student=student, date__gte=today),
+        "attendance of the day": Attendance.objects.filter(date=today),
+        "grades of a student": Grade.objects.filter(student__user=student.user),
+        "grades of a teacher's courses": Grade.objects.filter(course__professor=teacher),
+        "grades of the day": Grade.objects.filter(date=today),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    for name, queryset in hot_queries.items():
+        plan = queryset.explain()
+        assert "Seq Scan on attendance_attendance" not in plan, f"{name}:\n{plan}"
+        assert "Seq Scan on grades_grade" not in plan, f"{name}:\n{plan}"
+
+
+@pytest.mark.django_db
+def test_grades_and_enrollments_are_unique_per_course():
+    teacher, student, _ = _seed_school(students=1, days=1)
+    course = Course.objects.first()
+    Enrollment.objects.create(student=student, course=course)
+    for model in (Grade, Enrollment):
+        fields = {"grade": 10.0} if model is Grade else {}
+        with pytest.raises(IntegrityError), transaction.atomic():
+            model.objects.create(student=student, course=course, **fields)
+
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason="Partitioning is PostgreSQL's")
+def test_attendance_is_partitioned_by_term():
+    teacher, student, today = _seed_school(students=1, days=1)
+    course = Course.objects.first()
+    outside = Attendance.objects.create(student=student, course=course, date=today - datetime.timedelta(days=400),
+                                        status='present')
+    term = Term.objects.create(name="Now", start_date=today - datetime.timedelta(days=30), end_date=today)
+
+    def partition_of(record):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM attendance_attendance WHERE id = %s", [record.id])
+            return cursor.fetchone()[0]
+
+    assert create_term_partitions([term]) == [
+        f"attendance_attendance_term_{term.id}", f"grades_gradehistory_term_{term.id}",
+    ]
+    assert create_term_partitions([term]) == []
+    inside = Attendance.objects.filter(course=course, date=today).get()
+    assert partition_of(inside) == f"attendance_attendance_term_{term.id}"
+    assert partition_of(outside) == "attendance_attendance_default"
+
+    plan = Attendance.objects.filter(date__range=(term.start_date, term.end_date)).explain()
+    assert "attendance_attendance_default" not in plan
+
+    assert detach_term_partitions(term)[0] == f"attendance_attendance_term_{term.id}"
+    assert list(Attendance.objects.values_list('id', flat=True)) == [outside.id]
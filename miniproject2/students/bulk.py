@@ -0,0 +1,167 @@
+"""
+Bulk provisioning of student accounts, bypassing the one-request-per-user
+registration API.
+"""
+
+import codecs
+import csv
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import password_validation
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from students.models import Student
+from users.models import User
+
+CHUNK_SIZE = 1000
+REQUIRED_COLUMNS = ('username', 'email', 'password', 'dob')
+NOT_UTF8 = "The file is not valid UTF-8."
+
+
+def _init_worker():
+    # Spawned workers start without app registry or settings.
+    django.setup()
+
+
+class StudentCSVImporter:
+    """
+    Streams a CSV of ``username,email,password,dob`` rows into ``User`` and
+    ``Student`` pairs with the ``student`` role.
+
+    Rows are validated like ``CustomUserCreateSerializer`` (field validators
+    and password validators) and checked for usernames and emails repeated
+    in the file or already taken, with one query per chunk. Passwords are
+    hashed across a process pool, a chunk at a time, and users and students
+    inserted with ``bulk_create`` inside one transaction. If any row is
+    invalid nothing is written and ``errors`` lists the offending rows.
+
+    With ``dry_run`` rows are only validated: nothing is hashed or written
+    and ``created`` counts the accounts that would be.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, workers=None, dry_run=False):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.fields = {name: User._meta.get_field(name) for name in ('username', 'email')}
+        self.dob_field = Student._meta.get_field('dob')
+        self.seen_usernames = set()
+        self.seen_emails = set()
+        self.errors = []
+        self.created = 0
+
+    def run(self, upload):
+        reader = csv.DictReader(codecs.iterdecode(upload, 'utf-8-sig'))
+        try:
+            fieldnames = reader.fieldnames or []
+        except UnicodeDecodeError:
+            self.errors.append({'row': 1, 'errors': [NOT_UTF8]})
+            return self
+        missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+        if missing:
+            self.errors.append({'row': 1, 'errors': [f"Missing column(s): {', '.join(missing)}."]})
+            return self
+
+        pool = None if self.dry_run else ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        try:
+            with transaction.atomic():
+                chunk = []
+                try:
+                    for row in reader:
+                        parsed = self.parse_row(reader.line_num, row)
+                        if parsed is not None:
+                            chunk.append(parsed)
+                        if len(chunk) >= self.chunk_size:
+                            self.write_chunk(chunk, pool)
+                            chunk = []
+                except UnicodeDecodeError:
+                    self.errors.append({'row': reader.line_num + 1, 'errors': [NOT_UTF8]})
+                if chunk:
+                    self.write_chunk(chunk, pool)
+
+                if self.errors or self.dry_run:
+                    transaction.set_rollback(True)
+                if self.errors:
+                    self.created = 0
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return self
+
+    def parse_row(self, line, row):
+        errors = []
+        values = {}
+        for name, field in self.fields.items():
+            try:
+                values[name] = field.clean((row[name] or '').strip(), None)
+            except ValidationError as exc:
+                errors += [f"{name}: {message}" for message in exc.messages]
+        try:
+            values['dob'] = self.dob_field.clean(row['dob'], None)
+        except ValidationError as exc:
+            errors += [f"dob: {message}" for message in exc.messages]
+        if not errors:
+            try:
+                password_validation.validate_password(
+                    row['password'] or '', User(username=values['username'], email=values['email']),
+                )
+            except ValidationError as exc:
+                errors += [f"password: {message}" for message in exc.messages]
+
+        username, email = values.get('username'), (values.get('email') or '').lower()
+        if username:
+            if username in self.seen_usernames:
+                errors.append(f"Username {username!r} appears more than once.")
+            self.seen_usernames.add(username)
+        if email:
+            if email in self.seen_emails:
+                errors.append(f"Email {email!r} appears more than once.")
+            self.seen_emails.add(email)
+
+        if errors:
+            self.errors.append({'row': line, 'errors': errors})
+            return None
+        return line, values['username'], values['email'], row['password'], values['dob']
+
+    def write_chunk(self, chunk, pool):
+        taken_usernames = set(
+            User.objects.filter(username__in=[username for _, username, _, _, _ in chunk])
+            .values_list('username', flat=True)
+        )
+        # Rows' emails are lowercased on validation; stored ones may not be.
+        taken_emails = set(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=[email.lower() for _, _, email, _, _ in chunk if email])
+            .values_list('email_lower', flat=True)
+        )
+        valid = []
+        for line, username, email, password, dob in chunk:
+            errors = []
+            if username in taken_usernames:
+                errors.append(f"Username {username!r} is already taken.")
+            if email and email.lower() in taken_emails:
+                errors.append(f"Email {email!r} is already registered.")
+            if errors:
+                self.errors.append({'row': line, 'errors': errors})
+            else:
+                valid.append((username, email, password, dob))
+
+        # Once a row has failed the transaction is rolled back, so only keep validating.
+        if self.errors or self.dry_run:
+            self.created += len(valid)
+            return
+
+        hashes = pool.map(make_password, [password for _, _, password, _ in valid],
+                          chunksize=max(1, len(valid) // 64))
+        users = User.objects.bulk_create([
+            User(username=username, email=email, password=hashed, role='student')
+            for (username, email, _, _), hashed in zip(valid, hashes)
+        ])
+        Student.objects.bulk_create([
+            Student(user=user, dob=dob) for user, (_, _, _, dob) in zip(users, valid)
+        ])
+        self.created += len(users)
@@ -0,0 +1,74 @@
+"""
+A student's home screen in one payload: enrollments, grades, attendance
+rates and the grade summary, read with four flat queries and cached per
+student. Grade, attendance and enrollment writes drop the cached copy once
+their read models (summaries, attendance totals) are refreshed.
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+
+from attendance.models import AttendanceTotal
+from attendance.rates import rate
+from courses.models import Enrollment
+from grades.models import Grade, StudentSummary
+
+DASHBOARD_TIMEOUT = 3600
+
+
+def dashboard_cache_key(student_id):
+    return f"student_dashboard_{student_id}"
+
+
+def build_dashboard(student_id):
+    """
+    One row per course the student is enrolled in or graded in, ordered by
+    course id.
+    """
+    courses = {}
+
+    def row(course_id):
+        return courses.setdefault(course_id, {
+            'course': course_id, 'name': None, 'professor': None, 'enrolled': False,
+            'grade': None, 'graded_on': None, 'attendance': rate(0, 0),
+        })
+
+    for enrollment in Enrollment.objects.filter(student_id=student_id).values(
+        'course_id', name=F('course__name'), professor=F('course__professor__username'),
+    ):
+        row(enrollment['course_id']).update(name=enrollment['name'], professor=enrollment['professor'], enrolled=True)
+
+    for grade in Grade.objects.filter(student_id=student_id).values('course_id', 'grade', 'date', name=F('course__name')):
+        current = row(grade['course_id'])
+        current.update(name=grade['name'], grade=grade['grade'], graded_on=grade['date'])
+
+    for total in AttendanceTotal.objects.filter(student_id=student_id).values('course_id', 'present', 'absent'):
+        if total['course_id'] in courses:
+            courses[total['course_id']]['attendance'] = rate(total['present'], total['absent'])
+
+    summary = StudentSummary.objects.filter(pk=student_id).first()
+    return {
+        'student': student_id,
+        'average': summary.average if summary else None,
+        'courses': [courses[course_id] for course_id in sorted(courses)],
+    }
+
+
+def student_dashboard(student_id):
+    key = dashboard_cache_key(student_id)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build_dashboard(student_id)
+        cache.set(key, dashboard, timeout=DASHBOARD_TIMEOUT)
+    return dashboard
+
+
+def invalidate_dashboards(student_ids=None, course_ids=()):
+    """
+    Drop the cached dashboards of ``student_ids``, or of every student
+    enrolled or graded in ``course_ids`` when the writer did not say who.
+    """
+    if student_ids is None:
+        student_ids = set(Enrollment.objects.filter(course_id__in=course_ids).values_list('student_id', flat=True))
+        student_ids |= set(Grade.objects.filter(course_id__in=course_ids).values_list('student_id', flat=True))
+    cache.delete_many([dashboard_cache_key(student_id) for student_id in student_ids])
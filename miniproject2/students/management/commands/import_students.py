@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.bulk import CHUNK_SIZE, StudentCSVImporter
+
+
+class Command(BaseCommand):
+    help = 'Create student accounts from a CSV with username, email, password and dob columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows hashed and inserted at a time')
+
+    def handle(self, *args, **kwargs):
+        importer = StudentCSVImporter(
+            chunk_size=kwargs['chunk_size'], workers=kwargs['workers'], dry_run=kwargs['dry_run'],
+        )
+        try:
+            with open(kwargs['path'], 'rb') as upload:
+                importer.run(upload)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {kwargs['path']}: {exc}")
+
+        if importer.errors:
+            for error in importer.errors:
+                self.stderr.write(f"Row {error['row']}: {' '.join(error['errors'])}")
+            raise CommandError(f"{len(importer.errors)} invalid row(s). No accounts were created.")
+        if kwargs['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{importer.created} account(s) would be created."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Created {importer.created} student account(s)."))
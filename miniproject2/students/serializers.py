@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from miniproject2.serializers import ExpandableFieldsMixin, SparseFieldsMixin
+from users.serializers import PublicUserSerializer
 from .models import Student
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ['id', 'user', 'dob', 'registration_date']
+        expandable_fields = {'user': PublicUserSerializer}
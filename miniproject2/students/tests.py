@@ -1,7 +1,16 @@
+import orjson
 import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from rest_framework.test import APIClient
 from users.models import User
 from students.models import Student
+from attendance.models import Attendance
+from courses.models import Course, Enrollment
+from grades.models import Grade
 
 @pytest.mark.django_db
 def test_student_creation():
@@ -21,9 +30,10 @@ def test_student_list_view_as_admin():
     Student.objects.create(user=user1, dob="2001-01-01")
     Student.objects.create(user=user2, dob="2002-02-02")
 
-    response = client.get("/students/")
+    response = client.get(reverse("student-list"))
     assert response.status_code == 200
-    assert len(response.data) == 2
+    assert response.data["count"] == 2
+    assert len(response.data["results"]) == 2
 
 @pytest.mark.django_db
 def test_student_retrieve_view():
@@ -71,3 +81,140 @@ def test_student_access_as_non_authenticated():
 
     response = client.get(f"/students/{student.id}/")
     assert response.status_code == 401  # Unauthorized
+
+@pytest.mark.django_db
+def test_student_list_is_paginated_in_two_queries():
+    client = APIClient()
+    admin_user = User.objects.create_superuser(username="admin", password="adminpass", role="admin")
+    client.force_authenticate(user=admin_user)
+    for i in range(12):
+        user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+        Student.objects.create(user=user, dob="2000-01-01")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("student-list"))
+    assert response.status_code == 200
+    assert response.data["count"] == 12
+    assert len(response.data["results"]) == 10
+    assert response.data["next"] is not None
+    assert len(queries) == 2  # count + page
+
+@pytest.mark.django_db
+def test_student_list_streams_ndjson():
+    client = APIClient()
+    admin_user = User.objects.create_superuser(username="admin", password="adminpass", role="admin")
+    client.force_authenticate(user=admin_user)
+    students = []
+    for i in range(12):
+        user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+        students.append(Student.objects.create(user=user, dob="2000-01-01"))
+
+    response = client.get(reverse("student-list"), {"format": "ndjson", "fields": "id,dob"})
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).splitlines()
+    assert sorted(orjson.loads(line)["id"] for line in lines) == [student.id for student in students]
+    assert orjson.loads(lines[0]).keys() == {"id", "dob"}
+
+@pytest.mark.django_db
+def test_student_dashboard(django_capture_on_commit_callbacks):
+    cache.clear()
+    teacher = User.objects.create_user(username="teacher", password="password", role="teacher")
+    user = User.objects.create_user(username="student", password="password", role="student")
+    student = Student.objects.create(user=user, dob="2000-01-01")
+    other = Student.objects.create(user=User.objects.create_user(username="other", password="password", role="student"), dob="2000-01-01")
+    math = Course.objects.create(name="Math", description="", professor=teacher)
+    art = Course.objects.create(name="Art", description="", professor=teacher)
+    with django_capture_on_commit_callbacks(execute=True):
+        Enrollment.objects.create(student=student, course=math)
+        Enrollment.objects.create(student=student, course=art)
+        Grade.objects.create(student=student, course=math, grade=80.0)
+        Attendance.objects.create(student=student, course=math, date="2024-11-21", status="present")
+        Attendance.objects.create(student=student, course=math, date="2024-11-22", status="absent")
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("student-dashboard", args=[student.id]))
+    assert response.status_code == 200
+    assert len(queries) == 5  # student + enrollments, grades, attendance totals, summary
+    assert response.data["average"] == 80.0
+    assert [(row["name"], row["grade"], row["attendance"]["rate"]) for row in response.data["courses"]] == [
+        ("Math", 80.0, 50.0), ("Art", None, None),
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(reverse("student-dashboard", args=[student.id])).data == response.data
+    assert len(queries) == 1  # cached
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Grade.objects.filter(student=student, course=math).get().delete()
+        Grade.objects.create(student=student, course=math, grade=90.0)
+    assert client.get(reverse("student-dashboard", args=[student.id])).data["courses"][0]["grade"] == 90.0
+
+    assert client.get(reverse("student-dashboard", args=[other.id])).status_code == 404
+
+@pytest.mark.django_db
+def test_student_import_csv():
+    client = APIClient()
+    admin_user = User.objects.create_superuser(username="admin", password="adminpass", role="admin")
+    client.force_authenticate(user=admin_user)
+    User.objects.create_user(username="taken", password="password", role="student")
+    User.objects.create_user(username="grace", email="Grace@Example.com", password="password", role="student")
+
+    def upload(rows, **params):
+        body = "username,email,password,dob\n" + "".join(f"{row}\n" for row in rows)
+        if params.get("encoding"):
+            body = body.encode(params["encoding"])
+        url = reverse("student-import-csv") + ("?dry_run=true" if params.get("dry_run") else "")
+        content = body if isinstance(body, bytes) else body.encode()
+        return client.post(url, {"file": SimpleUploadedFile("students.csv", content, content_type="text/csv")},
+                           format="multipart")
+
+    good = ["ada,ada@example.com,Xk2-pqrs-Lm9,2001-01-01", "alan,alan@example.com,Zt7-wxyz-Qa4,2002-02-02"]
+    response = upload(good + ["taken,t@example.com,Zt7-wxyz-Qa5,2000-01-01", "ada,other@example.com,Xk2-pqrs-Lm8,2001-01-01",
+                              "bob,bob@example.com,123,not-a-date"])
+    assert response.status_code == 400
+    assert [row["row"] for row in response.data["rows"]] == [5, 6, 4]
+    assert not Student.objects.exists()
+
+    response = upload(good + ["hopper,grace@EXAMPLE.com,Xk2-pqrs-Lm6,2001-01-01"])
+    assert response.status_code == 400
+    assert response.data["rows"] == [{"row": 4, "errors": ["Email 'grace@EXAMPLE.com' is already registered."]}]
+
+    response = upload(good + ["zoë,zoe@example.com,Xk2-pqrs-Lm7,2001-01-01"], encoding="latin-1")
+    assert response.status_code == 400
+    assert response.data["rows"] == [{"row": 4, "errors": ["The file is not valid UTF-8."]}]
+
+    response = upload(good, dry_run=True)
+    assert response.data == {"created": 2, "dry_run": True}
+    assert not Student.objects.exists()
+
+    response = upload(good)
+    assert response.status_code == 200
+    assert response.data["created"] == 2
+    ada = Student.objects.select_related("user").get(user__username="ada")
+    assert ada.user.role == "student" and ada.user.check_password("Xk2-pqrs-Lm9")
+
+    client.force_authenticate(user=ada.user)
+    assert upload(good).status_code == 403
+
+@pytest.mark.django_db
+def test_student_multi_get():
+    cache.clear()
+    students = []
+    for i in range(3):
+        user = User.objects.create_user(username=f"student{i}", password="password", role="student")
+        students.append(Student.objects.create(user=user, dob="2000-01-01"))
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_superuser(username="admin", password="adminpass", role="admin"))
+    ids = ",".join(str(student.id) for student in reversed(students))
+
+    assert [row["id"] for row in client.get(reverse("student-list"), {"ids": ids}).data] == [s.id for s in reversed(students)]
+    with CaptureQueriesContext(connection) as queries:
+        assert len(client.get(reverse("student-list"), {"ids": ids}).data) == 3
+    assert len(queries) == 0
+
+    # Cached entries are still limited to the student's own record.
+    client.force_authenticate(user=students[1].user)
+    assert [row["id"] for row in client.get(reverse("student-list"), {"ids": ids}).data] == [students[1].id]
@@ -1,15 +1,31 @@
 from django.core.cache import cache
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from .bulk import StudentCSVImporter
+from .dashboard import student_dashboard
 from .models import Student
 from .serializers import StudentSerializer
-from users.permissions import IsStudent  # Import the custom permission
+from users.permissions import IsAdmin, IsStudent  # Import the custom permission
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.all()
+from miniproject2.mixins import (
+    CachedMultiGetMixin, ExpandQuerysetMixin, NDJSONStreamMixin, SparseFieldsQuerysetMixin, EXPAND_PARAMETER,
+    FIELDS_PARAMETER, IDS_PARAMETER, OMIT_PARAMETER, is_reshaped,
+)
+class StudentViewSet(NDJSONStreamMixin, CachedMultiGetMixin, SparseFieldsQuerysetMixin, ExpandQuerysetMixin,
+                     viewsets.ModelViewSet):
+    queryset = Student.objects.order_by('id')
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]  # Ensure user is authenticated
+    object_cache_key = 'student_{}'
+
+    def get_permissions(self):
+        if self.action == 'import_csv':
+            return [IsAdmin()]
+        return super().get_permissions()
 
     @swagger_auto_schema(
         operation_description="Retrieve a student’s details.",
@@ -17,8 +33,9 @@ class StudentViewSet(viewsets.ModelViewSet):
     )
     def retrieve(self, request, *args, **kwargs):
         student_id = kwargs.get("pk")
-        cache_key = f"student_{student_id}"
-        cached_data = cache.get(cache_key)
+        cache_key = self.object_cache_key.format(student_id)
+        cacheable = not is_reshaped(request)  # Expanded or trimmed responses are not cached
+        cached_data = cache.get(cache_key) if cacheable else None
 
         if cached_data:
             return Response(cached_data, status=status.HTTP_200_OK)
@@ -26,7 +43,8 @@ class StudentViewSet(viewsets.ModelViewSet):
         # Fetch from DB and cache it
         instance = self.get_object()
         serializer = self.get_serializer(instance)
-        cache.set(cache_key, serializer.data, timeout=3600)  # Cache for 1 hour
+        if cacheable:
+            cache.set(cache_key, serializer.data, timeout=3600)  # Cache for 1 hour
         return Response(serializer.data)
 
     @swagger_auto_schema(
@@ -35,27 +53,88 @@ class StudentViewSet(viewsets.ModelViewSet):
     )
     def perform_update(self, serializer):
         instance = serializer.save()
-        cache.delete(f"student_{instance.id}")
+        cache.delete(self.object_cache_key.format(instance.id))
+
+    def perform_destroy(self, instance):
+        student_id = instance.id
+        super().perform_destroy(instance)
+        cache.delete(self.object_cache_key.format(student_id))
+
+    def visible_ids(self, ids):
+        # Cached students bypass get_queryset: students only ever get their own.
+        if IsStudent().has_permission(self.request, self):
+            own = set(self.get_queryset().values_list('id', flat=True))
+            return [pk for pk in ids if pk in own]
+        return ids
 
     
     @swagger_auto_schema(
-        operation_description="List all students or the current student’s details.",
+        operation_description=(
+            "List all students or the current student’s details, paginated. Add ?format=ndjson to stream "
+            "every student instead, one JSON document per line, or ?ids= to fetch specific students."
+        ),
+        manual_parameters=[IDS_PARAMETER, EXPAND_PARAMETER, FIELDS_PARAMETER, OMIT_PARAMETER],
         responses={200: StudentSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
         """
         List all students or just the logged-in student's details based on permissions.
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "A student's home screen in one call: the courses they are enrolled or graded in, each with the "
+            "grade and attendance rate, and their average grade. Students can only view their own."
+        ),
+        responses={200: 'Student dashboard.', 404: 'Not Found'},
+    )
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        """
+        Cached per student until one of their grades, attendance records or enrollments changes.
+        """
+        student = self.get_object()
+        return Response(student_dashboard(student.id), status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Create student accounts from a CSV file with 'username', 'email', 'password' and 'dob' columns. "
+            "Nothing is written if any row is invalid or duplicated; with dry_run the file is only validated."
+        ),
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description="CSV file"),
+            openapi.Parameter('dry_run', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description="Only validate."),
+        ],
+        responses={200: 'Count of created accounts.', 400: 'Row-level errors.', 403: 'Forbidden.'},
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Admins only. Large intakes are better run with the import_students command.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A CSV file is required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true')
+        importer = StudentCSVImporter(dry_run=dry_run).run(upload)
+        if importer.errors:
+            return Response(
+                {"error": "The CSV contains invalid rows. No accounts were created.", "rows": importer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"created": importer.created, "dry_run": dry_run}, status=status.HTTP_200_OK)
 
     def get_queryset(self):
         """
         If the user is a student, restrict access to their own data.
         Admins or non-students can access the full list.
         """
+        queryset = self.queryset
+        if not any(self.get_sparse_fields()):
+            # The username is what students are displayed as; a sparse ``only()`` cannot join it.
+            queryset = queryset.select_related('user')
         if IsStudent().has_permission(self.request, self):
-            return self.queryset.filter(user=self.request.user)
-        return self.queryset
+            return queryset.filter(user=self.request.user)
+        return queryset
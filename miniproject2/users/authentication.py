@@ -0,0 +1,64 @@
+"""
+JWT authentication from token claims. Tokens carry the user's role, flags
+and student id from issue time, so authenticating a request builds a
+``ClaimsUser`` without touching the users table. Role changes invalidate
+the user's earlier access tokens, which clients then refresh; refreshing
+re-reads the claims from the database.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from students.models import Student
+from users.models import ClaimsUser
+
+STUDENT_CLAIM = 'student_id'
+
+
+def add_claims(token, user):
+    for name in ClaimsUser.CLAIMED_FIELDS:
+        token[name] = getattr(user, name)
+    token[STUDENT_CLAIM] = Student.objects.filter(user_id=user.id).values_list('id', flat=True).first()
+    return token
+
+
+def tokens_valid_after_key(user_id):
+    return f"tokens_valid_after_{user_id}"
+
+
+def invalidate_tokens(user_ids):
+    """
+    Reject the access tokens issued to ``user_ids`` so far, including the
+    current second. The marker only has to outlive the tokens it rejects.
+    """
+    now = int(time.time())
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set_many({tokens_valid_after_key(user_id): now for user_id in user_ids}, timeout=timeout)
+    cache.delete_many([ClaimsUser.cache_key(user_id) for user_id in user_ids])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` returning a ``ClaimsUser``. Tokens issued before
+    claims were added fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(name not in validated_token for name in ClaimsUser.CLAIMED_FIELDS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # ``iat`` has one-second resolution, so a token of the very second of the change is rejected
+        # too; one issued earlier in that second would otherwise keep the old claims until it expires.
+        valid_after = cache.get(tokens_valid_after_key(user_id))
+        if valid_after is not None and validated_token['iat'] <= valid_after:
+            raise AuthenticationFailed(_("Token is outdated, refresh it."), code='token_outdated')
+        return ClaimsUser.from_claims(user_id, validated_token, validated_token.get(STUDENT_CLAIM))
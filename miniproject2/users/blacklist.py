@@ -0,0 +1,274 @@
+"""
+Redis mirror of the refresh-token blacklist, so checking a token is one
+Redis round trip instead of a join on the ``token_blacklist`` tables.
+
+By default the mirror is a sorted set of blacklisted JTIs scored by token
+expiry; expired members are trimmed on write. With ``TOKEN_BLACKLIST_BLOOM``
+(``{'bits': ..., 'hashes': ...}``) it is a Bloom filter per expiry window
+instead, of fixed size, and positives are confirmed in the database.
+
+Either way a mirror lost from Redis (or Redis being down) falls back to the
+database, and the mirror is rebuilt from it on the next check. A rebuild
+fills a ``:building`` key renamed over the live one when complete, so a
+half-loaded mirror is never read; tokens mirrored while it runs are written
+to both keys.
+"""
+
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+# Always present in a loaded sorted set (with an infinite score) and as bit 0
+# of a loaded Bloom filter, so an empty mirror is still a hit.
+LOADED = '-'
+BATCH_SIZE = 5000
+# Upper bound on a rebuild; a crashed one releases its lock after this.
+LOAD_TIMEOUT = 300
+
+logger = logging.getLogger('app_logger')
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _bloom():
+    return getattr(settings, 'TOKEN_BLACKLIST_BLOOM', None)
+
+
+def blacklist_key():
+    return cache.make_key("token_blacklist")
+
+
+def _window():
+    # Tokens expiring in the same window share a Bloom filter, dropped once they have all expired.
+    return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def bloom_key(exp):
+    return cache.make_key(f"token_blacklist_bloom_{int(exp) // _window()}")
+
+
+def _mirror_key(exp):
+    return bloom_key(exp) if _bloom() else blacklist_key()
+
+
+def _building(key):
+    return f"{key}:building"
+
+
+def _positions(jti):
+    bits, hashes = _bloom()['bits'], _bloom()['hashes']
+    digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+    first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+    return [1 + (first + i * second) % (bits - 1) for i in range(hashes)]
+
+
+def _in_database(jti):
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def _blacklisted(expires_after, expires_before=None):
+    tokens = BlacklistedToken.objects.filter(token__expires_at__gt=datetime_from_epoch(expires_after))
+    if expires_before is not None:
+        tokens = tokens.filter(token__expires_at__lte=datetime_from_epoch(expires_before))
+    return tokens.values_list('token__jti', 'token__expires_at').iterator(chunk_size=BATCH_SIZE)
+
+
+def _write(pipeline, key, jti, exp):
+    if _bloom():
+        for position in _positions(jti):
+            pipeline.setbit(key, position, 1)
+        pipeline.expireat(key, (int(exp) // _window() + 1) * _window())
+    else:
+        pipeline.zadd(key, {jti: exp})
+
+
+def load(exp=None):
+    """
+    Rebuild the mirror from the database: the whole sorted set, or the Bloom
+    filter of the window of ``exp``. Skipped while another rebuild of the
+    same key runs; checks keep using the database meanwhile.
+    """
+    now = time.time()
+    key = _mirror_key(exp)
+    building = _building(key)
+    if not _redis().set(f"{key}:loading", 1, nx=True, ex=LOAD_TIMEOUT):
+        return
+    try:
+        # The building key must exist before the read starts, so that a token
+        # committed after the read is mirrored into it by add_many.
+        pipeline = _redis().pipeline()
+        pipeline.delete(building)
+        if _bloom():
+            start = int(exp) // _window() * _window()
+            pipeline.setbit(building, 0, 1)
+            pipeline.expireat(building, start + _window())
+            rows = _blacklisted(max(now, start), start + _window())
+        else:
+            pipeline.zadd(building, {LOADED: float('inf')})
+            pipeline.expire(building, LOAD_TIMEOUT)
+            rows = _blacklisted(now)
+        pipeline.execute()
+
+        for count, (jti, expires_at) in enumerate(rows, 1):
+            _write(pipeline, building, jti, expires_at.timestamp())
+            if count % BATCH_SIZE == 0:
+                pipeline.execute()
+        pipeline.rename(building, key)
+        if not _bloom():
+            pipeline.persist(key)
+        try:
+            pipeline.execute()
+        except ResponseError:
+            # unload() dropped the building key: the mirror stays unloaded until the next check.
+            logger.warning(f"Token blacklist rebuild of {key} was abandoned.")
+    finally:
+        _redis().delete(f"{key}:loading")
+
+
+def is_blacklisted(jti, exp):
+    try:
+        pipeline = _redis().pipeline()
+        if _bloom():
+            pipeline.getbit(bloom_key(exp), 0)
+            for position in _positions(jti):
+                pipeline.getbit(bloom_key(exp), position)
+            loaded, *bits = pipeline.execute()
+            if not loaded:
+                load(exp)
+            elif not all(bits):
+                return False
+            return _in_database(jti)  # Confirms possible false positives
+
+        pipeline.zscore(blacklist_key(), LOADED)
+        pipeline.zscore(blacklist_key(), jti)
+        loaded, score = pipeline.execute()
+        if loaded is None:
+            load()
+            return _in_database(jti)
+        return score is not None
+    except RedisError:
+        return _in_database(jti)
+
+
+def add(jti, exp):
+    add_many([(jti, exp)])
+
+
+def unload(exps=()):
+    """
+    Drop the loaded marker (of the Bloom filters of ``exps``), so checks go
+    to the database and rebuild the mirror. Rebuilds in progress are
+    abandoned, as they may have missed the tokens that failed to mirror.
+    """
+    pipeline = _redis().pipeline()
+    if _bloom():
+        for exp in exps:
+            pipeline.setbit(bloom_key(exp), 0, 0)
+            pipeline.expireat(bloom_key(exp), (int(exp) // _window() + 1) * _window())
+            pipeline.delete(_building(bloom_key(exp)))
+    else:
+        pipeline.zrem(blacklist_key(), LOADED)
+        pipeline.delete(_building(blacklist_key()))
+    pipeline.execute()
+
+
+def add_many(tokens):
+    """
+    Mirror ``tokens``, ``(jti, exp)`` pairs, in one pipeline per batch, into
+    the live mirror and any rebuild in progress. Runs after the blacklist
+    rows are committed, so a Redis failure only unloads the mirror instead
+    of failing the request.
+    """
+    try:
+        keys = list(dict.fromkeys(_mirror_key(exp) for _, exp in tokens))
+        pipeline = _redis().pipeline()
+        for key in keys:
+            pipeline.exists(_building(key))
+        building = {key for key, exists in zip(keys, pipeline.execute()) if exists}
+
+        for count, (jti, exp) in enumerate(tokens, 1):
+            key = _mirror_key(exp)
+            _write(pipeline, key, jti, exp)
+            if key in building:
+                _write(pipeline, _building(key), jti, exp)
+                if not _bloom():
+                    pipeline.expire(_building(key), LOAD_TIMEOUT)
+            if count % BATCH_SIZE == 0:
+                pipeline.execute()
+        if not _bloom():
+            pipeline.zremrangebyscore(blacklist_key(), '-inf', time.time())
+        pipeline.execute()
+    except RedisError as exc:
+        logger.error(f"Could not mirror {len(tokens)} blacklisted tokens: {exc}")
+        try:
+            unload({exp for _, exp in tokens})
+        except RedisError as exc:
+            logger.error(f"Could not unload the token blacklist mirror: {exc}")
+
+
+def blacklist_users(user_ids):
+    """
+    Blacklist every unexpired refresh token of ``user_ids`` with batched
+    inserts, mirrored on commit. Returns the number of tokens blacklisted.
+    """
+    tokens = list(OutstandingToken.objects.filter(
+        user_id__in=user_ids, expires_at__gt=aware_utcnow(), blacklistedtoken__isnull=True,
+    ).values_list('id', 'jti', 'expires_at'))
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id, _, _ in tokens], batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    mirrored = [(jti, expires_at.timestamp()) for _, jti, expires_at in tokens]
+    transaction.on_commit(lambda: add_many(mirrored))
+    return len(tokens)
+
+
+def purge_expired(batch_size=BATCH_SIZE):
+    """
+    Delete expired outstanding tokens (and their blacklist entries) in
+    batches of ``batch_size``, then trim the mirror. Returns the number of
+    outstanding tokens deleted.
+    """
+    expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    if not _bloom():
+        _redis().zremrangebyscore(blacklist_key(), '-inf', time.time())
+    return deleted
+
+
+class MirroredRefreshToken(RefreshToken):
+    """
+    ``RefreshToken`` checking the Redis mirror instead of the blacklist
+    tables; blacklisting still writes the tables and mirrors on commit.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        jti, exp = self.payload[api_settings.JTI_CLAIM], self.payload['exp']
+        transaction.on_commit(lambda: add(jti, exp))
+        return result
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, router
 from django.contrib.auth.models import AbstractUser 
 # Create your models here.
 ROLE_CHOICE = [
@@ -8,4 +9,58 @@ ROLE_CHOICE = [
     ]
 class User(AbstractUser):
     role = models.CharField(max_length=10,choices=ROLE_CHOICE)
-    
\ No newline at end of file
+
+
+class ClaimsUser(User):
+    """
+    A ``User`` built from access-token claims without a query. Claimed fields
+    are loaded and every other field is deferred: the first access to one
+    fills them all from a short-lived cache of the row (the password hash
+    always comes from the database).
+    """
+    CLAIMED_FIELDS = ('username', 'role', 'is_staff', 'is_superuser')
+    CACHE_TIMEOUT = 60
+
+    class Meta:
+        proxy = True
+
+    @staticmethod
+    def cache_key(user_id):
+        return f"auth_user_{user_id}"
+
+    @classmethod
+    def from_claims(cls, user_id, claims, student_id=None):
+        """
+        The user of an access token. ``is_active`` is taken as true: saving
+        or deleting an inactive user invalidates its tokens, but deactivations
+        through ``queryset.update()`` skip that signal and must call
+        ``users.authentication.invalidate_tokens`` themselves, or the tokens
+        stay usable until they expire.
+        """
+        from students.models import Student
+
+        db = router.db_for_read(cls)
+        # simplejwt >= 5.4 writes the user id claim as a string.
+        user_id = User._meta.pk.to_python(user_id)
+        values = {'id': user_id, 'is_active': True, **{name: claims[name] for name in cls.CLAIMED_FIELDS}}
+        names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        user = cls.from_db(db, names, [values[name] for name in names])
+        if student_id is not None:
+            student = Student.from_db(db, ['id', 'user_id'], [student_id, user_id])
+            student._state.fields_cache['user'] = user
+            user._state.fields_cache['student'] = student
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields() - {'password'}
+        if fields is None or from_queryset is not None or not deferred & set(fields):
+            return super().refresh_from_db(using, fields, from_queryset)
+
+        key = self.cache_key(self.pk)
+        values = cache.get(key)
+        if values is None:
+            names = [field.attname for field in self._meta.concrete_fields if field.attname != 'password']
+            values = User.objects.using(using or self._state.db).values(*names).get(pk=self.pk)
+            cache.set(key, values, timeout=self.CACHE_TIMEOUT)
+        for name in deferred:
+            setattr(self, name, values[name])
@@ -1,11 +1,21 @@
+from collections import Counter
+
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from .models import User
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer, TokenObtainPairSerializer, TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import add_claims
+from .blacklist import MirroredRefreshToken
+from .models import ROLE_CHOICE, User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import password_validation
 from rest_framework import serializers
+from miniproject2.serializers import SparseFieldsMixin
 
 
-class CustomUserCreateSerializer(serializers.ModelSerializer):
+class CustomUserCreateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -29,7 +39,73 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         user.save()
         return user
     
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsMixin, UserSerializer):
     class Meta(UserSerializer.Meta):
         model = User
         fields = ['id', 'username', 'email', 'role']  # Include additional fields
+
+
+class PublicUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    The user as other accounts may see it: no email. Used for ``?expand=``
+    of users, which is open to any caller allowed to read the parent object.
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'role']
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issues tokens carrying the claims ``ClaimsJWTAuthentication`` reads.
+    """
+    token_class = MirroredRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Re-reads the claims of the refresh token before deriving the new access
+    token, so role changes reach clients on their next refresh.
+    """
+    token_class = MirroredRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User not found or inactive.", code='user_inactive')
+        # The access token copies iat from the refresh token; a stale iat would fail the tokens_valid_after check.
+        refresh.set_iat()
+        attrs['refresh'] = str(add_claims(refresh, user))
+        return super().validate(attrs)
+
+
+class MirroredTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = MirroredRefreshToken
+
+
+class RoleChangeSerializer(serializers.Serializer):
+    user = serializers.IntegerField(min_value=1)
+    role = serializers.ChoiceField(choices=ROLE_CHOICE)
+
+
+class BulkRoleSerializer(serializers.Serializer):
+    """
+    ``changes``: up to ``MAX_CHANGES`` ``{"user": id, "role": role}`` pairs,
+    one per user.
+    """
+    MAX_CHANGES = 1000
+
+    # The size cap is checked before any change is validated.
+    changes = RoleChangeSerializer(many=True, allow_empty=False, max_length=MAX_CHANGES)
+
+    def validate_changes(self, value):
+        counts = Counter(change['user'] for change in value)
+        repeated = sorted(user_id for user_id, count in counts.items() if count > 1)
+        if repeated:
+            raise serializers.ValidationError(f"Users appear more than once: {repeated}.")
+        return value
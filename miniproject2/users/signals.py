@@ -1,7 +1,13 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 import logging
 
+from users.authentication import invalidate_tokens
+from users.models import ClaimsUser, User
+
 logger = logging.getLogger('app_logger')
 
 @receiver(user_logged_in)
@@ -11,3 +17,13 @@ def log_user_login(sender, request, user, **kwargs):
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
     logger.info(f"User logged out: {user.username} (ID: {user.id})")
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=ClaimsUser)
+def forget_cached_user(sender, instance, signal, **kwargs):
+    user_id = instance.id
+    if signal is post_delete or not instance.is_active:
+        # Tokens used to be checked against the row on every request.
+        transaction.on_commit(lambda: invalidate_tokens([user_id]))
+    else:
+        transaction.on_commit(lambda: cache.delete(ClaimsUser.cache_key(user_id)))
@@ -0,0 +1,20 @@
+"""
+Background tasks for the users app.
+
+Tasks:
+- purge_expired_tokens: Deletes expired outstanding refresh tokens in batches.
+"""
+
+from celery import shared_task
+
+from users.blacklist import purge_expired
+
+
+@shared_task
+def purge_expired_tokens():
+    """
+    Every refresh leaves an outstanding (and, rotated, blacklisted) token
+    row behind; expired ones are deleted in batches. This task is executed
+    every day using Celery Beat.
+    """
+    return purge_expired()
@@ -1,8 +1,23 @@
 # users/tests/test_users.py
+import time
+from datetime import timedelta
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
 from rest_framework.test import APIClient
-from users.models import User
-from users.serializers import CustomUserCreateSerializer, CustomUserSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from students.models import Student
+from users import blacklist
+from users.blacklist import MirroredRefreshToken
+from users.models import ClaimsUser, User
+from users.serializers import BulkRoleSerializer, CustomUserCreateSerializer, CustomUserSerializer
 
 @pytest.mark.django_db
 def test_user_creation():
@@ -196,4 +211,167 @@ def test_user_login():
     
     # Assert the tokens are not empty
     assert response.data["access"] is not None, "Access token is empty"
-    assert response.data["refresh"] is not None, "Refresh token is empty"
\ No newline at end of file
+    assert response.data["refresh"] is not None, "Refresh token is empty"
+@pytest.mark.django_db
+def test_claims_authentication_skips_user_query(django_capture_on_commit_callbacks):
+    cache.clear()
+    user = User.objects.create_user(username="student", password="securepassword", role="student")
+    student = Student.objects.create(user=user, dob="2000-01-01")
+    admin_user = User.objects.create_superuser(username="admin", password="adminpass", role="admin")
+    client = APIClient()
+    tokens = client.post("/auth/jwt/create/", {"username": "student", "password": "securepassword"}).data
+    assert AccessToken(tokens["access"])["role"] == "student"
+    assert AccessToken(tokens["access"])["student_id"] == student.id
+
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("student-list"))
+    assert response.status_code == 200
+    assert [row["id"] for row in response.data["results"]] == [student.id]
+    assert not any('FROM "users_user"' in query["sql"] for query in queries)  # No user lookup
+
+    admin = APIClient()
+    admin.force_authenticate(user=admin_user)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert admin.patch(f"/users/{user.id}/role/", {"role": "teacher"}).status_code == 200
+    response = client.get(reverse("student-list"))
+    assert response.status_code == 401
+    assert response.data["code"] == "token_outdated"
+
+    time.sleep(1)  # Tokens of the very second of the change are rejected as well
+    refreshed = client.post("/token/refresh/", {"refresh": tokens["refresh"]}).data
+    assert AccessToken(refreshed["access"])["role"] == "teacher"
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {refreshed['access']}")
+    assert client.get(reverse("student-list")).status_code == 200
+
+def test_claims_user_id_is_typed():
+    # simplejwt >= 5.4 writes the user id claim as a string.
+    claims = {"username": "student", "role": "student", "is_staff": False, "is_superuser": False}
+    assert ClaimsUser.from_claims("5", claims).id == 5
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bloom", [None, {"bits": 2 ** 16, "hashes": 5}])
+def test_token_blacklist_mirror(settings, django_capture_on_commit_callbacks, bloom):
+    settings.TOKEN_BLACKLIST_BLOOM = bloom
+    cache.clear()
+    User.objects.create_user(username="student", password="securepassword", role="student")
+    client = APIClient()
+    tokens = client.post("/auth/jwt/create/", {"username": "student", "password": "securepassword"}).data
+    refresh = MirroredRefreshToken(tokens["refresh"])
+    jti, exp = refresh["jti"], refresh["exp"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post("/token/blacklist/", {"refresh": tokens["refresh"]}).status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        assert blacklist.is_blacklisted(jti, exp)
+        assert not blacklist.is_blacklisted("unknown", exp)
+    # Only Bloom positives are confirmed in the database.
+    assert len(queries) == (1 if bloom else 0)
+    assert client.post("/token/refresh/", {"refresh": tokens["refresh"]}).status_code == 401
+
+    # A lost mirror falls back to the database and is rebuilt.
+    cache.clear()
+    assert blacklist.is_blacklisted(jti, exp)
+    with CaptureQueriesContext(connection) as queries:
+        assert not blacklist.is_blacklisted("unknown", exp)
+    assert len(queries) == 0
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bloom", [None, {"bits": 2 ** 16, "hashes": 5}])
+def test_token_blacklist_mirror_survives_redis_errors(settings, monkeypatch, django_capture_on_commit_callbacks, bloom):
+    settings.TOKEN_BLACKLIST_BLOOM = bloom
+    cache.clear()
+    User.objects.create_user(username="student", password="securepassword", role="student")
+    client = APIClient()
+    tokens = client.post("/auth/jwt/create/", {"username": "student", "password": "securepassword"}).data
+    refresh = MirroredRefreshToken(tokens["refresh"])
+    assert not blacklist.is_blacklisted(refresh["jti"], refresh["exp"])  # Loads the mirror
+
+    def fail(*args):
+        raise RedisError("Connection lost")
+
+    monkeypatch.setattr(blacklist, "_write", fail)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post("/token/blacklist/", {"refresh": tokens["refresh"]}).status_code == 200
+    assert blacklist.is_blacklisted(refresh["jti"], refresh["exp"])
+    assert client.post("/token/refresh/", {"refresh": tokens["refresh"]}).status_code == 401
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bloom", [None, {"bits": 2 ** 16, "hashes": 5}])
+def test_token_blacklist_rebuild_is_never_half_loaded(settings, monkeypatch, bloom):
+    settings.TOKEN_BLACKLIST_BLOOM = bloom
+    cache.clear()
+    user = User.objects.create_user(username="student", password="securepassword", role="student")
+    first, second, third = (MirroredRefreshToken.for_user(user) for _ in range(3))
+    first.blacklist()
+    second.blacklist()
+    exp = first["exp"]
+    redis = get_redis_connection("default")
+
+    def loaded():
+        if bloom:
+            return bool(redis.getbit(blacklist.bloom_key(exp), 0))
+        return redis.zscore(blacklist.blacklist_key(), blacklist.LOADED) is not None
+
+    read_rows, pending = blacklist._blacklisted, [third]
+
+    def rows(*args):
+        for row in read_rows(*args):
+            yield row
+            # Between batches the live mirror is still unloaded, and a token blacklisted now reaches the rebuild.
+            assert not loaded()
+            while pending:
+                token = pending.pop()
+                token.blacklist()
+                blacklist.add(token["jti"], token["exp"])
+
+    monkeypatch.setattr(blacklist, "BATCH_SIZE", 1)
+    monkeypatch.setattr(blacklist, "_blacklisted", rows)
+    blacklist.load(exp)
+    assert loaded()
+    assert all(blacklist.is_blacklisted(token["jti"], token["exp"]) for token in (first, second, third))
+
+@pytest.mark.django_db
+def test_purge_expired_tokens():
+    user = User.objects.create_user(username="student", password="securepassword", role="student")
+    now = aware_utcnow()
+    for i in range(5):
+        token = OutstandingToken.objects.create(user=user, jti=f"old{i}", token="", expires_at=now - timedelta(days=1))
+        BlacklistedToken.objects.create(token=token)
+    OutstandingToken.objects.create(user=user, jti="live", token="", expires_at=now + timedelta(days=1))
+
+    assert blacklist.purge_expired(batch_size=2) == 5
+    assert list(OutstandingToken.objects.values_list("jti", flat=True)) == ["live"]
+    assert not BlacklistedToken.objects.exists()
+
+@pytest.mark.django_db
+def test_bulk_role_update(django_capture_on_commit_callbacks):
+    cache.clear()
+    admin = APIClient()
+    admin.force_authenticate(user=User.objects.create_superuser(username="admin", password="adminpass", role="admin"))
+    users = [User.objects.create_user(username=f"ta{i}", password="securepassword", role="student") for i in range(3)]
+    client = APIClient()
+    tokens = client.post("/auth/jwt/create/", {"username": "ta0", "password": "securepassword"}).data
+
+    changes = [{"user": user.id, "role": "teacher"} for user in users[:2]] + [{"user": users[2].id, "role": "student"}]
+    assert admin.patch("/users/roles/", {"changes": changes + [{"user": 999999, "role": "teacher"}]},
+                       format="json").status_code == 404
+    assert not User.objects.filter(role="teacher").exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin.patch("/users/roles/", {"changes": changes}, format="json")
+    assert response.status_code == 200
+    assert response.data == {"updated": 2, "unchanged": 1, "revoked_tokens": 1}
+    assert list(User.objects.filter(role="teacher").order_by("id").values_list("id", flat=True)) == \
+        [user.id for user in users[:2]]
+
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+    assert client.get(reverse("student-list")).data["code"] == "token_outdated"
+    client.credentials()
+    assert client.post("/token/refresh/", {"refresh": tokens["refresh"]}).status_code == 401
+
+    repeated = admin.patch("/users/roles/", {"changes": changes + changes[:1]}, format="json")
+    assert repeated.status_code == 400
+    too_many = [{"user": users[0].id, "role": "oops"}] * (BulkRoleSerializer.MAX_CHANGES + 1)
+    response = admin.patch("/users/roles/", {"changes": too_many}, format="json")
+    assert response.status_code == 400 and "no more than" in str(response.data)
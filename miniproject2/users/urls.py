@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomUserViewSet, UpdateRoleView
+from .views import BulkRoleView, CustomUserViewSet, UpdateRoleView
 
 # Define the router and register the custom user viewset
 router = DefaultRouter()
@@ -9,6 +9,7 @@ router.register('register', CustomUserViewSet, basename='user')
 # Define the URL patterns
 urlpatterns = [
     path('', include(router.urls)),
+    path('roles/', BulkRoleView.as_view(), name='bulk-update-roles'),
     path('<int:pk>/role/', UpdateRoleView.as_view(), name='update-role'),
 ]
 
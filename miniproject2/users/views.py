@@ -2,8 +2,12 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from collections import Counter
+from django.db import transaction
 
-from users.serializers import CustomUserSerializer
+from users.authentication import invalidate_tokens
+from users.blacklist import blacklist_users
+from users.serializers import BulkRoleSerializer, CustomUserSerializer
 from .models import User
 from djoser.views import UserViewSet  # Import the Djoser UserViewSet
 from drf_yasg.utils import swagger_auto_schema
@@ -44,9 +48,60 @@ class UpdateRoleView(APIView):
 
             user.role = new_role
             user.save()
+            invalidate_tokens([user.id])  # Access tokens carry the old role until refreshed
             logger.info(f"User role updated: {user.username} (ID: {user.id}) - {old_role} → {new_role}")
             return Response({"message": "Role updated successfully"}, status=status.HTTP_200_OK)
 
         except User.DoesNotExist:
             logger.error(f"Attempted to update role for non-existent user (ID: {pk})")
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+class BulkRoleView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Change the roles of many users at once. Only admin users can perform this action. "
+            "Nothing is changed if any user does not exist. Changed users' access and refresh "
+            "tokens are revoked, so they sign in again with their new role."
+        ),
+        request_body=BulkRoleSerializer,
+        responses={
+            200: "Roles updated; returns the number of users changed and of refresh tokens revoked.",
+            400: "Invalid changes.",
+            404: "Some users were not found."
+        }
+    )
+    def patch(self, request):
+        serializer = BulkRoleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        roles = {change['user']: change['role'] for change in serializer.validated_data['changes']}
+
+        users = list(User.objects.filter(pk__in=roles).only('id', 'role'))
+        missing = sorted(set(roles) - {user.id for user in users})
+        if missing:
+            return Response({"error": "Users not found", "users": missing}, status=status.HTTP_404_NOT_FOUND)
+
+        transitions = Counter()
+        changed = []
+        for user in users:
+            if user.role != roles[user.id]:
+                transitions[f"{user.role} → {roles[user.id]}"] += 1
+                user.role = roles[user.id]
+                changed.append(user)
+        changed_ids = [user.id for user in changed]
+
+        with transaction.atomic():
+            User.objects.bulk_update(changed, ['role'], batch_size=500)
+            revoked = blacklist_users(changed_ids)
+            # Access tokens carry the old role until they expire; bulk_update sends no post_save.
+            transaction.on_commit(lambda: invalidate_tokens(changed_ids))
+
+        logger.info(
+            f"Bulk role update by {request.user.username} (ID: {request.user.id}): "
+            f"{len(changed)} of {len(roles)} users changed ({dict(transitions)}), "
+            f"{revoked} refresh tokens revoked - users {changed_ids}"
+        )
+        return Response({"updated": len(changed), "unchanged": len(roles) - len(changed), "revoked_tokens": revoked},
+                        status=status.HTTP_200_OK)